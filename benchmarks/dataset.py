@@ -0,0 +1,184 @@
+"""Build a synthetic database shaped like Sakila sample data.
+
+Row counts follow the sample data (1000 films, 16044 rentals, ...) multiplied by the scale factor:
+
+    python benchmarks/dataset.py --scale 0.1 --url sqlite:///benchmark.sqlite3
+
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
+
+from falconer import models
+from falconer.db.model import Base
+
+BATCH_SIZE = 5000
+
+STARTED = datetime(2005, 5, 24, 22, 53, 30)
+UPDATED = datetime(2006, 2, 15, 4, 57, 12)
+
+# rows of Sakila sample data
+SAKILA_ROWS = {
+    'actor': 200,
+    'address': 603,
+    'city': 600,
+    'customer': 599,
+    'film': 1000,
+    'inventory': 4581,
+    'rental': 16044,
+    'store': 2,
+}
+
+WORDS = ['Epic', 'Drama', 'Boring', 'Touching', 'Astounding', 'Yarn', 'Documentary', 'Saga', 'Story', 'Display',
+         'Mad Scientist', 'Dentist', 'Database Administrator', 'Moose', 'Lumberjack', 'Car', 'Shark', 'Boat']
+
+
+def get_counts(scale: float) -> Dict[str, int]:
+    counts = {table: max(1, int(rows * scale)) for table, rows in SAKILA_ROWS.items()}
+    counts['store'] = max(2, counts['store'])
+    counts['address'] = max(counts['address'], counts['customer'] + 2 * counts['store'])
+    counts['city'] = min(counts['city'], counts['address'])
+    return counts
+
+
+def _insert(connection: Connection, table, rows: Iterator[dict]) -> int:
+    count = 0
+    batch = []  # type: List[dict]
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            connection.execute(table.insert(), batch)
+            count += len(batch)
+            batch = []
+
+    if batch:
+        connection.execute(table.insert(), batch)
+        count += len(batch)
+
+    return count
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate(counts: Dict[str, int], seed: int = 0) -> Iterator[tuple]:
+    """Generate (table, rows) pairs in an order respecting foreign keys (apart from the staff - store cycle)."""
+    rng = random.Random(seed)
+    ratings = list(models.Film.MpaaRating)
+
+    yield models.Language.__table__, ({'language_id': index, 'name': name, 'last_update': UPDATED}
+                                      for index, name in enumerate(['English', 'Italian', 'Japanese', 'Mandarin',
+                                                                    'French', 'German'], 1))
+    yield models.Category.__table__, ({'category_id': index, 'name': 'Category {}'.format(index),
+                                       'last_update': UPDATED} for index in range(1, 17))
+    yield models.Country.__table__, ({'country_id': index, 'country': 'Country {}'.format(index),
+                                      'last_update': UPDATED} for index in range(1, 110))
+    yield models.City.__table__, ({'city_id': index, 'city': 'City {}'.format(index),
+                                   'country_id': rng.randint(1, 109), 'last_update': UPDATED}
+                                  for index in range(1, counts['city'] + 1))
+    yield models.Address.__table__, ({'address_id': index, 'address': '{} Main Street'.format(index),
+                                      'district': 'District', 'city_id': rng.randint(1, counts['city']),
+                                      'postal_code': '{:05d}'.format(index), 'phone': '{:010d}'.format(index),
+                                      'last_update': UPDATED}
+                                     for index in range(1, counts['address'] + 1))
+
+    stores = counts['store']
+    yield models.Store.__table__, ({'store_id': index, 'manager_staff_id': index, 'address_id': index,
+                                    'last_update': UPDATED} for index in range(1, stores + 1))
+    yield models.Staff.__table__, ({'staff_id': index, 'first_name': 'Staff', 'last_name': str(index),
+                                    'address_id': stores + index, 'store_id': index, 'active': True,
+                                    'username': 'staff{}'.format(index), 'last_update': UPDATED}
+                                   for index in range(1, stores + 1))
+
+    yield models.Actor.__table__, ({'actor_id': index, 'first_name': 'First{}'.format(index % 97),
+                                    'last_name': 'Last{}'.format(index % 89), 'last_update': UPDATED}
+                                   for index in range(1, counts['actor'] + 1))
+    yield models.Film.__table__, ({'film_id': index, 'title': '{} {}'.format(_sentence(rng, 2), index),
+                                   'description': 'A {} of a {}'.format(_sentence(rng, 3), _sentence(rng, 4)),
+                                   'release_year': 2006, 'language_id': rng.randint(1, 6),
+                                   'rental_duration': rng.randint(3, 7), 'rental_rate': rng.choice(
+                                       [Decimal('0.99'), Decimal('2.99'), Decimal('4.99')]),
+                                   'length': rng.randint(46, 185), 'replacement_cost': Decimal('19.99'),
+                                   'rating': rng.choice(ratings), 'special_features': 'Trailers,Deleted Scenes',
+                                   'last_update': UPDATED}
+                                  for index in range(1, counts['film'] + 1))
+    yield models.film_actor_table, ({'actor_id': actor_id, 'film_id': film_id, 'last_update': UPDATED}
+                                    for film_id in range(1, counts['film'] + 1)
+                                    for actor_id in rng.sample(range(1, counts['actor'] + 1),
+                                                               min(counts['actor'], rng.randint(1, 10))))
+    yield models.film_category_table, ({'film_id': film_id, 'category_id': rng.randint(1, 16),
+                                        'last_update': UPDATED} for film_id in range(1, counts['film'] + 1))
+
+    yield models.Customer.__table__, ({'customer_id': index, 'store_id': rng.randint(1, stores),
+                                       'first_name': 'Customer', 'last_name': str(index),
+                                       'email': 'customer{}@example.com'.format(index),
+                                       'address_id': 2 * stores + index, 'active': True, 'create_date': STARTED,
+                                       'last_update': UPDATED}
+                                      for index in range(1, counts['customer'] + 1))
+    yield models.Inventory.__table__, ({'inventory_id': index, 'film_id': rng.randint(1, counts['film']),
+                                        'store_id': rng.randint(1, stores), 'last_update': UPDATED}
+                                       for index in range(1, counts['inventory'] + 1))
+
+    rental_dates = [STARTED + timedelta(seconds=rng.randint(0, 90 * 24 * 3600)) for _ in range(counts['rental'])]
+    yield models.Rental.__table__, ({'rental_id': index, 'rental_date': rental_date,
+                                     'inventory_id': rng.randint(1, counts['inventory']),
+                                     'customer_id': rng.randint(1, counts['customer']),
+                                     'return_date': rental_date + timedelta(days=rng.randint(1, 9)),
+                                     'staff_id': rng.randint(1, stores), 'last_update': UPDATED}
+                                    for index, rental_date in enumerate(rental_dates, 1))
+    yield models.Payment.__table__, ({'payment_id': index, 'customer_id': rng.randint(1, counts['customer']),
+                                      'staff_id': rng.randint(1, stores), 'rental_id': index,
+                                      'amount': rng.choice([Decimal('0.99'), Decimal('2.99'), Decimal('4.99')]),
+                                      'payment_date': rental_date, 'last_update': UPDATED}
+                                     for index, rental_date in enumerate(rental_dates, 1))
+
+
+def build(url: str, scale: float, seed: int = 0, verbose: bool = False) -> Dict[str, int]:
+    """Recreate all tables of the models and fill them, returns the number of rows per table."""
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    counts = {}
+    started = time.monotonic()
+
+    with engine.begin() as connection:
+        if engine.dialect.name == 'postgresql':
+            # staff and store reference each other with non nullable keys, requires a superuser
+            connection.execute('SET session_replication_role = replica')
+        elif engine.dialect.name == 'sqlite':
+            connection.execute('PRAGMA synchronous = OFF')
+
+        for table, rows in generate(get_counts(scale), seed):
+            counts[table.name] = _insert(connection, table, rows)
+            if verbose:
+                print('{}: {} rows'.format(table.name, counts[table.name]))
+
+    if verbose:
+        print('built in {:.2f}s'.format(time.monotonic() - started))
+
+    engine.dispose()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a synthetic database')
+    parser.add_argument('--url', default='sqlite:///benchmark.sqlite3', help='database URL, all tables are recreated')
+    parser.add_argument('--scale', type=float, default=1.0, help='scale factor, 1 is the size of Sakila sample data')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    build(args.url, args.scale, args.seed, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
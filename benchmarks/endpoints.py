@@ -0,0 +1,253 @@
+"""Measure throughput, latency and queries per request of the API endpoints.
+
+A synthetic database is built for every scale factor (see ``benchmarks/dataset.py``), then each scenario is run
+against ``falconer.app.api`` called in-process and served by gunicorn, by concurrent clients:
+
+    python benchmarks/endpoints.py --scale 0.1 1 --requests 500 --concurrency 8 --output results.json
+
+Results are written as JSON, so that runs can be compared. Queries are counted in-process only.
+
+"""
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy.engine.url import make_url
+
+from benchmarks.dataset import build, get_counts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# scenario: (method, path, query string, body)
+Request = Tuple[str, str, str, bytes]
+
+
+def _actor_body(rng: random.Random) -> bytes:
+    return json.dumps({'first_name': 'Bench{}'.format(rng.randint(1, 1000)), 'last_name': 'Mark'}).encode('utf-8')
+
+
+SCENARIOS = OrderedDict([
+    ('list', lambda rng, counts: ('GET', '/films/', 'page_size=20', b'')),
+    ('deep_page', lambda rng, counts: ('GET', '/films/', 'page_size=20&page={}'.format(
+        max(1, counts['film'] // 20 - rng.randint(0, 4))), b'')),
+    ('sorted', lambda rng, counts: ('GET', '/films/', 'page_size=20&sort=length:desc,title', b'')),
+    ('single', lambda rng, counts: ('GET', '/films/{}'.format(rng.randint(1, counts['film'])), '', b'')),
+    ('create', lambda rng, counts: ('POST', '/actors/', '', _actor_body(rng))),
+    ('update', lambda rng, counts: ('PATCH', '/actors/{}'.format(rng.randint(1, counts['actor'])), '',
+                                    _actor_body(rng))),
+    ('options', lambda rng, counts: ('OPTIONS', '/films/', '', b'')),
+    ('export', lambda rng, counts: ('GET', '/payments/export', 'format=csv', b'')),
+])  # type: Dict[str, Callable[[random.Random, Dict[str, int]], Request]]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest rank percentile of sorted values."""
+    rank = math.ceil(percent * len(values) / 100)
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def run_scenario(send: Callable[[Request], int], make_request: Callable, counts: Dict[str, int], requests: int,
+                 concurrency: int, warmup: int) -> dict:
+    """Send requests from concurrent threads, ``send`` returns the response status code."""
+    def timed(index):
+        request = make_request(random.Random(index), counts)
+        started = time.perf_counter()
+        status = send(request)
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(warmup)))
+
+        started = time.perf_counter()
+        results = list(executor.map(timed, range(warmup, warmup + requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+
+    return OrderedDict([
+        ('requests', requests),
+        ('concurrency', concurrency),
+        ('errors', sum(1 for _, status in results if status >= 400)),
+        ('throughput', requests / elapsed),
+        ('latency_ms', OrderedDict((name, percentile(latencies, percent))
+                                   for name, percent in [('p50', 50), ('p95', 95), ('p99', 99)])),
+    ])
+
+
+def database_env(url: str) -> Dict[str, str]:
+    """Environment variables read by ``falconer.db.utils.get_url``."""
+    url = make_url(url)
+    env = {
+        'DB_DRIVER_NAME': url.drivername,
+        'DB_USERNAME': url.username,
+        'DB_PASSWORD': url.password,
+        'DB_HOST': url.host,
+        'DB_PORT': str(url.port) if url.port else None,
+        'DB_NAME': url.database,
+    }
+
+    return {key: value for key, value in env.items() if value}
+
+
+def _run_in_process(url: str, counts: Dict[str, int], scenarios: List[str], requests: int, concurrency: int,
+                    warmup: int) -> Dict[str, dict]:
+    # runs in a fresh process, the application is configured when imported
+    os.environ.update(database_env(url))
+
+    from falcon import testing
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from falconer.app import api
+
+    queries = [0]
+    lock = threading.Lock()
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        with lock:
+            queries[0] += 1
+
+    def send(request):
+        method, path, query_string, body = request
+        return testing.simulate_request(api, method, path, query_string=query_string or None, body=body or None,
+                                        headers={'Content-Type': 'application/json'}).status_code
+
+    results = OrderedDict()
+    for name in scenarios:
+        queries[0] = 0
+        result = run_scenario(send, SCENARIOS[name], counts, requests, concurrency, warmup)
+        result['queries_per_request'] = queries[0] / (requests + warmup)
+        results[name] = result
+
+    return results
+
+
+def _wait_for_port(server: subprocess.Popen, port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+
+    raise RuntimeError('gunicorn did not start listening on port {}'.format(port))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _run_gunicorn(url: str, counts: Dict[str, int], scenarios: List[str], requests: int, concurrency: int,
+                  warmup: int, workers: int) -> Dict[str, dict]:
+    port = _free_port()
+
+    env = dict(os.environ, **database_env(url))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn.app.wsgiapp', '--config', os.path.join(ROOT, 'gunicorn.conf.py'),
+         '--preload', '--workers', str(workers), '--bind', '127.0.0.1:{}'.format(port), '--log-level', 'warning',
+         'falconer.app'],
+        cwd=ROOT, env=env)
+
+    def send(request):
+        method, path, query_string, body = request
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        try:
+            connection.request(method, path + ('?' + query_string if query_string else ''), body=body or None,
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    try:
+        _wait_for_port(server, port)
+        return OrderedDict((name, run_scenario(send, SCENARIOS[name], counts, requests, concurrency, warmup))
+                           for name in scenarios)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark API endpoints')
+    parser.add_argument('--scale', type=float, nargs='+', default=[0.1, 1.0], help='scale factors of the database')
+    parser.add_argument('--url', default=None,
+                        help='database URL, all tables are recreated (default: a SQLite file per scale factor)')
+    parser.add_argument('--modes', nargs='+', choices=['inprocess', 'gunicorn'], default=['inprocess', 'gunicorn'])
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=500, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--output', default=None, help='JSON file with results (default: standard output)')
+    args = parser.parse_args()
+
+    report = OrderedDict([
+        ('started_at', datetime.utcnow().isoformat()),
+        ('commit', _git_commit()),
+        ('python', platform.python_version()),
+        ('arguments', vars(args)),
+        ('results', []),
+    ])
+
+    # the application reads its configuration when imported, so every in-process run gets a new interpreter
+    context = multiprocessing.get_context('spawn')
+
+    for scale in args.scale:
+        url = args.url or 'sqlite:///{}'.format(os.path.abspath('benchmark-{}.sqlite3'.format(scale)))
+        counts = get_counts(scale)
+        print('building database, scale {}'.format(scale), file=sys.stderr)
+        rows = build(url, scale)
+
+        for mode in args.modes:
+            print('running {} scenarios, scale {}'.format(mode, scale), file=sys.stderr)
+            scenario_args = (url, counts, args.scenarios, args.requests, args.concurrency, args.warmup)
+            if mode == 'inprocess':
+                with context.Pool(1) as pool:
+                    results = pool.apply(_run_in_process, scenario_args)
+            else:
+                results = _run_gunicorn(*scenario_args, workers=args.workers)
+
+            for name, result in results.items():
+                report['results'].append(OrderedDict([('scale', scale), ('rows', sum(rows.values())),
+                                                      ('mode', mode), ('scenario', name)] + list(result.items())))
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
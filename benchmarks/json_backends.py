@@ -0,0 +1,79 @@
+"""Compare JSON backends on schema dumps of films and payments.
+
+Objects are built in memory, so no database is needed:
+
+    python benchmarks/json_backends.py --rows 1000 --repeat 20
+
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from falconer.codecs import available_codecs
+from falconer.models import Customer, Film, Language, Payment, Rental, Staff
+from falconer.schemas.business import PaymentSchema
+from falconer.schemas.inventory import FilmSchema
+
+
+def make_films(rows):
+    language = Language(id=1, name='English')
+    ratings = list(Film.MpaaRating)
+
+    return [
+        Film(id=index, title='Film {}'.format(index), description='A ' * 50, release_year=2006, language=language,
+             rental_duration=3, rental_rate=Decimal('4.99'), length=90 + index % 60,
+             replacement_cost=Decimal('19.99'), rating=ratings[index % len(ratings)],
+             special_features='Trailers,Deleted Scenes', last_update=datetime(2006, 2, 15, 5, 3, 42))
+        for index in range(1, rows + 1)
+    ]
+
+
+def make_payments(rows):
+    customer, staff = Customer(id=1), Staff(id=1)
+    started = datetime(2005, 5, 25, 11, 30, 37)
+
+    return [
+        Payment(id=index, customer=customer, staff=staff, rental=Rental(id=index), amount=Decimal('2.99'),
+                payment_date=started + timedelta(minutes=index), last_update=datetime(2006, 2, 15, 22, 12, 30))
+        for index in range(1, rows + 1)
+    ]
+
+
+def measure(function, repeat):
+    """Best run time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON backends')
+    parser.add_argument('--rows', type=int, default=1000, help='objects per dump')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per measurement, the best one is reported')
+    args = parser.parse_args()
+
+    for name, schema, objects in [('films', FilmSchema(many=True), make_films(args.rows)),
+                                  ('payments', PaymentSchema(many=True), make_payments(args.rows))]:
+        data = schema.dump(objects).data
+        print('{}: {} rows, schema dump {:.2f} ms'.format(name, args.rows, measure(lambda: schema.dump(objects),
+                                                                                     args.repeat)))
+
+        for codec in available_codecs():
+            encoded = codec.dumps(data)
+            assert codec.loads(encoded) == data
+
+            print('  {:<10} dumps {:7.2f} ms  pretty {:7.2f} ms  loads {:7.2f} ms  {:>8} bytes'.format(
+                codec.name,
+                measure(lambda: codec.dumps(data), args.repeat),
+                measure(lambda: codec.dumps(data, pretty=True), args.repeat),
+                measure(lambda: codec.loads(encoded), args.repeat),
+                len(encoded)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Compare the speed of compiled serializers and marshmallow.
+
+Objects of every resource are read from a synthetic database (see ``benchmarks/dataset.py``) as the resources read
+them and dumped by both:
+
+    python benchmarks/serializers.py --scale 0.1 --rows 1000 --repeat 20
+
+Both dump exactly the same output, which is checked by ``tests/test_compiled_serializers.py``.
+
+"""
+import argparse
+import os
+import time
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from benchmarks.dataset import build
+from falconer.db.loading import plan_loading
+from falconer.schemas.business import PaymentSchema, RentalSchema, StaffSchema, StoreSchema
+from falconer.schemas.compiled import get_serializer
+from falconer.schemas.inventory import ActorSchema, FilmSchema
+
+SCHEMAS = [ActorSchema, FilmSchema, StaffSchema, StoreSchema, PaymentSchema, RentalSchema]
+
+
+def load(session, schema, rows, foreign_keys):
+    model_cls = schema.opts.model
+    options = plan_loading(model_cls, schema, schema.context.get('include', ()), foreign_keys=foreign_keys)
+    primary_key = inspect(model_cls).primary_key[0]
+
+    query = session.query(model_cls).options(*options).order_by(primary_key)
+    return query.limit(rows).all() if schema.many else query.first()
+
+
+def measure(function, repeat):
+    """Best run time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare compiled serializers with marshmallow')
+    parser.add_argument('--url', default=None,
+                        help='database URL, all tables are recreated (default: a SQLite file in the current directory)')
+    parser.add_argument('--scale', type=float, default=0.1, help='scale factor of the database')
+    parser.add_argument('--rows', type=int, default=1000, help='objects per dump')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per measurement, the best one is reported')
+    args = parser.parse_args()
+
+    url = args.url or 'sqlite:///{}'.format(os.path.abspath('benchmark-{}.sqlite3'.format(args.scale)))
+    build(url, args.scale)
+    engine = create_engine(url)
+
+    for schema_cls in SCHEMAS:
+        schema = schema_cls(many=True)
+        serializer = get_serializer(schema)
+        with engine.connect() as connection:
+            objects = load(Session(bind=connection), schema, args.rows, foreign_keys=False)
+
+            marshmallow_time = measure(lambda: schema.dump(objects), args.repeat)
+            compiled_time = measure(lambda: serializer.dump_many(objects), args.repeat)
+
+        print('{}: {} rows, marshmallow {:.2f} ms, compiled {:.2f} ms ({:.1f}x)'.format(
+            schema_cls.__name__, len(objects), marshmallow_time, compiled_time, marshmallow_time / compiled_time))
+
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
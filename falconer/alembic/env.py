@@ -1,10 +1,9 @@
 from alembic import context
-from sqlalchemy import create_engine
 from logging.config import fileConfig
 
 from falconer.models import *
 from falconer.db.model import Base
-from falconer.db.utils import get_url
+from falconer.db.utils import get_engine, get_url
 
 config = context.config
 
@@ -39,7 +38,7 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = create_engine(get_url())
+    connectable = get_engine()
 
     with connectable.connect() as connection:
         context.configure(connection=connection, target_metadata=target_metadata)
@@ -1,26 +1,60 @@
+from collections import OrderedDict
 from wsgiref import simple_server
 
 import falcon
 
+from falconer import settings
+from falconer.cache import ResponseCache
+from falconer.counting import CountCache
 from falconer.db.utils import get_scoped_session_factory
-from falconer.middlewares import SessionMiddleware
+from falconer.instrumentation import MetricsResource, create_registry
+from falconer.middlewares import (CompressionMiddleware, DiagnosticsMiddleware, InstrumentationMiddleware,
+                                  SessionMiddleware)
+from .resources.base import add_related_routes, add_routes
+from .resources.business import PaymentResource, RentalResource, StaffResource, StoreResource
+from .resources.discovery import DiscoveryResource
 from .resources.inventory import ActorResource, FilmResource
 
 Session = get_scoped_session_factory()
 
-api = application = falcon.API(middleware=[SessionMiddleware(Session)])
+cache = None
+if settings.RESPONSE_CACHE_SIZE:
+    cache = ResponseCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL, settings.RESPONSE_CACHE_MAX_BYTES)
+    cache.track(Session.session_factory)
 
-actor = ActorResource()
-api.add_route('/actors/', actor)
-api.add_route('/actors/{resource_id:int}', actor)
+counts = CountCache(settings.COUNT_CACHE_SIZE, settings.COUNT_CACHE_TTL)
+counts.track(Session.session_factory)
 
-film = FilmResource()
-api.add_route('/films/', film)
-api.add_route('/films/{resource_id:int}', film)
+metrics = create_registry() if settings.INSTRUMENTATION else None
 
-staff = FilmResource()
-api.add_route('/staffs/', staff)
-api.add_route('/staffs/{resource_id:int}', staff)
+middleware = [CompressionMiddleware(cache, settings.COMPRESSION_MIN_SIZE, settings.COMPRESSION_LEVEL)]
+if metrics is not None:
+    middleware.append(InstrumentationMiddleware(metrics))
+if settings.DIAGNOSTICS:
+    middleware.append(DiagnosticsMiddleware(settings.N_PLUS_ONE_THRESHOLD, settings.DIAGNOSTICS == 'strict',
+                                            settings.SLOW_QUERY_THRESHOLD))
+middleware.append(SessionMiddleware(Session, settings.READ_YOUR_WRITES_WINDOW))
+
+api = application = falcon.API(middleware=middleware)
+
+if metrics is not None:
+    api.add_route('/metrics', MetricsResource(metrics))
+
+# path prefix -> resource, mappers of the models are inspected once, when resources are created
+resources = OrderedDict([
+    ('/actors', ActorResource(cache=cache, counts=counts)),
+    ('/films', FilmResource(cache=cache, counts=counts)),
+    ('/staffs', StaffResource(cache=cache, counts=counts)),
+    ('/stores', StoreResource(cache=cache, counts=counts)),
+    ('/payments', PaymentResource(cache=cache, counts=counts)),
+    ('/rentals', RentalResource(cache=cache, counts=counts)),
+])
+
+for path, resource in resources.items():
+    add_routes(api, path, resource)
+related_paths = add_related_routes(api, resources)
+
+api.add_route('/', DiscoveryResource(resources, related_paths + (['/metrics'] if metrics is not None else [])))
 
 if __name__ == '__main__':
     httpd = simple_server.make_server('127.0.0.1', 8000, api)
@@ -0,0 +1,216 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+import falcon
+from falcon import Request, Response
+from falcon.util import http_date_to_dt
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from falconer.conditional import set_validators
+
+# response headers describing the representation, stored along with the body
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'X-Next-Cursor', 'X-Total-Count', 'X-Total-Count-Exact',
+                  'X-Missing-Ids')
+
+# rough per entry bookkeeping cost, accounted on top of the stored bytes
+ENTRY_OVERHEAD = 512
+
+# request context key of the cache entry the response body comes from
+CACHED_RESPONSE = 'cached_response'
+
+_CHANGED_MODELS = 'falconer.cache.changed_models'
+
+
+class TaggedCache:
+    """Process local LRU cache with TTL and memory budget, of values tagged with model classes they were built from.
+
+    Entries are dropped as soon as a session commits changes to objects of any of their tags (see ``track``).
+    Sizes of values are measured by ``_measure``, values are not accounted by default.
+
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: float = float('inf')):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # key -> value and its expiry
+        self._entries = OrderedDict()  # type: OrderedDict[Hashable, Tuple[Any, float]]
+        self._tags = {}  # type: Dict[Hashable, frozenset]
+        self._keys_by_tag = defaultdict(set)  # type: Dict[Hashable, Set[Hashable]]
+        self._generations = defaultdict(int)  # type: Dict[Hashable, int]
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def generation(self, tags: Iterable) -> dict:
+        """Get a snapshot of invalidations of the tags, to be passed to ``put`` once the value is built."""
+        with self._lock:
+            return {tag: self._generations[tag] for tag in tags}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, generation: dict) -> bool:
+        """Store the value tagged with the tags of the generation, unless it is stale or too large."""
+        if self._measure(value) > self.max_bytes:
+            return False
+
+        with self._lock:
+            if any(self._generations[tag] != count for tag, count in generation.items()):
+                # data changed while the value was being built, it may be stale already
+                return False
+
+            if key in self._entries:
+                self._remove(key)
+
+            tags = frozenset(generation)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._tags[key] = tags
+            for tag in tags:
+                self._keys_by_tag[tag].add(key)
+            self._size += self._measure(value)
+
+            self._evict()
+
+        return True
+
+    def invalidate(self, tags: Iterable):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] += 1
+                for key in list(self._keys_by_tag.pop(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def track(self, session_factory: sessionmaker):
+        """Invalidate entries tagged with classes of objects written by sessions of the factory once committed."""
+        # written classes are collected once per session, whichever caches track the factory
+        for name, listener in _COLLECTORS:
+            if not event.contains(session_factory, name, listener):
+                event.listen(session_factory, name, listener)
+
+        @event.listens_for(session_factory, 'after_commit')
+        def invalidate_committed(session):
+            changed = session.info.get(_CHANGED_MODELS)
+            if changed:
+                self.invalidate(changed)
+
+    def _measure(self, value) -> int:
+        return 0
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._size -= self._measure(value)
+        for tag in self._tags.pop(key):
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class CachedResponse:
+    def __init__(self, key: Hashable, body: bytes, headers: Dict[str, str]):
+        self.key = key
+        self.body = body
+        self.headers = headers
+        # content coding -> compressed body
+        self.variants = {}  # type: Dict[str, bytes]
+
+    @property
+    def size(self) -> int:
+        return ENTRY_OVERHEAD + len(self.body) + sum(len(name) + len(value) for name, value in self.headers.items()) + \
+            sum(len(variant) for variant in self.variants.values())
+
+    def apply(self, req: Request, resp: Response):
+        for name, value in self.headers.items():
+            resp.set_header(name, value)
+
+        etag = self.headers.get('ETag')
+        if etag is not None:
+            last_modified = self.headers.get('Last-Modified')
+            if set_validators(req, resp, etag, http_date_to_dt(last_modified) if last_modified else None):
+                return
+
+        resp.data = self.body
+        resp.status = falcon.HTTP_200
+        req.context[CACHED_RESPONSE] = self
+
+
+class ResponseCache(TaggedCache):
+    """Process local LRU cache of serialized responses with TTL and memory budget, see ``TaggedCache``."""
+
+    @staticmethod
+    def make_key(name: str, resource_id, req: Request) -> tuple:
+        params = tuple(sorted((key, tuple(value) if isinstance(value, list) else value)
+                              for key, value in req.params.items()))
+
+        return name, resource_id, params
+
+    def set(self, key, resp: Response, generation: dict) -> Optional[CachedResponse]:
+        body = resp.data if resp.data is not None else resp.body.encode('utf-8')
+        headers = {name: resp.get_header(name) for name in CACHED_HEADERS if resp.get_header(name) is not None}
+        entry = CachedResponse(key, body, headers)
+
+        return entry if self.put(key, entry, generation) else None
+
+    def add_variant(self, entry: CachedResponse, coding: str, body: bytes):
+        """Store a compressed body along with the entry, so that it is compressed once rather than on every hit."""
+        with self._lock:
+            stored = self._entries.get(entry.key)
+            if stored is None or stored[0] is not entry or coding in entry.variants:
+                return
+
+            entry.variants[coding] = body
+            self._size += len(body)
+            self._evict()
+
+    def _measure(self, value: CachedResponse) -> int:
+        return value.size
+
+
+def _collect_flushed(session, flush_context):
+    changed = session.info.setdefault(_CHANGED_MODELS, set())
+    changed.update(type(obj) for obj in itertools.chain(session.new, session.dirty, session.deleted))
+
+
+def _collect_bulk(update_context):
+    changed = update_context.session.info.setdefault(_CHANGED_MODELS, set())
+    changed.add(update_context.mapper.class_)
+
+
+def _discard_changes(session, transaction):
+    # once committed (and every cache is invalidated) or rolled back
+    if transaction.parent is None:
+        session.info.pop(_CHANGED_MODELS, None)
+
+
+_COLLECTORS = (
+    ('after_flush', _collect_flushed),
+    ('after_bulk_update', _collect_bulk),
+    ('after_bulk_delete', _collect_bulk),
+    ('after_transaction_end', _discard_changes),
+)
@@ -1,11 +1,133 @@
-from enum import Enum
+import abc
+import json
+from typing import Iterable, Iterator
 
-import simplejson as json
+import simplejson
 
+from falconer import settings
 
-class ImprovedJSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Enum):
-            return o.name
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
-        return super(ImprovedJSONEncoder, self).default(o)
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+PRETTY_INDENT = 4
+
+
+class Codec(abc.ABC):
+    """JSON backend encoding compact UTF-8 bytes.
+
+    Encoded values are expected to be native JSON types already (schemas dump enums as names, decimals exactly as
+    strings and dates as such, see ``falconer.schemas.fields``), so backends are never called back for unknown objects.
+
+    """
+    name: str = None
+
+    def dumps(self, obj, pretty: bool = False) -> bytes:
+        if pretty:
+            # meant to be read by humans, formatted the same way whatever the backend is
+            return simplejson.dumps(obj, indent=PRETTY_INDENT, ensure_ascii=False).encode('utf-8')
+
+        return self._dumps(obj)
+
+    def load(self, stream):
+        return self.loads(stream.read())
+
+    @abc.abstractmethod
+    def loads(self, data):
+        """Decode bytes or text, raises ValueError if it is not a valid JSON document."""
+
+    @abc.abstractmethod
+    def _dumps(self, obj) -> bytes:
+        """Encode compactly."""
+
+
+class OrjsonCodec(Codec):
+    name = 'orjson'
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def _dumps(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+class UjsonCodec(Codec):
+    name = 'ujson'
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def _dumps(self, obj):
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+
+class SimplejsonCodec(Codec):
+    name = 'simplejson'
+
+    def loads(self, data):
+        return simplejson.loads(data)
+
+    def _dumps(self, obj):
+        return simplejson.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class StdlibCodec(Codec):
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def _dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+# fastest first
+BACKENDS = [(orjson, OrjsonCodec), (ujson, UjsonCodec), (simplejson, SimplejsonCodec), (json, StdlibCodec)]
+
+
+def available_codecs() -> Iterator[Codec]:
+    return (codec_cls() for module, codec_cls in BACKENDS if module is not None)
+
+
+def get_codec(name: str = None) -> Codec:
+    """Get the named backend, or the fastest one installed."""
+    for codec in available_codecs():
+        if not name or codec.name == name:
+            return codec
+
+    raise ValueError('JSON backend {} is not available.'.format(name))
+
+
+codec = get_codec(settings.JSON_BACKEND)
+
+
+def iterencode_array(items: Iterable, pretty: bool = False) -> Iterator[bytes]:
+    """Encode items one by one as a JSON array.
+
+    The concatenated chunks are the same as the output of ``codec.dumps(list(items), pretty=pretty)``.
+
+    """
+    if pretty:
+        opening, separator, closing = b'[\n', b',\n', b'\n]'
+        prefix = b' ' * PRETTY_INDENT
+    else:
+        opening, separator, closing = b'[', b',', b']'
+        prefix = b''
+
+    empty = True
+
+    for item in items:
+        serialized = codec.dumps(item, pretty=pretty)
+        if prefix:
+            serialized = b'\n'.join(prefix + line for line in serialized.split(b'\n'))
+
+        yield (opening if empty else separator) + serialized
+        empty = False
+
+    yield b'[]' if empty else closing
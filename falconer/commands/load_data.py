@@ -1,12 +1,20 @@
 import argparse
 import csv
+import enum
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Callable, Dict, Iterator, List
 
-from sqlalchemy import Table
+from sqlalchemy import Boolean, DateTime, Enum, Integer, Numeric, Table
+from sqlalchemy.engine import Connection, Engine
 
-from falconer.db.utils import session_scope
+from falconer.db.utils import dispose_engines, get_engine
 from falconer import models
-from falconer.models import Film
 
 FILES = {
     'actor': models.Actor,
@@ -26,40 +34,210 @@ FILES = {
     'store': models.Store,
 }
 
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SQLITE_LOAD_PRAGMAS = ['PRAGMA synchronous = OFF', 'PRAGMA journal_mode = MEMORY']
+
+
+def _get_table(model) -> Table:
+    return model if isinstance(model, Table) else model.__table__
+
+
+def _nullable(convert: Callable) -> Callable:
+    """Empty values are NULLs, others are converted and raise ValueError (or InvalidOperation) if invalid."""
+    def convert_or_none(value):
+        return convert(value) if value else None
+
+    return convert_or_none
+
+
+def _parse_datetime(value):
+    # fractions of seconds are exported only if there are any
+    return datetime.strptime(value, DATETIME_FORMAT + '.%f' if '.' in value else DATETIME_FORMAT)
+
+
+def _parse_boolean(value):
+    return value.lower() in ('1', 't', 'true')
+
+
+def _get_converter(column) -> Callable:
+    """Get a function converting CSV values to values of the column, chosen once per column instead of per cell."""
+    column_type = column.type
+
+    if isinstance(column_type, Boolean):
+        return _parse_boolean
+    if isinstance(column_type, Integer):
+        return _nullable(int)
+    if isinstance(column_type, DateTime):
+        return _nullable(_parse_datetime)
+    if isinstance(column_type, Numeric):
+        return _nullable(Decimal)
+    if isinstance(column_type, Enum) and column_type.enum_class is not None:
+        return _nullable(column_type.enum_class)
+
+    return lambda value: value
+
+
+def _is_in_cycle(table: Table, dependencies: Dict[Table, set]) -> bool:
+    visited = set()
+    stack = list(dependencies[table])
+
+    while stack:
+        current = stack.pop()
+        if current is table:
+            return True
+        if current not in visited:
+            visited.add(current)
+            stack.extend(dependencies[current])
+
+    return False
+
+
+def _get_levels(tables: List[Table]) -> List[List[Table]]:
+    """Group tables in levels, so that tables of a level only reference tables of previous levels.
+
+    Foreign key cycles are broken by loading first the table of the cycle with fewest unresolved dependencies.
+
+    """
+    pending = {
+        table: {key.column.table for key in table.foreign_keys if key.column.table in tables} - {table}
+        for table in tables
+    }
+    levels = []
+
+    while pending:
+        level = [table for table, dependencies in pending.items() if not dependencies]
+        if not level:
+            in_cycle = [table for table in pending if _is_in_cycle(table, pending)]
+            level = [min(in_cycle, key=lambda table: (len(pending[table]), table.name))]
+            print('foreign key cycle, loading {} before {}'.format(
+                level[0].name, ', '.join(sorted(table.name for table in pending[level[0]]))))
+
+        for table in level:
+            del pending[table]
+        for dependencies in pending.values():
+            dependencies.difference_update(level)
+
+        levels.append(sorted(level, key=lambda table: table.name))
+
+    return levels
+
 
 class Command:
     def __init__(self):
         parser = argparse.ArgumentParser(description='Load data')
-        # parser.add_argument()  # TODO: data files paths
-        parser.parse_args()
+        parser.add_argument('--data-dir', default='data', help='directory with <table name>.csv files')
+        parser.add_argument('--tables', nargs='+', choices=sorted(FILES), default=sorted(FILES),
+                            help='tables to load')
+        parser.add_argument('--batch-size', type=int, default=5000, help='rows inserted at once')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='tables loaded in parallel (always 1 for SQLite)')
+        parser.add_argument('--copy', action='store_true', help='use COPY on PostgreSQL')
+        self.args = parser.parse_args()
 
-    def _convert_type(self, key, value):
-        if key.endswith('_id'):
-            try:
-                return int(value)
-            except ValueError:
+    def _read_batches(self, table: Table, csv_file) -> Iterator[List[Dict]]:
+        reader = csv.reader(csv_file)
+        header = next(reader)
+
+        converters = [
+            (index, key, _get_converter(table.c[key])) for index, key in enumerate(header) if key
+        ]
+
+        def convert_row(row):
+            if len(row) != len(header):
+                print('{}.csv, line {}: {} values instead of {}, skipped'.format(table.name, reader.line_num,
+                                                                               len(row), len(header)))
                 return None
-        if key == 'last_update' or key.endswith('_date'):
             try:
-                return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                return None
-        if key == 'rating':
-            return Film.MpaaRating(value)
+                return {key: convert(row[index]) for index, key, convert in converters}
+            except (ValueError, InvalidOperation):
+                return self._convert_invalid_row(table, reader.line_num, row, converters)
+
+        rows = (values for values in map(convert_row, reader) if values is not None)
+
+        while True:
+            batch = list(islice(rows, self.args.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _convert_invalid_row(self, table: Table, line: int, row: List[str], converters) -> Dict:
+        """Convert a row with invalid values, which are reported and loaded as NULLs."""
+        values = {}
+
+        for index, key, convert in converters:
+            try:
+                values[key] = convert(row[index])
+            except (ValueError, InvalidOperation):
+                print('{}.csv, line {}: invalid {} value {!r}, loaded as NULL'.format(table.name, line, key,
+                                                                                       row[index]))
+                values[key] = None
+
+        return values
+
+    def _insert(self, connection: Connection, table: Table, batch: List[Dict]):
+        connection.execute(table.insert(), batch)
+
+    def _copy(self, connection: Connection, table: Table, batch: List[Dict]):
+        keys = list(batch[0])
 
-        return value
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            # database enum labels are names of the members
+            writer.writerow([value.name if isinstance(value, enum.Enum) else value
+                             for value in (row[key] for key in keys)])
+        buffer.seek(0)
+
+        statement = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(table.name, ', '.join(keys))
+
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+    def _load(self, engine: Engine, table: Table) -> int:
+        started = time.monotonic()
+        count = 0
+
+        write = self._copy if self.args.copy and engine.dialect.name == 'postgresql' else self._insert
+        path = os.path.join(self.args.data_dir, '{}.csv'.format(table.name))
+
+        with engine.connect() as connection, open(path, newline='') as csv_file:
+            if engine.dialect.name == 'sqlite':
+                for pragma in SQLITE_LOAD_PRAGMAS:
+                    connection.execute(pragma)
+
+            with connection.begin():
+                for batch in self._read_batches(table, csv_file):
+                    write(connection, table, batch)
+                    count += len(batch)
+
+        elapsed = time.monotonic() - started
+        print('{}: {} rows in {:.2f}s ({:.0f} rows/s)'.format(table.name, count, elapsed, count / (elapsed or 1)))
+
+        return count
 
     def run(self):
-        for filename, model in FILES.items():
-            print(filename)
-            with session_scope() as session, open('data/{}.csv'.format(filename)) as csv_file:
-                reader = csv.DictReader(csv_file)
+        engine = get_engine()
+
+        # SQLite allows a single writer at a time
+        workers = 1 if engine.dialect.name == 'sqlite' else max(self.args.workers or 1, 1)
+
+        tables = [_get_table(FILES[name]) for name in self.args.tables]
+
+        started = time.monotonic()
+        count = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for level in _get_levels(tables):
+                count += sum(executor.map(lambda table: self._load(engine, table), level))
 
-                table = model if isinstance(model, Table) else model.__table__
+        elapsed = time.monotonic() - started
+        print('total: {} rows in {:.2f}s ({:.0f} rows/s)'.format(count, elapsed, count / (elapsed or 1)))
 
-                session.execute(table.insert(), [
-                    {key: self._convert_type(key, value) for key, value in row.items() if key} for row in reader
-                ])
+        dispose_engines()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,109 @@
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _gzip_compressor(level: int):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _deflate_compressor(level: int):
+    # "deflate" content coding is the zlib format (RFC 7230, section 4.2.2)
+    return zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS)
+
+
+def _zstd_compressor(level: int):
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+# content coding -> factory of incremental compressors taking the level, preferred ones first
+COMPRESSORS = {}  # type: Dict[str, Callable]
+if brotli is not None:
+    COMPRESSORS['br'] = _BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = _zstd_compressor
+COMPRESSORS['gzip'] = _gzip_compressor
+COMPRESSORS['deflate'] = _deflate_compressor
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    qualities = {}
+
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[coding] = quality
+
+    return qualities
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Choose the content coding of a response out of ones accepted by the client, None means identity."""
+    if not accept_encoding:
+        return None
+
+    qualities = _parse_accept_encoding(accept_encoding)
+    default = qualities.get('*', 0.0)
+
+    best, best_quality = None, 0.0
+    for coding in COMPRESSORS:
+        quality = qualities.get(coding, default)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+
+    return best
+
+
+def compress(coding: str, data: bytes, level: int) -> bytes:
+    compressor = COMPRESSORS[coding](level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(coding: str, chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    """Compress chunks as they come, memory use does not depend on the length of the stream."""
+    compressor = COMPRESSORS[coding](level)
+
+    try:
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+
+        yield compressor.flush()
+    finally:
+        # servers close the outermost iterable only, e.g. when the client disconnects
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,84 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+import falcon
+from falcon import Request, Response
+
+
+def digest_etag(body: bytes) -> str:
+    """Weak ETag of a body, weak as content codings change the bytes but not the representation."""
+    return 'W/"{}"'.format(hashlib.sha1(body).hexdigest())
+
+
+def _opaque_tag(etag: str) -> str:
+    # If-None-Match uses the weak comparison, so the weakness indicator does not matter
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def settled(last_modified: datetime) -> Optional[datetime]:
+    """Get the modification date unless it is within the current second (or later), None otherwise.
+
+    HTTP dates have a one second resolution, so another change within the same second would not change the date, and
+    clients validating the representation with If-Modified-Since would keep the first one.
+
+    """
+    if last_modified is None or last_modified >= datetime.utcnow().replace(microsecond=0):
+        return None
+
+    return last_modified
+
+
+def is_not_modified(req: Request, etag: str, last_modified: datetime = None) -> bool:
+    """Evaluate If-None-Match and If-Modified-Since preconditions of a GET request."""
+    if_none_match = req.get_header('If-None-Match')
+    if if_none_match is not None:
+        # If-Modified-Since must be ignored when If-None-Match is present
+        tags = {_opaque_tag(tag.strip()) for tag in if_none_match.split(',')}
+        return '*' in tags or _opaque_tag(etag) in tags
+
+    if last_modified is not None:
+        try:
+            if_modified_since = req.if_modified_since
+        except falcon.HTTPInvalidHeader:
+            # invalid dates must be ignored
+            return False
+
+        # HTTP dates have a one second resolution
+        return if_modified_since is not None and last_modified.replace(microsecond=0) <= if_modified_since
+
+    return False
+
+
+def set_validators(req: Request, resp: Response, etag: str, last_modified: datetime = None) -> bool:
+    """Set validator headers and respond with 304 Not Modified if the client already has the representation.
+
+    Returns True if the response is complete.
+
+    """
+    resp.etag = etag
+    if last_modified is not None:
+        resp.last_modified = last_modified
+
+    if is_not_modified(req, etag, last_modified):
+        resp.status = falcon.HTTP_304
+        return True
+
+    return False
+
+
+class StaticDocument:
+    """Body computed once, served with the digest of the body as ETag and allowed to be cached for ``max_age``."""
+
+    def __init__(self, body: bytes, max_age: int):
+        self.body = body
+        self.etag = digest_etag(body)
+        self.cache_control = ['public', 'max-age={}'.format(max_age)]
+
+    def respond(self, req: Request, resp: Response):
+        resp.cache_control = self.cache_control
+        if set_validators(req, resp, self.etag):
+            return
+
+        resp.data = self.body
+        resp.status = falcon.HTTP_200
@@ -0,0 +1,83 @@
+"""Total counts of collections, reported in ``X-Total-Count`` headers.
+
+Counting all rows of a large table (or all rows matching a broad filter) costs as much as reading them, so:
+
+* counts are cached per model until a write to the model is committed (see ``TaggedCache.track``) or they expire,
+* unfiltered counts of tables the database estimates above a threshold are reported as estimates,
+* filtered rows are counted exactly up to a limit, broader filters are estimated by the planner of the database if it
+  can, otherwise the limit is reported as a lower bound.
+
+"""
+from typing import Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from falconer.cache import TaggedCache
+
+
+class Count(NamedTuple('Count', [('value', int), ('exact', bool)])):
+    """Number of rows, ``exact`` is False for estimates and lower bounds."""
+
+
+def _estimate_postgresql_table(connection: Connection, table: Table) -> Optional[int]:
+    # planner statistics, updated by VACUUM and ANALYZE
+    estimate = connection.execute(text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)'),
+                                  name=table.fullname).scalar()
+
+    # -1 if the table has never been analyzed
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a select, executed (and its parameters bound) like any other statement."""
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return 'EXPLAIN (FORMAT JSON) ' + compiler.process(element.statement, **kwargs)
+
+
+def _estimate_postgresql_rows(connection: Connection, statement: Select, params: dict) -> Optional[int]:
+    # statements explained are cached already, their explanations would only push them out of the cache
+    plan = connection.execution_options(compiled_cache=None).execute(Explain(statement), params).scalar()
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+# dialect name -> estimate of rows of a table
+TABLE_ESTIMATORS = {
+    'postgresql': _estimate_postgresql_table,
+}  # type: Dict[str, Callable[[Connection, Table], Optional[int]]]
+
+# dialect name -> estimate of rows selected by a statement
+ROWS_ESTIMATORS = {
+    'postgresql': _estimate_postgresql_rows,
+}  # type: Dict[str, Callable[[Connection, Select, dict], Optional[int]]]
+
+
+def estimate_table(connection: Connection, table: Table) -> Optional[int]:
+    estimator = TABLE_ESTIMATORS.get(connection.dialect.name)
+
+    return estimator(connection, table) if estimator is not None else None
+
+
+def estimate_rows(connection: Connection, statement: Select, params: dict) -> Optional[int]:
+    estimator = ROWS_ESTIMATORS.get(connection.dialect.name)
+
+    return estimator(connection, statement, params) if estimator is not None else None
+
+
+class CountCache(TaggedCache):
+    """Process local LRU cache of counts with TTL, tagged with their model class, see ``TaggedCache``.
+
+    Other processes do not invalidate the counts of this one, the TTL bounds how stale they get.
+
+    """
@@ -0,0 +1,114 @@
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Type
+
+from marshmallow import Schema
+from sqlalchemy import bindparam, inspect, select
+from sqlalchemy import orm
+from sqlalchemy.orm import RelationshipProperty
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.orm.interfaces import MANYTOONE, MapperOption
+
+from falconer.db.model import Base
+
+STRATEGIES = {
+    'joined': orm.joinedload,
+    'subquery': orm.subqueryload,
+    # selectinload is available since SQLAlchemy 1.2
+    'selectin': getattr(orm, 'selectinload', orm.subqueryload),
+    'lazy': orm.lazyload,
+    'noload': orm.noload,
+    'raise': orm.raiseload,
+}
+
+
+def dumped_attributes(schema: Schema) -> set:
+    """Get names of object attributes the schema reads when dumping."""
+    return {field.attribute or name for name, field in schema.fields.items() if not field.load_only}
+
+
+@lru_cache(maxsize=None)
+def collection_attributes(model_cls: Type[Base]) -> FrozenSet[str]:
+    """Get names of relationships of the model holding collections (one to many and many to many)."""
+    return frozenset(relationship.key for relationship in inspect(model_cls).relationships if relationship.uselist)
+
+
+def foreign_key(relationship: RelationshipProperty) -> Optional[str]:
+    """Get the attribute holding the primary key of the related object of a many to one relationship.
+
+    None if there is no such attribute, e.g. the relationship is not a many to one or the key is composite.
+
+    """
+    if relationship.direction is not MANYTOONE or len(relationship.local_remote_pairs) != 1:
+        return None
+
+    local, remote = relationship.local_remote_pairs[0]
+    related_primary_key = relationship.mapper.primary_key
+    if len(related_primary_key) != 1 or remote is not related_primary_key[0]:
+        return None
+
+    try:
+        return relationship.parent.get_property_by_column(local).key
+    except UnmappedColumnError:
+        return None
+
+
+def related_criteria(relationship: RelationshipProperty):
+    """Build a WHERE clause of objects of a collection of the parent whose primary key is bound as ``parent_id``.
+
+    Collections kept in secondary tables are selected with a subquery of the table. None if the collection does not
+    refer to the parent by a single primary key column.
+
+    """
+    if not relationship.uselist or len(relationship.parent.primary_key) != 1:
+        return None
+
+    parent_key = relationship.parent.primary_key[0]
+    if relationship.secondary is None:
+        if len(relationship.local_remote_pairs) != 1 or relationship.local_remote_pairs[0][0] is not parent_key:
+            return None
+        return relationship.local_remote_pairs[0][1] == bindparam('parent_id')
+
+    if len(relationship.synchronize_pairs) != 1 or len(relationship.secondary_synchronize_pairs) != 1 or \
+            relationship.synchronize_pairs[0][0] is not parent_key:
+        return None
+
+    secondary_parent_key = relationship.synchronize_pairs[0][1]
+    related_key, secondary_related_key = relationship.secondary_synchronize_pairs[0]
+
+    return related_key.in_(select([secondary_related_key]).where(secondary_parent_key == bindparam('parent_id')))
+
+
+def plan_loading(model_cls: Type[Base], schema: Schema, include: Iterable[str] = (),
+                 overrides: Dict[str, str] = None, foreign_keys: bool = False) -> List[MapperOption]:
+    """Get loader options making a dump of the model with the schema take a bounded number of queries.
+
+    Relationships the schema does not dump are never loaded, scalar ones are joined to the main query and collections
+    are loaded with one additional query. When dumping many objects collections are skipped unless included.
+    Strategies for particular relationships may be overridden with any of ``STRATEGIES`` keys.
+
+    With ``foreign_keys`` scalar relationships having a foreign key attribute are not loaded at all, compiled
+    serializers (see ``falconer.schemas.compiled``) dump the foreign key instead of the related object.
+
+    """
+    attributes = dumped_attributes(schema)
+    overrides = overrides or {}
+
+    options = []
+
+    for relationship in inspect(model_cls).relationships:
+        key = relationship.key
+
+        if key in overrides:
+            strategy = overrides[key]
+        elif key not in attributes:
+            strategy = 'raise'
+        elif not relationship.uselist:
+            strategy = 'raise' if foreign_keys and foreign_key(relationship) else 'joined'
+        elif schema.many and key not in include:
+            strategy = 'noload'
+        else:
+            strategy = 'selectin'
+
+        options.append(STRATEGIES[strategy](key))
+
+    return options
@@ -0,0 +1,61 @@
+import itertools
+import threading
+from typing import List
+
+from sqlalchemy import orm
+from sqlalchemy.engine import Engine
+
+ROUND_ROBIN = 'round_robin'
+LEAST_CONNECTIONS = 'least_connections'
+
+
+class ReplicaSet:
+    """Engines of read replicas along with the strategy of choosing one of them."""
+
+    def __init__(self, engines: List[Engine], strategy: str = ROUND_ROBIN):
+        if strategy not in (ROUND_ROBIN, LEAST_CONNECTIONS):
+            raise ValueError('Unknown replica choosing strategy: {}'.format(strategy))
+
+        self.engines = engines
+        self.strategy = strategy
+
+        self._cycle = itertools.cycle(engines)
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def choose(self) -> Engine:
+        if self.strategy == LEAST_CONNECTIONS:
+            # pools without a size limit do not track checked out connections
+            return min(self.engines, key=lambda engine: getattr(engine.pool, 'checkedout', lambda: 0)())
+
+        with self._lock:
+            return next(self._cycle)
+
+
+class RoutingSession(orm.Session):
+    """Session executing statements of read only sessions on a replica.
+
+    Replicas are used if ``info['use_replica']`` of the session is set. Flushes and locking reads always use the
+    primary bind. A replica is chosen once per session, so that all of its reads see the same snapshot.
+
+    """
+
+    def __init__(self, replicas: ReplicaSet = None, **kwargs):
+        super(RoutingSession, self).__init__(**kwargs)
+        self.replicas = replicas
+        self._replica = None
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.replicas and self.info.get('use_replica') and not self._flushing and \
+                getattr(clause, '_for_update_arg', None) is None:
+            if self._replica is None:
+                self._replica = self.replicas.choose()
+            return self._replica
+
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+    def close(self):
+        super(RoutingSession, self).close()
+        self._replica = None
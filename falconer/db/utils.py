@@ -1,12 +1,18 @@
 import os
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from typing import Dict, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, select
 from sqlalchemy import orm
-from sqlalchemy.engine.url import URL
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import URL, make_url
 
 from falconer.db.model import Base
+from falconer.db.routing import ROUND_ROBIN, ReplicaSet, RoutingSession
+
+_engines = {}  # type: Dict[str, Engine]
+_engines_lock = threading.Lock()
 
 
 def get_url() -> URL:
@@ -26,10 +32,140 @@ def get_url() -> URL:
     )
 
 
+def get_engine_options(url: URL) -> dict:
+    """Get connection pool options.
+
+    Options are extracted from environment variables, only the ones which are set are passed to the engine.
+
+    """
+    options = {}
+
+    if url.get_dialect().name != 'sqlite':
+        # SQLite engines use pools without size limits
+        for option, variable in [('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW'),
+                                 ('pool_timeout', 'DB_POOL_TIMEOUT')]:
+            if os.getenv(variable):
+                options[option] = int(os.getenv(variable))
+
+    if os.getenv('DB_POOL_RECYCLE'):
+        options['pool_recycle'] = int(os.getenv('DB_POOL_RECYCLE'))
+
+    return options
+
+
+def _protect_from_fork(engine: Engine):
+    # connections must not be shared between processes, e.g. gunicorn workers forked from a preloaded application
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        pid = os.getpid()
+        if connection_record.info['pid'] != pid:
+            connection_record.connection = connection_proxy.connection = None
+            raise exc.DisconnectionError(
+                'Connection record belongs to pid {}, attempting to check out in pid {}'.format(
+                    connection_record.info['pid'], pid))
+
+
+def _enable_pre_ping(engine: Engine):
+    # test connections when checked out, so that connections dropped by the server are replaced transparently
+    @event.listens_for(engine, 'engine_connect')
+    def ping_connection(connection, branch):
+        if branch:
+            return
+
+        save_should_close_with_result = connection.should_close_with_result
+        connection.should_close_with_result = False
+
+        try:
+            connection.scalar(select([1]))
+        except exc.DBAPIError as err:
+            if err.connection_invalidated:
+                # the pool has been invalidated as well, a new connection is made on this attempt
+                connection.scalar(select([1]))
+            else:
+                raise
+        finally:
+            connection.should_close_with_result = save_should_close_with_result
+
+
+def _set_statement_timeout(engine: Engine, timeout: int):
+    statements = {
+        'postgresql': 'SET statement_timeout = {:d}',
+        'mysql': 'SET SESSION max_execution_time = {:d}',
+    }
+    statement = statements.get(engine.dialect.name)
+    if statement is None:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(statement.format(timeout))
+        finally:
+            cursor.close()
+
+
+def get_engine(url: URL = None) -> Engine:
+    """Get the engine for the URL, created once per process and shared by all its users.
+
+    The default URL comes from ``get_url``. Besides pool options from ``get_engine_options``, ``DB_POOL_PRE_PING``
+    enables testing connections on checkout and ``DB_STATEMENT_TIMEOUT`` limits statements run time (milliseconds).
+
+    """
+    url = url or get_url()
+    key = str(url)
+
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(url, **get_engine_options(url))
+
+            _protect_from_fork(engine)
+            if os.getenv('DB_POOL_PRE_PING', '').lower() in ('1', 'true', 'yes'):
+                _enable_pre_ping(engine)
+            if os.getenv('DB_STATEMENT_TIMEOUT'):
+                _set_statement_timeout(engine, int(os.getenv('DB_STATEMENT_TIMEOUT')))
+
+            _engines[key] = engine
+
+    return engine
+
+
+def dispose_engines():
+    """Close all pooled connections, e.g. in a parent process before forking workers."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+
+def get_replica_set() -> ReplicaSet:
+    """Get engines of read replicas.
+
+    Replicas are listed as comma separated connection URLs in ``DB_REPLICA_URLS`` environment variable and chosen
+    according to ``DB_REPLICA_STRATEGY`` (``round_robin`` or ``least_connections``).
+
+    """
+    urls = [url.strip() for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url.strip()]
+
+    return ReplicaSet([get_engine(make_url(url)) for url in urls], os.getenv('DB_REPLICA_STRATEGY', ROUND_ROBIN))
+
+
+def _begin_read_only(session, transaction, connection):
+    # lets the database skip bookkeeping of writes, and rejects them
+    if session.info.get('read_only') and connection.dialect.name == 'postgresql':
+        connection.execute('SET TRANSACTION READ ONLY')
+
+
 def get_session_factory():
-    engine = create_engine(get_url())
+    engine = get_engine()
     Base.metadata.bind = engine
-    return orm.sessionmaker(bind=engine)
+    session_factory = orm.sessionmaker(bind=engine, class_=RoutingSession, replicas=get_replica_set())
+    event.listen(session_factory, 'after_begin', _begin_read_only)
+    return session_factory
 
 
 def get_scoped_session_factory():
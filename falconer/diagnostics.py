@@ -0,0 +1,195 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.strategies import DeferredColumnLoader, LazyLoader
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_NORMALIZATIONS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),  # string literals
+    (re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?'), '?'),  # numeric literals
+    (re.compile(r'%\(\w+\)s|%s|(?<!:):\w+'), '?'),  # bound parameters of all paramstyles
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),  # IN lists of any length
+    (re.compile(r'\s+'), ' '),
+]
+
+_local = threading.local()
+
+
+class NPlusOneError(Exception):
+    """Raised in strict mode when the same statement is repeated too many times within a request."""
+
+
+def fingerprint(statement: str) -> str:
+    """Shape of the statement, the same for all parameter values."""
+    for pattern, replacement in _NORMALIZATIONS:
+        statement = pattern.sub(replacement, statement)
+
+    return statement.strip()
+
+
+class Repetition:
+    def __init__(self, statement: str, relationship: Optional[str], location: Optional[str]):
+        self.statement = statement
+        self.relationship = relationship
+        self.location = location
+        self.count = 0
+
+    def describe(self, origin: str) -> str:
+        return '{} statements like "{}" in {}{}{}'.format(
+            self.count, self.statement, origin,
+            ', loading {}'.format(self.relationship) if self.relationship else '',
+            ', from {}'.format(self.location) if self.location else '')
+
+
+class StatementLog:
+    """Statements executed by the current thread, grouped by their fingerprints."""
+
+    def __init__(self, origin: str, threshold: int):
+        self.origin = origin
+        self.threshold = threshold
+        self.repetitions = OrderedDict()  # type: OrderedDict[str, Repetition]
+
+    def record(self, statement: str):
+        key = fingerprint(statement)
+        repetition = self.repetitions.get(key)
+        if repetition is None:
+            # the stack is only inspected once per statement shape
+            repetition = self.repetitions[key] = Repetition(key, *_inspect_stack())
+        repetition.count += 1
+
+    def problems(self) -> List[Repetition]:
+        return [repetition for repetition in self.repetitions.values() if repetition.count > self.threshold]
+
+
+def _inspect_stack():
+    """Find the relationship (or deferred column) being lazily loaded and the innermost frame of the application."""
+    relationship = location = None
+
+    frame = sys._getframe(1)
+    while frame is not None and (relationship is None or location is None):
+        code = frame.f_code
+        if relationship is None and code.co_name == '_load_for_state':
+            loader = frame.f_locals.get('self')
+            if isinstance(loader, (LazyLoader, DeferredColumnLoader)):
+                relationship = str(loader.parent_property)
+        if location is None and code.co_filename.startswith(_PACKAGE_DIR) and \
+                code.co_filename != __file__:
+            location = '{}:{} in {}'.format(os.path.relpath(code.co_filename, os.path.dirname(_PACKAGE_DIR)),
+                                           frame.f_lineno, code.co_name)
+        frame = frame.f_back
+
+    return relationship, location
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+        return None
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+    except Exception as err:  # the plan is a hint only, it must not break the request
+        return 'EXPLAIN failed: {}'.format(err)
+    finally:
+        cursor.close()
+
+
+class _Diagnostics:
+    def __init__(self, slow_query_threshold: float):
+        self.slow_query_threshold = slow_query_threshold
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['falconer.diagnostics_started'] = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('falconer.diagnostics_started', time.perf_counter())
+
+        log = getattr(_local, 'log', None)
+        if log is not None:
+            log.record(statement)
+
+        if self.slow_query_threshold and elapsed >= self.slow_query_threshold and not executemany:
+            logger.warning('Slow statement (%.1f ms) in %s:\n%s\nparameters: %r\nplan:\n%s', elapsed * 1000,
+                           log.origin if log is not None else 'unknown origin', statement, parameters,
+                           _explain(conn, statement, parameters))
+
+
+_installed = None  # type: Optional[_Diagnostics]
+
+
+def install(slow_query_threshold: float = 0):
+    """Fingerprint statements of all engines and log the slow ones (threshold in seconds, 0 disables)."""
+    global _installed
+
+    if _installed is not None:
+        _installed.slow_query_threshold = slow_query_threshold
+        return
+
+    _installed = _Diagnostics(slow_query_threshold)
+    event.listen(Engine, 'before_cursor_execute', _installed.before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _installed.after_cursor_execute)
+
+
+def start(origin: str, threshold: int) -> StatementLog:
+    _local.log = StatementLog(origin, threshold)
+    return _local.log
+
+
+def current() -> Optional[StatementLog]:
+    return getattr(_local, 'log', None)
+
+
+def finish(strict: bool = False) -> Optional[StatementLog]:
+    """Stop recording statements of the current thread, report repeated ones."""
+    log = getattr(_local, 'log', None)
+    _local.log = None
+    if log is None:
+        return None
+
+    problems = log.problems()
+    for repetition in problems:
+        logger.warning('N+1: %s', repetition.describe(log.origin))
+
+    if strict and problems:
+        raise NPlusOneError('; '.join(repetition.describe(log.origin) for repetition in problems))
+
+    return log
+
+
+@contextmanager
+def detect_n_plus_one(threshold: int = 5, origin: str = 'block', strict: bool = True) -> Iterator[StatementLog]:
+    """Watch statements executed in the block, e.g. in a test.
+
+    >>> with detect_n_plus_one():
+    ...     client.simulate_get('/films/')
+
+    """
+    install()
+    log = start(origin, threshold)
+    try:
+        yield log
+    except BaseException:
+        finish()
+        raise
+
+    finish(strict)
@@ -3,4 +3,5 @@ from falcon import HTTPBadRequest
 
 class HTTPInvalidParams(HTTPBadRequest):
     def __init__(self, msg, param_name, **kwargs):
-        super()
+        description = 'The "{0}" parameter is invalid. {1}'.format(param_name, msg)
+        super(HTTPInvalidParams, self).__init__('Invalid parameter', description, **kwargs)
@@ -0,0 +1,174 @@
+"""Exports of tables streamed as NDJSON or as CSV files loaded by ``falconer/commands/load_data.py``.
+
+Columns are named as in the database (e.g. ``rental_id``), CSV values are formatted as the loading command parses them
+and NDJSON values as resources dump them.
+
+"""
+import csv
+import enum
+import io
+import logging
+import time
+from datetime import timezone
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Boolean, Column, DateTime, Enum, Numeric
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+from falconer.codecs import codec
+
+logger = logging.getLogger(__name__)
+
+CSV_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _csv_datetime(value):
+    if value is None:
+        return None
+
+    return value.strftime(CSV_DATETIME_FORMAT + '.%f' if value.microsecond else CSV_DATETIME_FORMAT)
+
+
+def _csv_converter(column: Column) -> Optional[Callable]:
+    """Get a function formatting values of the column for CSV, None if the CSV writer formats them already."""
+    column_type = column.type
+
+    if isinstance(column_type, Boolean):
+        return lambda value: None if value is None else ('t' if value else 'f')
+    if isinstance(column_type, DateTime):
+        return _csv_datetime
+    if isinstance(column_type, Enum) and column_type.enum_class is not None:
+        # the loading command looks members up by value
+        return lambda value: value.value if isinstance(value, enum.Enum) else value
+
+    return None
+
+
+def _json_datetime(value):
+    if value is None:
+        return None
+
+    # naive values are dumped as UTC
+    return (value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value).isoformat()
+
+
+def _json_converter(column: Column) -> Optional[Callable]:
+    """Get a function converting values of the column to JSON types, None if they are JSON types already."""
+    column_type = column.type
+
+    if isinstance(column_type, DateTime):
+        return _json_datetime
+    if isinstance(column_type, Enum) and column_type.enum_class is not None:
+        return lambda value: value.name if isinstance(value, enum.Enum) else value
+    if isinstance(column_type, Numeric) and column_type.asdecimal:
+        # exactly, as resources dump them
+        return lambda value: None if value is None else str(value)
+
+    return None
+
+
+class Encoder:
+    content_type: str = None
+    extension: str = None
+
+    def __init__(self, columns: Sequence[Column]):
+        self.names = [column.name for column in columns]
+
+    def header(self) -> bytes:
+        return b''
+
+    def encode(self, rows: List) -> bytes:
+        raise NotImplementedError
+
+
+class CsvEncoder(Encoder):
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def __init__(self, columns: Sequence[Column]):
+        super(CsvEncoder, self).__init__(columns)
+        self.converters = [(index, converter) for index, converter in enumerate(map(_csv_converter, columns))
+                           if converter is not None]
+
+    def header(self) -> bytes:
+        return self._write([self.names])
+
+    def encode(self, rows: List) -> bytes:
+        if not self.converters:
+            return self._write(rows)
+
+        converted = []
+        for row in rows:
+            values = list(row)
+            for index, converter in self.converters:
+                values[index] = converter(values[index])
+            converted.append(values)
+
+        return self._write(converted)
+
+    @staticmethod
+    def _write(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+
+class NdjsonEncoder(Encoder):
+    content_type = 'application/x-ndjson'
+    extension = 'ndjson'
+
+    def __init__(self, columns: Sequence[Column]):
+        super(NdjsonEncoder, self).__init__(columns)
+        self.converters = [(name, converter) for name, converter in zip(self.names, map(_json_converter, columns))
+                           if converter is not None]
+
+    def encode(self, rows: List) -> bytes:
+        lines = []
+        for row in rows:
+            obj = dict(zip(self.names, row))
+            for name, converter in self.converters:
+                obj[name] = converter(obj[name])
+            lines.append(codec.dumps(obj))
+        lines.append(b'')
+
+        return b'\n'.join(lines)
+
+
+ENCODERS = {
+    'ndjson': NdjsonEncoder,
+    'csv': CsvEncoder,
+}
+
+
+def stream_rows(bind: Engine, statement: Select, params: dict, encoder: Encoder, chunk_size: int, name: str,
+                compiled_cache: dict = None) -> Iterator[bytes]:
+    """Encode rows of the statement, fetched chunk by chunk through a server side cursor of a new connection.
+
+    A single statement sees a consistent snapshot of the database, however long the rows take to be sent. The number of
+    rows and the throughput are logged once all of them are sent.
+
+    """
+    started = time.perf_counter()
+    count = 0
+
+    connection = bind.connect()
+    try:
+        with connection.begin():
+            result = connection.execution_options(stream_results=True, compiled_cache=compiled_cache) \
+                .execute(statement, params)
+            try:
+                yield encoder.header()
+
+                chunk = result.fetchmany(chunk_size)
+                while chunk:
+                    count += len(chunk)
+                    yield encoder.encode(chunk)
+                    chunk = result.fetchmany(chunk_size)
+            finally:
+                result.close()
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info('Exported %d rows of %s in %.2fs (%.0f rows/s)', count, name, elapsed, count / (elapsed or 1))
@@ -0,0 +1,144 @@
+"""Filters of collections, ``filter=<attribute>:<operator>:<value>``, e.g.::
+
+    filter=customer_id:eq:42,payment_date:gte:2005-06-01
+    filter=inventory_id:in:1|2|3
+    filter=title:like:ACADEMY
+
+``like`` matches the value as a prefix and ``in`` takes values separated by ``|``, as commas separate filters.
+
+Values are compared through bound parameters, so statements depend on attributes, operators and the number of values
+only, and are compiled once for all of them.
+
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import Column, String, and_, bindparam
+from sqlalchemy import Enum as EnumType
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+OPERATORS = {
+    'eq': lambda attr, value: attr == value,
+    'ne': lambda attr, value: attr != value,
+    'lt': lambda attr, value: attr < value,
+    'lte': lambda attr, value: attr <= value,
+    'gt': lambda attr, value: attr > value,
+    'gte': lambda attr, value: attr >= value,
+    'like': lambda attr, value: attr.like(value, escape='\\'),
+}
+IN_OPERATOR = 'in'
+IN_SEPARATOR = '|'
+
+DATETIME_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+UTC_SUFFIXES = ('+00:00', 'Z')
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+# attribute, operator and values
+Filter = Tuple[InstrumentedAttribute, str, Tuple]
+
+
+def _column(attr: InstrumentedAttribute) -> Column:
+    return attr.property.columns[0]
+
+
+def is_indexed(column: Column) -> bool:
+    """Whether the column leads an index (or a primary key or unique constraint) of its table."""
+    if column.primary_key or column.index or column.unique:
+        return True
+
+    return any(list(index.columns)[0] is column for index in column.table.indexes)
+
+
+def split(param: str) -> Tuple[str, str, List[str]]:
+    """Split a filter into the attribute key, operator and values (as strings).
+
+    Raises ValueError if it is malformed or the operator is unknown.
+
+    """
+    parts = param.split(':', 2)
+    if len(parts) != 3:
+        raise ValueError('Filters are expected as <field>:<operator>:<value>.')
+
+    key, operator, value = parts
+    if operator == IN_OPERATOR:
+        return key, operator, value.split(IN_SEPARATOR)
+    if operator not in OPERATORS:
+        raise ValueError('Unknown operator "{}", use one of: {}.'.format(
+            operator, ', '.join(sorted(OPERATORS) + [IN_OPERATOR])))
+
+    return key, operator, [value]
+
+
+def decode_value(attr: InstrumentedAttribute, operator: str, value: str):
+    """Convert a value to the type of the column, values are formatted as they are dumped.
+
+    Raises ValueError if it cannot be converted.
+
+    """
+    column_type = _column(attr).type
+
+    if operator == 'like':
+        if not isinstance(column_type, String) or isinstance(column_type, EnumType):
+            raise ValueError('Only text can be matched by prefix.')
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+    if isinstance(column_type, EnumType) and column_type.enum_class is not None:
+        try:
+            return column_type.enum_class[value]
+        except KeyError:
+            raise ValueError('"{}" is not one of: {}.'.format(
+                value, ', '.join(member.name for member in column_type.enum_class)))
+
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return value
+
+    try:
+        if python_type is bool:
+            return BOOLEAN_VALUES[value.lower()]
+        if python_type is datetime or python_type is date:
+            # naive values are dumped as UTC
+            for suffix in UTC_SUFFIXES:
+                if value.endswith(suffix):
+                    value = value[:-len(suffix)]
+                    break
+            for datetime_format in DATETIME_FORMATS:
+                try:
+                    parsed = datetime.strptime(value, datetime_format)
+                except ValueError:
+                    continue
+                return parsed if python_type is datetime else parsed.date()
+            raise ValueError
+        if python_type in (int, Decimal, float):
+            return python_type(value)
+    except (KeyError, ValueError, InvalidOperation):
+        raise ValueError('"{}" is not a valid {}.'.format(value, python_type.__name__))
+
+    return value
+
+
+def criteria(filters: Sequence[Filter]):
+    """Build a WHERE clause of the filters, values are bound parameters named ``filter_<index>_<value index>``."""
+    clauses = []
+
+    for index, (attr, operator, values) in enumerate(filters):
+        params = [bindparam('filter_{}_{}'.format(index, value_index), type_=_column(attr).type)
+                  for value_index in range(len(values))]
+        if operator == IN_OPERATOR:
+            clauses.append(attr.in_(params))
+        else:
+            clauses.append(OPERATORS[operator](attr, params[0]))
+
+    return and_(*clauses)
+
+
+def params(filters: Sequence[Filter]) -> dict:
+    return {'filter_{}_{}'.format(index, value_index): value
+            for index, (_, _, values) in enumerate(filters) for value_index, value in enumerate(values)}
+
+
+def shape(filters: Sequence[Filter]) -> Tuple[Tuple[str, str, int], ...]:
+    """Attribute keys, operators and numbers of values, everything a filtered statement depends on."""
+    return tuple((attr.key, operator, len(values)) for attr, operator, values in filters)
@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import falcon
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENTS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Measurements of the request handled by the current thread."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        # phase name -> seconds
+        self.phases = OrderedDict()  # type: OrderedDict[str, float]
+
+
+def start_request() -> RequestMetrics:
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def finish_request() -> Optional[RequestMetrics]:
+    metrics = getattr(_local, 'metrics', None)
+    _local.metrics = None
+    return metrics
+
+
+def current_request() -> Optional[RequestMetrics]:
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the run time of the block to the phase of the current request, if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = getattr(_local, 'metrics', None)
+        if metrics is not None:
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['falconer.statement_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = getattr(_local, 'metrics', None)
+    if metrics is not None:
+        metrics.statements += 1
+        metrics.db_time += time.perf_counter() - conn.info.pop('falconer.statement_started')
+
+
+def instrument_engines():
+    """Count statements and database time of all engines, attributed to the request of the executing thread."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> str:
+    """Format measurements as a Server-Timing header value (durations in milliseconds)."""
+    entries = ['db;dur={:.2f};desc="{} statements"'.format(metrics.db_time * 1000, metrics.statements)]
+    entries.extend('{};dur={:.2f}'.format(phase, seconds * 1000) for phase, seconds in metrics.phases.items())
+    entries.append('total;dur={:.2f}'.format(total * 1000))
+
+    return ', '.join(entries)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # counts are per bucket, they are accumulated when rendered
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process local histograms rendered in Prometheus text exposition format.
+
+    Every process (e.g. gunicorn worker) has its own registry, each one has to be scraped separately.
+
+    """
+
+    def __init__(self):
+        # name -> (help, buckets, label values -> histogram)
+        self._metrics = OrderedDict()  # type: OrderedDict[str, Tuple[str, tuple, Dict[tuple, Histogram]]]
+        self._label_names = {}  # type: Dict[str, Tuple[str, ...]]
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, description: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self._metrics[name] = (description, buckets, {})
+        self._label_names[name] = label_names
+
+    def observe(self, name: str, labels: tuple, value: float):
+        description, buckets, histograms = self._metrics[name]
+        with self._lock:
+            histogram = histograms.get(labels)
+            if histogram is None:
+                histogram = histograms[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self) -> str:
+        lines = []  # type: List[str]
+
+        with self._lock:
+            for name, (description, buckets, histograms) in self._metrics.items():
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} histogram'.format(name))
+
+                for labels, histogram in sorted(histograms.items()):
+                    pairs = ['{}="{}"'.format(key, _escape(value)) for key, value in zip(self._label_names[name],
+                                                                                       labels)]
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(float(bound))
+                        lines.append('{}_bucket{{{}}} {}'.format(name, ','.join(pairs + ['le="{}"'.format(le)]),
+                                                                 cumulative))
+                    lines.append('{}_sum{{{}}} {!r}'.format(name, ','.join(pairs), histogram.sum))
+                    lines.append('{}_count{{{}}} {}'.format(name, ','.join(pairs), histogram.count))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def create_registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    labels = ('method', 'route', 'status')
+
+    registry.histogram('falconer_request_duration_seconds', 'Time spent handling requests.', labels,
+                       DURATION_BUCKETS)
+    registry.histogram('falconer_db_duration_seconds', 'Time spent executing SQL statements per request.', labels,
+                       DURATION_BUCKETS)
+    registry.histogram('falconer_db_statements', 'SQL statements executed per request.', labels, STATEMENTS_BUCKETS)
+    registry.histogram('falconer_phase_duration_seconds', 'Time spent in phases of handling requests.',
+                       ('method', 'route', 'phase'), DURATION_BUCKETS)
+
+    return registry
+
+
+class MetricsResource:
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def on_get(self, req, resp):
+        resp.body = self.registry.render()
+        resp.content_type = 'text/plain; version=0.0.4'
+        resp.status = falcon.HTTP_200
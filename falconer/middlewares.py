@@ -1,14 +1,227 @@
+import threading
+import time
+
+import falcon
+from sqlalchemy import event
+
+from falconer import diagnostics
+from falconer.cache import CACHED_RESPONSE, ResponseCache
+from falconer.compression import compress, compress_stream, negotiate
+from falconer.instrumentation import (MetricsRegistry, finish_request, instrument_engines, server_timing,
+                                      start_request)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+LAST_WRITE_COOKIE = 'read_your_writes_until'
+
+_WRITTEN = 'falconer.middlewares.written'
+
+STREAM_READ_SIZE = 64 * 1024
+
+
+class _LazySession:
+    """Proxy of the scoped session, creating the session of the current request once it is first used.
+
+    Resources are shared by all threads, so the proxy keeps per request state in thread local storage as the scoped
+    session does.
+
+    """
+
+    def __init__(self, registry):
+        self._registry = registry
+        self._local = threading.local()
+
+    def prepare(self, info: dict):
+        self._local.info = info
+
+    def __getattr__(self, name):
+        info = getattr(self._local, 'info', None)
+        if info is not None and not self._registry.registry.has():
+            self._registry().info.update(info)
+        return getattr(self._registry(), name)
+
+
 class SessionMiddleware:
-    def __init__(self, session):
+    def __init__(self, session, read_your_writes_window: float = 0):
         self.session = session
+        # without replicas every read is served by the primary database, which has all writes already
+        self.read_your_writes_window = read_your_writes_window if session.session_factory.kw.get('replicas') else 0
+        self._lazy_session = _LazySession(session)
+
+        if self.read_your_writes_window:
+            for name, listener in _WRITE_COLLECTORS:
+                if not event.contains(session.session_factory, name, listener):
+                    event.listen(session.session_factory, name, listener)
 
     def process_resource(self, req, resp, resource, params):
-        resource.session = self.session()
+        read_only = req.method in SAFE_METHODS
+        self._lazy_session.prepare({
+            'read_only': read_only,
+            # reads may be served by replicas, unless the client has just written something
+            'use_replica': read_only and not self._is_reading_own_writes(req),
+        })
+        resource.session = self._lazy_session
 
     def process_response(self, req, resp, resource, req_succeeded):
-        if hasattr(resource, 'session'):
-            if req_succeeded:
-                resource.session.commit()
-            else:
-                resource.session.rollback()
+        self._lazy_session.prepare(None)
+
+        if not self.session.registry.has():
+            # the resource has not used the session, no connection has been checked out
+            return
+
+        try:
+            if req_succeeded and req.method not in SAFE_METHODS:
+                self.session.commit()
+                if self.read_your_writes_window and self.session.info.get(_WRITTEN):
+                    self._mark_write(req, resp)
+        finally:
+            # closing rolls back whatever has not been committed and returns the connection to the pool
             self.session.remove()
+
+    def _is_reading_own_writes(self, req):
+        try:
+            return float(req.cookies.get(LAST_WRITE_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _mark_write(self, req, resp):
+        expires = time.time() + self.read_your_writes_window
+        resp.set_cookie(LAST_WRITE_COOKIE, '{:.3f}'.format(expires), max_age=int(self.read_your_writes_window) + 1,
+                        path='/', secure=req.scheme == 'https')
+
+
+def _mark_flushed(session, flush_context):
+    # flushes without changes are not dispatched
+    session.info[_WRITTEN] = True
+
+
+def _mark_bulk_written(update_context):
+    if update_context.rowcount:
+        update_context.session.info[_WRITTEN] = True
+
+
+_WRITE_COLLECTORS = (
+    ('after_flush', _mark_flushed),
+    ('after_bulk_update', _mark_bulk_written),
+    ('after_bulk_delete', _mark_bulk_written),
+)
+
+
+class CompressionMiddleware:
+    """Compress response bodies with the best content coding accepted by the client.
+
+    Must be the first middleware, so that it processes the response after all others. Bodies of cached responses are
+    compressed once and stored along with the cache entry.
+
+    """
+
+    def __init__(self, cache: ResponseCache = None, min_size: int = 0, level: int = 6):
+        self.cache = cache
+        self.min_size = min_size
+        self.level = level
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        if req.method == 'HEAD' or resp.status == falcon.HTTP_204 or resp.get_header('Content-Encoding'):
+            return
+
+        # not modified responses have no body, but carry the headers the full response would have
+        not_modified = resp.status == falcon.HTTP_304
+
+        if not_modified or resp.stream is not None:
+            body = None
+        else:
+            body = resp.data if resp.data is not None else (resp.body or '').encode('utf-8')
+            if len(body) < self.min_size:
+                return
+
+        # the representation depends on Accept-Encoding from now on, for shared caches as well
+        vary = resp.get_header('Vary')
+        resp.set_header('Vary', '{}, Accept-Encoding'.format(vary) if vary else 'Accept-Encoding')
+
+        coding = negotiate(req.get_header('Accept-Encoding'))
+        if coding is None:
+            return
+
+        # strong tags identify bytes, which differ per content coding
+        etag = resp.get_header('ETag')
+        if etag is not None and not etag.startswith('W/'):
+            resp.etag = 'W/' + etag
+
+        if not_modified:
+            return
+
+        resp.set_header('Content-Encoding', coding)
+
+        if body is None:
+            stream = resp.stream
+            if hasattr(stream, 'read'):
+                stream = iter(lambda: stream.read(STREAM_READ_SIZE), b'')
+            resp.stream = compress_stream(coding, stream, self.level)
+            resp.stream_len = None
+            return
+
+        resp.body = None
+        resp.data = self._compress_cached(req, coding, body)
+
+    def _compress_cached(self, req, coding, body):
+        entry = req.context.get(CACHED_RESPONSE)
+        if entry is None or self.cache is None or entry.body is not body:
+            return compress(coding, body, self.level)
+
+        compressed = entry.variants.get(coding)
+        if compressed is None:
+            compressed = compress(coding, body, self.level)
+            self.cache.add_variant(entry, coding, compressed)
+
+        return compressed
+
+
+class InstrumentationMiddleware:
+    """Measure requests, report measurements in Server-Timing header and aggregate them per route."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        instrument_engines()
+
+    def process_request(self, req, resp):
+        start_request()
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        metrics = finish_request()
+        if metrics is None:
+            return
+
+        total = time.perf_counter() - metrics.started
+        resp.set_header('Server-Timing', server_timing(metrics, total))
+
+        route = req.uri_template or 'unrouted'
+        labels = (req.method, route, resp.status.split(' ', 1)[0])
+        self.registry.observe('falconer_request_duration_seconds', labels, total)
+        self.registry.observe('falconer_db_duration_seconds', labels, metrics.db_time)
+        self.registry.observe('falconer_db_statements', labels, metrics.statements)
+        for phase, seconds in metrics.phases.items():
+            self.registry.observe('falconer_phase_duration_seconds', (req.method, route, phase), seconds)
+
+
+class DiagnosticsMiddleware:
+    """Report statements repeated within a request (N+1 queries) and slow statements along with their plans.
+
+    In strict mode repeated statements raise ``NPlusOneError``, so that test suites fail.
+
+    """
+
+    def __init__(self, threshold: int, strict: bool = False, slow_query_threshold: float = 0):
+        self.threshold = threshold
+        self.strict = strict
+        diagnostics.install(slow_query_threshold)
+
+    def process_request(self, req, resp):
+        diagnostics.start('{} {}'.format(req.method, req.path), self.threshold)
+
+    def process_resource(self, req, resp, resource, params):
+        log = diagnostics.current()
+        if log is not None:
+            log.origin = '{} {} {}'.format(type(resource).__name__, req.method, req.uri_template)
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        diagnostics.finish(self.strict)
@@ -13,7 +13,7 @@ class Country(Base):
     name = Column('country', String(length=50), nullable=False)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    cities = relationship('City', back_populates='country')
+    cities = relationship('City', back_populates='country', order_by='City.id')
 
 
 class City(Base):
@@ -21,11 +21,11 @@ class City(Base):
 
     id = Column('city_id', Integer, primary_key=True)
     name = Column('city', String(length=50), nullable=False)
-    country_id = Column(Integer, ForeignKey('country.country_id'), nullable=False)
+    country_id = Column(Integer, ForeignKey('country.country_id'), nullable=False, index=True)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     country = relationship('Country', back_populates='cities')
-    addresses = relationship('Address', back_populates='city')
+    addresses = relationship('Address', back_populates='city', order_by='Address.id')
 
 
 class Address(Base):
@@ -35,31 +35,31 @@ class Address(Base):
     first_line = Column('address', String(length=50), nullable=False)
     second_line = Column('address2', String(length=50))
     district = Column(String(length=20), nullable=False)
-    city_id = Column(Integer, ForeignKey('city.city_id'), nullable=False)
+    city_id = Column(Integer, ForeignKey('city.city_id'), nullable=False, index=True)
     postal_code = Column(String(length=10))
     phone = Column(String(length=20), nullable=False)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     city = relationship('City', back_populates='addresses')
-    customers = relationship('Customer', back_populates='address')
-    staff = relationship('Staff', back_populates='address')
-    stores = relationship('Store', back_populates='address')
+    customers = relationship('Customer', back_populates='address', order_by='Customer.id')
+    staff = relationship('Staff', back_populates='address', order_by='Staff.id')
+    stores = relationship('Store', back_populates='address', order_by='Store.id')
 
 
 class Customer(Base):
     __tablename__ = 'customer'
 
     id = Column('customer_id', Integer, primary_key=True)
-    store_id = Column(Integer, ForeignKey('store.store_id'), nullable=False)
+    store_id = Column(Integer, ForeignKey('store.store_id'), nullable=False, index=True)
     first_name = Column(String(length=45), nullable=False)
-    last_name = Column(String(length=45), nullable=False)
+    last_name = Column(String(length=45), nullable=False, index=True)
     email = Column(String(length=50))
-    address_id = Column(Integer, ForeignKey('address.address_id'), nullable=False)
+    address_id = Column(Integer, ForeignKey('address.address_id'), nullable=False, index=True)
     active = Column(Boolean, default=True, nullable=False)
     create_date = Column(DateTime, server_default=func.now())
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     store = relationship('Store', back_populates='customers')
     address = relationship('Address', back_populates='customers')
-    payments = relationship('Payment', back_populates='customer')
-    rentals = relationship('Rental', back_populates='customer')
+    payments = relationship('Payment', back_populates='customer', order_by='Payment.id')
+    rentals = relationship('Rental', back_populates='customer', order_by='Rental.id')
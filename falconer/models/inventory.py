@@ -12,13 +12,14 @@ __all__ = ['Category', 'Actor', 'Language', 'Inventory', 'Film', 'film_category_
 
 film_category_table = Table('film_category', Base.metadata,
                             Column('film_id', Integer, ForeignKey('film.film_id'), primary_key=True),
-                            Column('category_id', Integer, ForeignKey('category.category_id'), primary_key=True),
+                            Column('category_id', Integer, ForeignKey('category.category_id'), primary_key=True,
+                                   index=True),
                             Column('last_update', DateTime, server_default=func.now(), onupdate=func.now(),
                                    nullable=False))
 
 film_actor_table = Table('film_actor', Base.metadata,
                          Column('actor_id', Integer, ForeignKey('actor.actor_id'), primary_key=True),
-                         Column('film_id', Integer, ForeignKey('film.film_id'), primary_key=True),
+                         Column('film_id', Integer, ForeignKey('film.film_id'), primary_key=True, index=True),
                          Column('last_update', DateTime, server_default=func.now(), onupdate=func.now(),
                                 nullable=False))
 
@@ -30,7 +31,7 @@ class Category(Base):
     name = Column(String(length=25), nullable=False)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    films = relationship('Film', back_populates='categories', secondary=film_category_table)
+    films = relationship('Film', back_populates='categories', secondary=film_category_table, order_by='Film.id')
 
 
 class Actor(Base):
@@ -38,10 +39,10 @@ class Actor(Base):
 
     id = Column('actor_id', Integer, primary_key=True)
     first_name = Column(String(length=45), nullable=False)
-    last_name = Column(String(length=45), nullable=False)
+    last_name = Column(String(length=45), nullable=False, index=True)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    films = relationship('Film', back_populates='actors', secondary=film_actor_table)
+    films = relationship('Film', back_populates='actors', secondary=film_actor_table, order_by='Film.id')
 
 
 class Language(Base):
@@ -51,21 +52,22 @@ class Language(Base):
     name = Column(String(length=20), nullable=False)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    films = relationship('Film', back_populates='language', foreign_keys='Film.language_id')
-    films_original = relationship('Film', back_populates='original_language', foreign_keys='Film.original_language_id')
+    films = relationship('Film', back_populates='language', foreign_keys='Film.language_id', order_by='Film.id')
+    films_original = relationship('Film', back_populates='original_language', foreign_keys='Film.original_language_id',
+                                  order_by='Film.id')
 
 
 class Inventory(Base):
     __tablename__ = 'inventory'
 
     id = Column('inventory_id', Integer, primary_key=True)
-    film_id = Column(Integer, ForeignKey('film.film_id'), nullable=False)
-    store_id = Column(Integer, ForeignKey('store.store_id'), nullable=False)
+    film_id = Column(Integer, ForeignKey('film.film_id'), nullable=False, index=True)
+    store_id = Column(Integer, ForeignKey('store.store_id'), nullable=False, index=True)
     last_update = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     film = relationship('Film', back_populates='inventories')
     store = relationship('Store', back_populates='inventories')
-    rentals = relationship('Rental', back_populates='inventory')
+    rentals = relationship('Rental', back_populates='inventory', order_by='Rental.id')
 
 
 class Film(Base):
@@ -79,11 +81,11 @@ class Film(Base):
         NC_17 = 'NC-17'
 
     id = Column('film_id', Integer, primary_key=True)
-    title = Column(String(length=255), nullable=False)
+    title = Column(String(length=255), nullable=False, index=True)
     description = Column(Text)
     release_year = Column(SmallInteger)
-    language_id = Column(Integer, ForeignKey('language.language_id'), nullable=False)
-    original_language_id = Column(Integer, ForeignKey('language.language_id'))
+    language_id = Column(Integer, ForeignKey('language.language_id'), nullable=False, index=True)
+    original_language_id = Column(Integer, ForeignKey('language.language_id'), index=True)
     rental_duration = Column(SmallInteger, default=3, nullable=False)
     rental_rate = Column(Numeric(4, 2), default=Decimal(4.99), nullable=False)
     length = Column(SmallInteger)
@@ -94,6 +96,6 @@ class Film(Base):
 
     language = relationship('Language', back_populates='films', foreign_keys=[language_id])
     original_language = relationship('Language', back_populates='films_original', foreign_keys=[original_language_id])
-    categories = relationship('Category', back_populates='films', secondary=film_category_table)
-    actors = relationship('Actor', back_populates='films', secondary=film_actor_table)
-    inventories = relationship('Inventory', back_populates='film')
+    categories = relationship('Category', back_populates='films', secondary=film_category_table, order_by='Category.id')
+    actors = relationship('Actor', back_populates='films', secondary=film_actor_table, order_by='Actor.id')
+    inventories = relationship('Inventory', back_populates='film', order_by='Inventory.id')
@@ -0,0 +1,117 @@
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from typing import List, Sequence, Tuple
+
+import simplejson as json
+from sqlalchemy import DateTime, Numeric, and_, or_
+from sqlalchemy import Enum as EnumType
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+CURSOR_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+Sorting = List[Tuple[InstrumentedAttribute, bool]]
+
+
+def _column(attr: InstrumentedAttribute):
+    return attr.property.columns[0]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.strftime(CURSOR_DATETIME_FORMAT)
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, Decimal):
+        return str(value)
+
+    return value
+
+
+def _decode_value(attr: InstrumentedAttribute, value):
+    if value is None:
+        return None
+
+    column_type = _column(attr).type
+    if isinstance(column_type, DateTime):
+        return datetime.strptime(value, CURSOR_DATETIME_FORMAT)
+    if isinstance(column_type, EnumType) and column_type.enum_class is not None:
+        return column_type.enum_class[value]
+    if isinstance(column_type, Numeric) and column_type.asdecimal:
+        return Decimal(value)
+
+    return value
+
+
+def ordering(sorting: Sorting) -> list:
+    """Get ORDER BY clauses for keyset pagination.
+
+    Nullable columns are explicitly sorted with NULLs last, so that the order (and the cursor criteria built on it)
+    does not depend on the database dialect.
+
+    """
+    results = []
+
+    for attr, descending in sorting:
+        if _column(attr).nullable:
+            results.append(attr.is_(None))
+        results.append(attr.desc() if descending else attr)
+
+    return results
+
+
+def encode_cursor(sorting: Sorting, obj) -> str:
+    """Encode an opaque cursor pointing right after the given object."""
+    payload = {
+        'keys': [[attr.key, descending] for attr, descending in sorting],
+        'values': [_encode_value(getattr(obj, attr.key)) for attr, _ in sorting],
+    }
+    token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+    return token.decode('ascii').rstrip('=')
+
+
+def decode_cursor(sorting: Sorting, token: str) -> list:
+    """Decode the last seen sort key values from a cursor.
+
+    Raises ValueError if the cursor is malformed or was issued for a different sorting.
+
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        keys = payload['keys']
+        values = payload['values']
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise ValueError('Malformed cursor.')
+
+    if keys != [[attr.key, descending] for attr, descending in sorting] or len(values) != len(sorting):
+        raise ValueError('Cursor does not match the requested sorting.')
+
+    try:
+        return [_decode_value(attr, value) for (attr, _), value in zip(sorting, values)]
+    except (KeyError, ValueError, TypeError, InvalidOperation):
+        raise ValueError('Malformed cursor.')
+
+
+def keyset_criteria(sorting: Sorting, values: Sequence):
+    """Build a WHERE clause selecting rows that come after the given sort key values in ``ordering(sorting)``."""
+    alternatives = []
+    equalities = []
+
+    for (attr, descending), value in zip(sorting, values):
+        if value is None:
+            # NULLs are sorted last, so only other NULLs can follow
+            equalities.append(attr.is_(None))
+            continue
+
+        following = attr < value if descending else attr > value
+        if _column(attr).nullable:
+            following = or_(following, attr.is_(None))
+
+        alternatives.append(and_(*equalities, following))
+        equalities.append(attr == value)
+
+    return or_(*alternatives)
@@ -1,21 +1,39 @@
-from typing import Type
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
 
 import falcon
 
 from falcon import Request, Response
-import simplejson as json
-from sqlalchemy import inspect
+from sqlalchemy import and_, bindparam, func, inspect, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-
+from sqlalchemy.ext.baked import BakedQuery
+from sqlalchemy.orm import Query, RelationshipProperty, Session, load_only
+from sqlalchemy.sql import Select
+from sqlalchemy.util import LRUCache
+
+from falconer import counting, export, filtering, pagination, settings
+from falconer.cache import CACHED_RESPONSE, ResponseCache
+from falconer.conditional import StaticDocument, digest_etag, set_validators, settled
+from falconer.db.loading import STRATEGIES, dumped_attributes, foreign_key, plan_loading, related_criteria
 from falconer.db.model import Base
+from falconer.exceptions import HTTPInvalidParams
+from falconer.instrumentation import timed
 from falconer.schemas.base import BaseSchema
-from falconer.codecs import ImprovedJSONEncoder
+from falconer.schemas.compiled import Serializer, get_serializer
+from falconer.codecs import codec, iterencode_array
 
 
-LIST_HANDLING_METHODS = ['GET', 'POST']
+LIST_HANDLING_METHODS = ['GET', 'HEAD', 'POST', 'PATCH', 'DELETE']
 RESOURCE_HANDLING_METHODS = ['GET', 'PUT', 'PATCH', 'DELETE']
 
+# many, fields and include of a read
+Shape = Tuple[bool, Tuple[str, ...], Tuple[str, ...]]
+
+
+class Scope(NamedTuple('Scope', [('relationship', RelationshipProperty), ('criteria', object),
+                                 ('parent', 'BaseResource'), ('parent_id', int)])):
+    """Collection of the parent resource lists are restricted to, ``criteria`` bind its id as ``parent_id``."""
+
 
 class BaseResource:
     schema_cls: Type[BaseSchema] = None
@@ -23,14 +41,71 @@ class BaseResource:
     model_cls: Type[Base] = None
     singular: str = None
     plural: str = None
+    # relationship name -> loading strategy name (see falconer.db.loading.STRATEGIES), overriding the planned one
+    loading_strategies: Dict[str, str] = {}
+    # column maintained by the database on every update, sent as Last-Modified of single resources dumped from their
+    # rows only, without related objects (None disables it)
+    last_modified_attr: str = 'last_update'
+    # lists are read with Core selects of mapped columns (no ORM objects) unless relationships have to be loaded
+    select_rows: bool = True
+    # column attributes lists can be filtered by (see falconer.filtering), each one has to lead an index
+    filterable: Tuple[str, ...] = ()
+
+    def __init__(self, cache: ResponseCache = None, counts: counting.CountCache = None):
+        self.cache = cache
+        self.counts = counts
+
+        # the mapper is inspected once, when the resource is created and routed
+        self._mapper = inspect(self.model_cls)
+        primary_column = self._mapper.primary_key[0]  # TODO: assuming primary key is not composite
+        self._primary_attr = getattr(self.model_cls, self._mapper.get_property_by_column(primary_column).key)
+        self._column_keys = frozenset(self._mapper.column_attrs.keys())
+        for key in self.filterable:
+            if key not in self._column_keys or not filtering.is_indexed(self._mapper.column_attrs[key].columns[0]):
+                raise ValueError('{}.{} is not an indexed column, it cannot be filterable.'.format(
+                    self.model_cls.__name__, key))
+        # filterable attributes are named by their keys, in exports by their columns as exported rows are
+        self._filter_keys = OrderedDict((key, key) for key in self.filterable)
+        self._filter_columns = OrderedDict((self._mapper.column_attrs[key].columns[0].name, key)
+                                           for key in self.filterable)
+        # single resources dump primary keys of related objects, so their changes invalidate responses as well
+        self._cache_tags = frozenset({self.model_cls} |
+                                     {relationship.mapper.class_ for relationship in self._mapper.relationships})
+
+        # schemas never change, OPTIONS documents of the collection (False) and items (True) are encoded once
+        self._options = {item: StaticDocument(codec.dumps(self.describe(item)), settings.METADATA_MAX_AGE)
+                         for item in (False, True)}
+
+        # read schemas, ORM queries and Core statements are built and compiled once per shape of the request
+        self._schemas = LRUCache(settings.QUERY_CACHE_SIZE)
+        self._statements = LRUCache(settings.QUERY_CACHE_SIZE)
+        self._compiled_cache = LRUCache(settings.QUERY_CACHE_SIZE)
+        self._bakery = BakedQuery.bakery(settings.QUERY_CACHE_SIZE)
+
+        self._baked_query = self._bakery(lambda session: session.query(self.model_cls))
+        self._baked_exists = self._baked_query + (lambda query: query.with_entities(self._primary_attr)) + (
+            lambda query: query.filter(self._primary_attr == bindparam('resource_id')))
+        self._baked_for_update = self._baked_query + (
+            lambda query: query.with_for_update(read=True).filter(self._primary_attr == bindparam('resource_id')))
+
+    def on_get(self, req: Request, resp: Response, resource_id=None, scope: Scope = None):
+        if self.cache is None or req.get_param_as_bool('stream'):
+            self._read(req, resp, resource_id, scope)
+        else:
+            self._cached_read(req, resp, resource_id, scope)
 
-    def on_get(self, req: Request, resp: Response, resource_id=None):
-        self._read(req, resp, resource_id)
+    def on_head(self, req: Request, resp: Response, resource_id=None):
+        self._raise_for_resource(resource_id)
 
-    def on_delete(self, req: Request, resp: Response, resource_id=None):
-        self._raise_for_list(resource_id)
+        filters = self._parse_filter_params(req.get_param_as_list('filter') or [])
+        self._set_count_headers(resp, self._total_count(filters))
+        resp.status = falcon.HTTP_200
 
-        self._delete(req, resp, resource_id)
+    def on_delete(self, req: Request, resp: Response, resource_id=None):
+        if resource_id is None:
+            self._delete_many(req, resp)
+        else:
+            self._delete(req, resp, resource_id)
 
     def on_put(self, req: Request, resp: Response, resource_id=None):
         self._raise_for_list(resource_id)
@@ -38,9 +113,10 @@ class BaseResource:
         self._update(req, resp, resource_id)
 
     def on_patch(self, req: Request, resp: Response, resource_id=None):
-        self._raise_for_list(resource_id)
-
-        self._update(req, resp, resource_id, partial=True)
+        if resource_id is None:
+            self._update_many(req, resp)
+        else:
+            self._update(req, resp, resource_id, partial=True)
 
     def on_post(self, req: Request, resp: Response, resource_id=None):
         self._raise_for_resource(resource_id)
@@ -48,16 +124,19 @@ class BaseResource:
         self._create(req, resp)
 
     def on_options(self, req, resp, resource_id=None):
-        result = {
-            'name': self.plural if resource_id else self.singular,
+        self._options[resource_id is not None].respond(req, resp)
+
+    def describe(self, item: bool = False) -> dict:
+        """Describe the collection (or an item) and fields of the resource."""
+        return {
+            'name': self.singular if item else self.plural,
+            # sorted, so that the document (and its ETag) is the same in every process
             'fields': {
-                key: self._serialize_schema_field(value) for key, value in self.schema_cls._declared_fields.items()
+                key: self._serialize_schema_field(key, value)
+                for key, value in sorted(self.schema_cls._declared_fields.items())
             }
         }
 
-        resp.body = json.dumps(result)
-        resp.status = falcon.HTTP_200
-
     @property
     def _query(self):
         return self.session.query(self.model_cls)
@@ -70,71 +149,364 @@ class BaseResource:
         if resource_id:
             raise falcon.HTTPMethodNotAllowed(RESOURCE_HANDLING_METHODS)
 
+    def _exists(self, resource_id) -> bool:
+        return self._baked_exists(self.session).params(resource_id=resource_id).first() is not None
+
     def _get_for_update(self, resource_id):
-        inspection_obj = inspect(self.model_cls)
-        primary_column = inspection_obj.primary_key[0]  # TODO: assuming primary key is not composite
-        primary_prop = inspection_obj.mapper.get_property_by_column(primary_column)
+        return self._baked_for_update(self.session).params(resource_id=resource_id).one_or_none()
 
-        return self._query.with_for_update(read=True).filter_by(**{primary_prop.key: resource_id}).one()
+    def _load_body(self, req):
+        try:
+            with timed('decode'):
+                return codec.load(req.bounded_stream)
+        except ValueError as err:
+            raise falcon.HTTPBadRequest('Malformed JSON', 'The request body is not a valid JSON document.') from err
 
     def _create(self, req, resp):
+        deserialized = self._load_body(req)
+        if isinstance(deserialized, list):
+            self._create_many(resp, deserialized)
+            return
+
         schema = self.schema_cls()
-        deserialized = json.load(req.bounded_stream)
-        parsed = schema.load(deserialized, session=self.session)
+        with timed('load'):
+            parsed = schema.load(deserialized, session=self.session)
 
         if parsed.errors:
             raise falcon.HTTPUnprocessableEntity(description=parsed.errors)
 
         try:
-            self.session.add(parsed.data)
-            self.session.flush()
+            with timed('query'):
+                self.session.add(parsed.data)
+                self.session.flush()
         except SQLAlchemyError as err:
             raise falcon.HTTPUnprocessableEntity(description='Database error') from err
 
-        resp.body = json.dumps(parsed.data.id, cls=ImprovedJSONEncoder)
+        resp.data = codec.dumps(parsed.data.id)
         resp.status = falcon.HTTP_201
 
-    def _read(self, req, resp, resource_id):
-        compact = req.get_param_as_bool('compact')
+    def _create_many(self, resp, deserialized):
+        schema = self.schema_cls(many=True)
+        with timed('load'):
+            parsed = schema.load(deserialized, session=self.session)
 
-        schema = self.schema_cls(many=resource_id is None)
+        if parsed.errors:
+            # errors are keyed by item index, nothing is written unless all items are valid
+            raise falcon.HTTPUnprocessableEntity(description=parsed.errors)
 
-        if schema.many:
-            page = req.get_param_as_int('page') or 1
-            page_size = req.get_param_as_int('page_size') or 10
-            sorting_params = req.get_param_as_list('sort', transform=lambda param: param.split(':'))
+        try:
+            with timed('query'):
+                self.session.add_all(parsed.data)
+                # one flush (and one transaction) for all of the items
+                self.session.flush()
+        except SQLAlchemyError as err:
+            raise falcon.HTTPUnprocessableEntity(description='Database error') from err
+
+        resp.data = codec.dumps([resource.id for resource in parsed.data])
+        resp.status = falcon.HTTP_201
+
+    def _read(self, req, resp, resource_id, scope: Scope = None):
+        pretty = req.get_param_as_bool('pretty')
+
+        stream = req.get_param_as_bool('stream')
+        include = req.get_param_as_list('include') or []
+        fields = req.get_param_as_list('fields') or []
+
+        self._validate_fields(fields)
+
+        shape = (resource_id is None, tuple(fields), tuple(include))
+        schema = self._schema(shape)
+        self._validate_include(schema, include, stream)
+
+        serializer = get_serializer(schema)
 
-            result = self._query
+        ids = req.get_param_as_list('ids', transform=int) if schema.many else None
 
-            if sorting_params:
-                sorting = self._parse_sorting_params(sorting_params)
-                result = result.order_by(*sorting)
+        if ids is not None:
+            if scope is not None:
+                raise HTTPInvalidParams('Related collections are not listed by ids.', 'ids')
+            if stream:
+                raise HTTPInvalidParams('Resources listed by ids cannot be streamed.', 'ids')
+            if len(ids) > settings.MAX_PAGE_SIZE:
+                raise HTTPInvalidParams('Use at most {} ids.'.format(settings.MAX_PAGE_SIZE), 'ids')
 
-            result = result.offset((page - 1) * page_size).limit(page_size)
+            with timed('query'):
+                result, missing = self._get_many(schema, serializer, shape, ids)
+            if missing:
+                resp.set_header('X-Missing-Ids', ','.join(str(resource_id) for resource_id in missing))
+        elif schema.many:
+            page = req.get_param_as_int('page', min=1) or 1
+            page_size = req.get_param_as_int('page_size', min=1) or 10
+
+            if not stream and page_size > settings.MAX_PAGE_SIZE:
+                raise HTTPInvalidParams('Use at most {} or stream the response.'.format(settings.MAX_PAGE_SIZE),
+                                        'page_size')
+
+            sorting_params = req.get_param_as_list('sort', transform=lambda param: param.split(':'))
+            cursor = req.get_param('cursor')
+
+            sorting = self._parse_sorting_params(sorting_params or [])
+            filters = self._parse_filter_params(req.get_param_as_list('filter') or [])
+
+            last_values = None
+            if cursor:
+                try:
+                    last_values = pagination.decode_cursor(sorting, cursor)
+                except ValueError as err:
+                    raise HTTPInvalidParams(str(err), 'cursor') from err
+
+            params = {'limit': page_size}
+            if last_values is None:
+                params['offset'] = (page - 1) * page_size
+                nulls = None
+            else:
+                params.update(('cursor_{}'.format(index), value) for index, value in enumerate(last_values)
+                              if value is not None)
+                # NULLs are compared differently, so they change the statement
+                nulls = tuple(value is None for value in last_values)
+            params.update(filtering.params(filters))
+            if scope is not None:
+                params['parent_id'] = scope.parent_id
+
+            if req.get_param_as_bool('count'):
+                if scope is not None:
+                    raise HTTPInvalidParams('Related collections are not counted.', 'count')
+                self._set_count_headers(resp, self._total_count(filters))
+
+            statement = self._list_statement(schema, serializer, shape, sorting, nulls, filters, scope)
+
+            if stream:
+                resp.stream = self._stream_many(statement, params, serializer, pretty)
+                resp.status = falcon.HTTP_200
+                return
+
+            with timed('query'):
+                if isinstance(statement, BakedQuery):
+                    result = statement(self.session).params(params).all()
+                else:
+                    result = self.session.connection(mapper=self._mapper) \
+                        .execution_options(compiled_cache=self._compiled_cache).execute(statement, params).fetchall()
+
+            if len(result) == page_size:
+                resp.set_header('X-Next-Cursor', pagination.encode_cursor(sorting, result[-1]))
+            elif not result and scope is not None and not scope.parent._exists(scope.parent_id):
+                # rows refer to the parent, so it is looked up only if there are none
+                raise falcon.HTTPNotFound()
         else:
-            result = self._query.get(resource_id)
+            query = self._object_query(schema, shape)
+            if fields:
+                projected = fields + ([self.last_modified_attr] if self.last_modified_attr else [])
+                query += (lambda query: self._project(query, projected), shape)
+
+            with timed('query'):
+                result = query(self.session).get(resource_id)
             if not result:
                 raise falcon.HTTPNotFound()
 
-        marshalled = schema.dump(result)
-        serialized = json.dumps(marshalled.data, cls=ImprovedJSONEncoder, indent=None if compact else 4)  # or schema.dumps()
-        resp.body = serialized
+        last_modified = None
+        # only the row itself is updated when it changes, related rows are not
+        if not schema.many and self.last_modified_attr and serializer.attributes is not None and \
+                serializer.attributes.isdisjoint(self._mapper.relationships.keys()):
+            last_modified = settled(getattr(result, self.last_modified_attr))
+
+        # rows and eagerly loaded objects are dumped without the session, relationships loaded lazily are loaded
+        # through it while they are dumped, so it keeps its connection until then
+        lazy = 'lazy' in self.loading_strategies.values()
+        if not lazy:
+            self._release_connection()
+
+        with timed('dump'):
+            marshalled = serializer.dump_many(result) if schema.many else serializer.dump(result)
+        with timed('encode'):
+            body = codec.dumps(marshalled, pretty=pretty)
+
+        if lazy:
+            self._release_connection()
+
+        # the tag is the digest of the body, exact whenever rows change and free of any additional statement
+        if set_validators(req, resp, digest_etag(body), last_modified):
+            return
+
+        resp.data = body
         resp.status = falcon.HTTP_200
 
+    def _cached_read(self, req, resp, resource_id, scope: Scope = None):
+        if scope is None:
+            key = self.cache.make_key(self.plural, resource_id, req)
+            tags = self._cache_tags
+        else:
+            # changes of the collection change the parent object, if not its related ones
+            key = self.cache.make_key((scope.parent.plural, scope.relationship.key), scope.parent_id, req)
+            tags = self._cache_tags | {scope.parent.model_cls}
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached.apply(req, resp)
+            return
+
+        generation = self.cache.generation(tags)
+
+        self._read(req, resp, resource_id, scope)
+
+        if resp.status == falcon.HTTP_200:
+            entry = self.cache.set(key, resp, generation)
+            if entry is not None:
+                req.context[CACHED_RESPONSE] = entry
+
+    def _stream_many(self, statement: Union[BakedQuery, Select], params: dict, serializer: Serializer, pretty: bool):
+        # the request session is removed before the response body is iterated,
+        # so rows are fetched through a dedicated connection opened on first iteration
+        bind = self.session.get_bind(mapper=self._mapper)
+
+        def marshalled_objects(connection):
+            session = Session(bind=connection)
+            try:
+                chunk = []
+                query = statement + (lambda query: query.yield_per(settings.STREAM_CHUNK_SIZE))
+                for obj in query(session).params(params):
+                    chunk.append(obj)
+                    if len(chunk) == settings.STREAM_CHUNK_SIZE:
+                        yield from serializer.dump_many(chunk)
+                        chunk = []
+                        session.expunge_all()
+
+                yield from serializer.dump_many(chunk)
+            finally:
+                session.close()
+
+        def marshalled_rows(connection):
+            result = connection.execution_options(stream_results=True, compiled_cache=self._compiled_cache) \
+                .execute(statement, params)
+            try:
+                chunk = result.fetchmany(settings.STREAM_CHUNK_SIZE)
+                while chunk:
+                    yield from serializer.dump_many(chunk)
+                    chunk = result.fetchmany(settings.STREAM_CHUNK_SIZE)
+            finally:
+                result.close()
+
+        def marshalled():
+            connection = bind.connect()
+            try:
+                if isinstance(statement, BakedQuery):
+                    yield from marshalled_objects(connection)
+                else:
+                    yield from marshalled_rows(connection)
+            finally:
+                connection.close()
+
+        return iterencode_array(marshalled(), pretty=pretty)
+
+    def _export(self, req, resp):
+        encoder_cls = export.ENCODERS.get(req.get_param('format') or 'ndjson')
+        if encoder_cls is None:
+            raise HTTPInvalidParams('Use one of: {}.'.format(', '.join(sorted(export.ENCODERS))), 'format')
+
+        keys = self._export_keys(req.get_param_as_list('fields') or [])
+        filters = self._parse_filter_params(req.get_param_as_list('filter') or [], self._filter_columns)
+
+        key = ('export', keys, filtering.shape(filters))
+        statement = self._statements.get(key)
+        if statement is None:
+            column_attrs = self._mapper.column_attrs
+            statement = select([column_attrs[name].columns[0] for name in keys]).order_by(self._primary_attr)
+            if filters:
+                statement = statement.where(filtering.criteria(filters))
+            self._statements[key] = statement
+
+        encoder = encoder_cls(list(statement.inner_columns))
+
+        resp.content_type = encoder.content_type
+        resp.set_header('Content-Disposition', 'attachment; filename="{}.{}"'.format(
+            self._mapper.local_table.name, encoder.extension))
+        resp.stream = export.stream_rows(self.session.get_bind(mapper=self._mapper), statement,
+                                         filtering.params(filters), encoder, settings.STREAM_CHUNK_SIZE, self.plural,
+                                         self._compiled_cache)
+        resp.status = falcon.HTTP_200
+
+    def _export_keys(self, fields) -> Tuple[str, ...]:
+        """Get keys of column attributes exported for fields, named by their columns as in the exported rows."""
+        declared_fields = self.schema_cls._declared_fields
+        load_only = self.schema_cls.opts.load_only
+
+        def readable(key):
+            return key not in load_only and not (key in declared_fields and declared_fields[key].load_only)
+
+        # column name -> attribute key, e.g. rental_id -> id
+        keys = OrderedDict((attr.columns[0].name, attr.key) for attr in self._mapper.column_attrs if readable(attr.key))
+
+        if not fields:
+            return tuple(keys.values())
+
+        for name in fields:
+            if name not in keys:
+                raise HTTPInvalidParams('"{}" is not an exported column, use one of: {}.'.format(
+                    name, ', '.join(keys)), 'fields')
+
+        return tuple(keys[name] for name in fields)
+
     def _update(self, req, resp, resource_id, partial=False):
-        resource = self._get_for_update(resource_id)
-        if not resource:
+        with timed('query'):
+            resource = self._get_for_update(resource_id)
+        if resource is None:
             raise falcon.HTTPNotFound()
 
         schema = self.schema_cls(instance={})
-        deserialized = json.load(req.bounded_stream)
-        parsed = schema.load(deserialized, session=self.session, instance=resource, partial=partial)
+        deserialized = self._load_body(req)
+        with timed('load'):
+            parsed = schema.load(deserialized, session=self.session, instance=resource, partial=partial)
 
         if parsed.errors:
             raise falcon.HTTPUnprocessableEntity(description=parsed.errors)
 
         try:
-            self.session.flush()
+            with timed('query'):
+                self.session.flush()
+        except SQLAlchemyError as err:
+            raise falcon.HTTPUnprocessableEntity(description='Database error') from err
+
+        resp.status = falcon.HTTP_204
+
+    def _update_many(self, req, resp):
+        deserialized = self._load_body(req)
+        if not isinstance(deserialized, list):
+            raise falcon.HTTPUnprocessableEntity(description='A list of objects is expected.')
+
+        primary_key = self._primary_attr.key
+        ids = [item.get(primary_key) if isinstance(item, dict) else None for item in deserialized]
+        # ids are compared by the database, which may reject values of other types
+        invalid = {index: {primary_key: ['Not a valid integer.']} for index, resource_id in enumerate(ids)
+                   if not isinstance(resource_id, int) or isinstance(resource_id, bool)}
+        if invalid:
+            raise falcon.HTTPBadRequest('Invalid ids', invalid)
+
+        with timed('query'):
+            resources = {
+                getattr(resource, primary_key): resource
+                for resource in self._query.with_for_update(read=True).filter(self._primary_attr.in_(ids))
+            }
+
+        schema = self.schema_cls(instance={})
+        errors = {}
+
+        for index, (resource_id, item) in enumerate(zip(ids, deserialized)):
+            if resource_id not in resources:
+                errors[index] = {primary_key: ['Not found.']}
+                continue
+
+            with timed('load'):
+                parsed = schema.load(item, session=self.session, instance=resources[resource_id], partial=True)
+            if parsed.errors:
+                errors[index] = parsed.errors
+
+        if errors:
+            # already loaded items are rolled back along with the session
+            raise falcon.HTTPUnprocessableEntity(description=errors)
+
+        try:
+            # rows with the same set of changed columns are updated with a single executemany
+            with timed('query'):
+                self.session.flush()
         except SQLAlchemyError as err:
             raise falcon.HTTPUnprocessableEntity(description='Database error') from err
 
@@ -149,32 +521,387 @@ class BaseResource:
 
         resp.status = falcon.HTTP_204
 
+    def _delete_many(self, req, resp):
+        ids = req.get_param_as_list('ids', transform=int, required=True)
+
+        # the session deletes association table rows of the objects, so their collections are loaded up front
+        secondary_options = [STRATEGIES['selectin'](relationship.key) for relationship in self._mapper.relationships
+                             if relationship.secondary is not None]
+
+        resources = self._query.options(*secondary_options).filter(self._primary_attr.in_(ids)).all()
+
+        missing = set(ids) - {getattr(resource, self._primary_attr.key) for resource in resources}
+        if missing:
+            raise falcon.HTTPNotFound(description={'missing': sorted(missing)})
+
+        for resource in resources:
+            self.session.delete(resource)
+
+        try:
+            self.session.flush()
+        except SQLAlchemyError as err:
+            raise falcon.HTTPUnprocessableEntity(description='Database error') from err
+
+        resp.status = falcon.HTTP_204
+
+    def _release_connection(self):
+        """Return the connection to the pool once everything dumped is loaded, before it is serialized and sent.
+
+        Reads are never committed, closing the session rolls back their transaction. Loaded objects are detached.
+
+        """
+        self.session.close()
+
+    def _validate_fields(self, fields):
+        mapper = self._mapper
+        declared_fields = self.schema_cls._declared_fields
+        load_only = self.schema_cls.opts.load_only
+
+        for key in fields:
+            if key not in declared_fields or declared_fields[key].load_only or key in load_only or \
+                    (key not in mapper.column_attrs and key not in mapper.relationships):
+                raise HTTPInvalidParams('"{}" is not a readable field.'.format(key), 'fields')
+
+    def _project(self, query, fields):
+        """Load only mapped columns out of the given fields, along with the primary key."""
+        mapper = self._mapper
+        columns = [key for key in fields if key in mapper.column_attrs]
+        # many to one relationships are dumped from their foreign keys
+        columns.extend(filter(None, (foreign_key(mapper.relationships[key]) for key in fields
+                                     if key in mapper.relationships)))
+
+        return query.options(load_only(*columns))
+
+    def _schema(self, shape: Shape) -> BaseSchema:
+        """Get the schema of reads, created once per shape as creating one copies all of its fields."""
+        schema = self._schemas.get(shape)
+        if schema is None:
+            many, fields, include = shape
+            schema = self._schemas[shape] = self.schema_cls(many=many, only=list(fields),
+                                                             context={'include': list(include)})
+
+        return schema
+
+    def _object_query(self, schema: BaseSchema, shape: Shape) -> BakedQuery:
+        """Get a query of objects dumped with the schema, loader options are planned when it is baked."""
+        include = schema.context['include']
+
+        return self._baked_query + (lambda query: query.options(
+            *plan_loading(self.model_cls, schema, include, self.loading_strategies, foreign_keys=True)), shape)
+
+    def _get_many(self, schema: BaseSchema, serializer: Serializer, shape: Shape, ids: List[int]) -> Tuple[list, list]:
+        """Get objects (or rows) of the ids in the requested order, along with ids not found.
+
+        Objects already in the identity map of the session are used as long as their dumped attributes are loaded, the
+        others are selected at once.
+
+        """
+        found = {}
+        primary_key = self._primary_attr.key
+
+        for resource_id in ids:
+            obj = self.session.identity_map.get(self._mapper.identity_key_from_primary_key([resource_id]))
+            if obj is not None and serializer.attributes is not None and \
+                    not serializer.attributes.intersection(inspect(obj).unloaded):
+                found[resource_id] = obj
+
+        selected = [resource_id for resource_id in OrderedDict.fromkeys(ids) if resource_id not in found]
+        if selected:
+            # statements are built for powers of two of ids, padded with the last one, so few of them are compiled
+            size = 1 << (len(selected) - 1).bit_length()
+            params = {'id_{}'.format(index): selected[min(index, len(selected) - 1)] for index in range(size)}
+
+            statement = self._ids_statement(schema, serializer, shape, size)
+            if isinstance(statement, BakedQuery):
+                rows = statement(self.session).params(params).all()
+            else:
+                rows = self.session.connection(mapper=self._mapper) \
+                    .execution_options(compiled_cache=self._compiled_cache).execute(statement, params).fetchall()
+
+            found.update((getattr(row, primary_key), row) for row in rows)
+
+        return [found[resource_id] for resource_id in ids if resource_id in found], \
+            [resource_id for resource_id in ids if resource_id not in found]
+
+    def _ids_statement(self, schema: BaseSchema, serializer: Serializer, shape: Shape,
+                       size: int) -> Union[BakedQuery, Select]:
+        """Get a query of objects (or a select of rows if possible) with primary keys ``id_0`` to ``id_<size - 1>``."""
+        key = shape + ('ids', size)
+        primary_key = self._primary_attr.key
+        criteria = self._primary_attr.in_([bindparam('id_{}'.format(index)) for index in range(size)])
+
+        if not self._selects_rows(serializer):
+            fields = list(shape[1])
+
+            def filter_ids(query):
+                if fields:
+                    query = self._project(query, fields + [primary_key])
+                return query.filter(criteria)
+
+            return self._object_query(schema, shape) + (filter_ids, key)
+
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._statements[key] = self._select(serializer.attributes.union([primary_key])).where(criteria)
+
+        return statement
+
+    def _total_count(self, filters: Sequence[filtering.Filter]) -> counting.Count:
+        key = (self.model_cls, tuple((attr.key, operator, values) for attr, operator, values in filters))
+
+        if self.counts is not None:
+            count = self.counts.get(key)
+            if count is not None:
+                return count
+            generation = self.counts.generation([self.model_cls])
+
+        with timed('count'):
+            count = self._count(filters)
+
+        if self.counts is not None:
+            self.counts.put(key, count, generation)
+
+        return count
+
+    def _count(self, filters: Sequence[filtering.Filter]) -> counting.Count:
+        """Count rows exactly unless there are too many of them, then estimate them if the database can."""
+        connection = self.session.connection(mapper=self._mapper) \
+            .execution_options(compiled_cache=self._compiled_cache)
+        table = self._mapper.local_table
+
+        if not filters:
+            estimate = counting.estimate_table(connection, table)
+            if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+                return counting.Count(estimate, False)
+
+            return counting.Count(connection.execute(self._count_statements(filters)[0]).scalar(), True)
+
+        count_statement, rows_statement = self._count_statements(filters)
+        params = dict(filtering.params(filters), count_limit=settings.COUNT_EXACT_LIMIT + 1)
+        value = connection.execute(count_statement, params).scalar()
+        if value <= settings.COUNT_EXACT_LIMIT:
+            return counting.Count(value, True)
+
+        # the limit is a lower bound of the count
+        estimate = counting.estimate_rows(connection, rows_statement, params)
+        return counting.Count(max(estimate or 0, settings.COUNT_EXACT_LIMIT), False)
+
+    def _count_statements(self, filters: Sequence[filtering.Filter]) -> Tuple[Select, Optional[Select]]:
+        """Get selects of the count (of at most ``count_limit`` rows, if filtered) and of the counted rows."""
+        key = ('count', filtering.shape(filters))
+
+        statements = self._statements.get(key)
+        if statements is None:
+            if filters:
+                rows = select([self._primary_attr]).where(filtering.criteria(filters))
+                count = select([func.count()]).select_from(rows.limit(bindparam('count_limit')).alias())
+                statements = count, rows
+            else:
+                statements = select([func.count()]).select_from(self._mapper.local_table), None
+            self._statements[key] = statements
+
+        return statements
+
+    def _list_statement(self, schema: BaseSchema, serializer: Serializer, shape: Shape, sorting: pagination.Sorting,
+                        nulls: Optional[Tuple[bool, ...]], filters: Sequence[filtering.Filter] = (),
+                        scope: Scope = None) -> Union[BakedQuery, Select]:
+        """Get a page query, a Core select of rows if possible, parameters are the limit, offset or cursor and filters.
+
+        ``nulls`` tells which cursor values are NULL, it is None when pages are selected by offset.
+
+        """
+        # cursors are built from the sort key values of the last row
+        sort_keys = [attr.key for attr, _ in sorting]
+        key = shape + (tuple((attr.key, descending) for attr, descending in sorting), nulls, filtering.shape(filters),
+                       scope.relationship if scope is not None else None)
+
+        if not self._selects_rows(serializer):
+            fields = list(shape[1])
+
+            def paginate(query):
+                if fields:
+                    query = self._project(query, fields + sort_keys)
+                return self._paginate(query, sorting, nulls, filters, scope)
+
+            return self._object_query(schema, shape) + (paginate, key)
+
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._statements[key] = self._paginate(self._select(serializer.attributes.union(sort_keys)),
+                                                               sorting, nulls, filters, scope)
+
+        return statement
+
+    def _paginate(self, statement: Union[Query, Select], sorting: pagination.Sorting,
+                  nulls: Optional[Tuple[bool, ...]], filters: Sequence[filtering.Filter] = (),
+                  scope: Scope = None) -> Union[Query, Select]:
+        statement = statement.order_by(*pagination.ordering(sorting))
+
+        criteria = []
+        if filters:
+            criteria.append(filtering.criteria(filters))
+        if scope is not None:
+            criteria.append(scope.criteria)
+        if criteria:
+            statement = statement.where(and_(*criteria)) if isinstance(statement, Select) \
+                else statement.filter(*criteria)
+
+        if nulls is None:
+            statement = statement.offset(bindparam('offset'))
+        else:
+            values = [None if null else bindparam('cursor_{}'.format(index)) for index, null in enumerate(nulls)]
+            criteria = pagination.keyset_criteria(sorting, values)
+            statement = statement.where(criteria) if isinstance(statement, Select) else statement.filter(criteria)
+
+        return statement.limit(bindparam('limit'))
+
+    def _selects_rows(self, serializer: Serializer) -> bool:
+        """Whether dumped objects can be rows of mapped columns, i.e. no relationships have to be loaded."""
+        return self.select_rows and serializer.attributes is not None and \
+            serializer.attributes.issubset(self._column_keys)
+
+    def _select(self, attributes) -> Select:
+        """Select columns of the given attributes labelled with attribute names, so that rows are dumped as objects."""
+        column_attrs = self._mapper.column_attrs
+
+        return select([column_attrs[key].columns[0].label(key) for key in sorted(attributes)])
+
+    def _validate_include(self, schema, include, stream):
+        relationships = self._mapper.relationships
+        attributes = dumped_attributes(schema)
+
+        for key in include:
+            if key not in relationships or key not in attributes:
+                raise HTTPInvalidParams('"{}" is not an includable relationship.'.format(key), 'include')
+            if stream and relationships[key].uselist:
+                raise HTTPInvalidParams('Collections cannot be included in streamed responses.', 'include')
+
     def _parse_sorting_params(self, params):
         results = []
 
-        inspection_obj = inspect(self.model_cls)
-
-        mapped_columns = [attr.key for attr in inspection_obj.mapper.column_attrs]
+        primary_attr = self._primary_attr
 
         for param in params:
             column_name = param[0]
             direction = param[1] if len(param) > 1 else 'asc'
-            if column_name in mapped_columns:
+            if column_name in self._column_keys:
                 column = getattr(self.model_cls, column_name)
-                results.append(column.desc() if direction == 'desc' else column)
+                results.append((column, direction == 'desc'))
+                if column_name == primary_attr.key:
+                    # primary key is unique, following columns would never be compared
+                    return results
+
+        # primary key is the tiebreaker making the order (and cursors) deterministic
+        results.append((primary_attr, False))
 
         return results
 
-    def _serialize_schema_field(self, field):
+    def _parse_filter_params(self, params, names: Dict[str, str] = None) -> List[filtering.Filter]:
+        """Parse filters of attributes named by their keys or, if given, by ``names`` (name -> attribute key)."""
+        if names is None:
+            names = self._filter_keys
+        results = []
+
+        for param in params:
+            try:
+                name, operator, values = filtering.split(param)
+            except ValueError as err:
+                raise HTTPInvalidParams(str(err), 'filter') from err
+
+            if name not in names:
+                raise HTTPInvalidParams('"{}" is not filterable, use one of: {}.'.format(
+                    name, ', '.join(names) or 'none'), 'filter')
+
+            attr = getattr(self.model_cls, names[name])
+            try:
+                results.append((attr, operator, tuple(filtering.decode_value(attr, operator, value)
+                                                      for value in values)))
+            except ValueError as err:
+                raise HTTPInvalidParams(str(err), 'filter') from err
+
+        return results
+
+    def _set_count_headers(self, resp: Response, count: counting.Count):
+        resp.set_header('X-Total-Count', str(count.value))
+        resp.set_header('X-Total-Count-Exact', 'true' if count.exact else 'false')
+
+    def _serialize_schema_field(self, key, field):
+        opts = self.schema_cls.opts
         result = {
             'label': field.metadata.get('label', None),
             'type': type(field).__name__.lower(),
             'required': field.required,
-            'readable': not field.load_only,
-            'writable': not field.dump_only,
+            # declared fields are shared by all schema instances, options of the schema apply to copies of them only
+            'readable': not field.load_only and key not in opts.load_only,
+            'writable': not field.dump_only and key not in opts.dump_only,
         }
 
         if result['type'] == 'nested':
             result['many'] = field.many
 
         return result
+
+
+def add_routes(api: falcon.API, path: str, resource: BaseResource):
+    """Route the collection (``path/``), its items (``path/{resource_id}``) and export (``path/export``)."""
+    api.add_route(path + '/', resource)
+    api.add_route(path + '/{resource_id:int}', resource)
+    api.add_route(path + '/export', ExportResource(resource))
+
+
+class ExportResource:
+    """Export of the resource (``path/export``), rows of its table streamed as NDJSON or CSV."""
+    session: Session = None
+
+    def __init__(self, resource: BaseResource):
+        self.resource = resource
+
+    def on_get(self, req: Request, resp: Response):
+        # the session proxy set by the middleware is shared by all resources
+        self.resource.session = self.session
+
+        self.resource._export(req, resp)
+
+
+class RelatedResource:
+    """Collection of a resource, e.g. ``/films/{resource_id}/actors``, listed by the resource of the related model.
+
+    Pages are selected from the related table (through the secondary table, if any), so the collection is never loaded
+    as a whole. Lists are paginated, sorted, filtered and dumped as lists of the related resource.
+
+    """
+    session: Session = None
+
+    def __init__(self, parent: BaseResource, key: str, resource: BaseResource):
+        self.parent = parent
+        self.resource = resource
+        self.relationship = parent._mapper.relationships[key]
+        self.criteria = related_criteria(self.relationship)
+
+    def on_get(self, req: Request, resp: Response, resource_id):
+        # the session proxy set by the middleware is shared by all resources
+        self.parent.session = self.resource.session = self.session
+
+        self.resource.on_get(req, resp, scope=Scope(self.relationship, self.criteria, self.parent, resource_id))
+
+
+def add_related_routes(api: falcon.API, resources: Dict[str, BaseResource]) -> List[str]:
+    """Route collections of resources (``path/{resource_id}/key``) whose models have resources too, returns paths.
+
+    Collections of other models are not routed, e.g. ``Film.categories`` or ``Store.inventories``.
+
+    """
+    by_model = {resource.model_cls: resource for resource in resources.values()}
+    paths = []
+
+    for path, resource in resources.items():
+        for relationship in resource._mapper.relationships:
+            related = by_model.get(relationship.mapper.class_)
+            if related is None or related_criteria(relationship) is None:
+                continue
+
+            paths.append('{}/{{resource_id}}/{}'.format(path, relationship.key))
+            api.add_route('{}/{{resource_id:int}}/{}'.format(path, relationship.key),
+                          RelatedResource(resource, relationship.key, related))
+
+    return paths
@@ -8,6 +8,7 @@ class StaffResource(BaseResource):
     model_cls = Staff
     singular = 'Staff'
     plural = 'Staff'
+    filterable = ('id', 'store_id', 'address_id')
 
 
 class StoreResource(BaseResource):
@@ -15,6 +16,7 @@ class StoreResource(BaseResource):
     model_cls = Store
     singular = 'Store'
     plural = 'Stores'
+    filterable = ('id', 'manager_staff_id', 'address_id')
 
 
 class PaymentResource(BaseResource):
@@ -22,6 +24,7 @@ class PaymentResource(BaseResource):
     model_cls = Payment
     singular = 'Payment'
     plural = 'Payments'
+    filterable = ('id', 'customer_id', 'staff_id', 'rental_id', 'payment_date')
 
 
 class RentalResource(BaseResource):
@@ -29,3 +32,4 @@ class RentalResource(BaseResource):
     model_cls = Rental
     singular = 'Rental'
     plural = 'Rentals'
+    filterable = ('id', 'rental_date', 'inventory_id', 'customer_id', 'staff_id')
@@ -0,0 +1,30 @@
+from typing import Dict, Sequence
+
+from falconer import settings
+from falconer.codecs import codec
+from falconer.conditional import StaticDocument
+from falconer.resources.base import LIST_HANDLING_METHODS, RESOURCE_HANDLING_METHODS, BaseResource
+
+
+class DiscoveryResource:
+    """Describes every route of the API in one document, encoded once when created."""
+
+    def __init__(self, resources: Dict[str, BaseResource], routes: Sequence[str] = ()):
+        document = {
+            'resources': [
+                {
+                    'name': resource.plural,
+                    'singular': resource.singular,
+                    'collection': {'path': path + '/', 'methods': LIST_HANDLING_METHODS + ['OPTIONS']},
+                    'item': {'path': path + '/{resource_id}', 'methods': RESOURCE_HANDLING_METHODS + ['OPTIONS']},
+                    'export': {'path': path + '/export', 'methods': ['GET']},
+                    'fields': resource.describe()['fields'],
+                } for path, resource in resources.items()
+            ],
+            'routes': ['/'] + list(routes),
+        }
+
+        self._document = StaticDocument(codec.dumps(document), settings.METADATA_MAX_AGE)
+
+    def on_get(self, req, resp):
+        self._document.respond(req, resp)
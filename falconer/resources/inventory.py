@@ -8,6 +8,7 @@ class ActorResource(BaseResource):
     model_cls = Actor
     singular = 'Actor'
     plural = 'Actors'
+    filterable = ('id', 'last_name')
 
 
 class FilmResource(BaseResource):
@@ -15,3 +16,4 @@ class FilmResource(BaseResource):
     model_cls = Film
     singular = 'Film'
     plural = 'Films'
+    filterable = ('id', 'title', 'language_id', 'original_language_id')
@@ -1,9 +1,12 @@
-import collections
+import decimal
 
 import marshmallow_sqlalchemy as ma
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import ColumnProperty
 
-from falconer.db.model import Base
+from falconer.db.loading import collection_attributes
+from falconer.schemas.fields import DecimalNumber, EnumName
 
 
 def _is_primary_key(column):
@@ -19,6 +22,9 @@ def _is_read_only(column):
 
 
 class BaseModelConverter(ma.ModelConverter):
+    # dump values which JSON backends encode natively
+    SQLA_TYPE_MAPPING = {**ma.ModelConverter.SQLA_TYPE_MAPPING, sa.Enum: EnumName, mysql.ENUM: EnumName}
+
     def property2field(self, prop, instance=True, field_class=None, **kwargs):
         # add some additional recognition if it is a simple mapping of a property to a single column
         column_property = isinstance(prop, ColumnProperty)
@@ -35,16 +41,20 @@ class BaseSchemaOpts(ma.ModelSchemaOpts):
     def __init__(self, meta, *args, **kwargs):
         if not hasattr(meta, 'model_converter'):
             meta.model_converter = BaseModelConverter
+        if not hasattr(meta, 'ordered'):
+            # keys are dumped in the order fields are declared (or requested), not in the order of a set which varies
+            # between processes, so that bodies and their ETags are the same whichever worker serves them
+            meta.ordered = True
         super(BaseSchemaOpts, self).__init__(meta, *args, **kwargs)
 
 
 class BaseSchema(ma.ModelSchema):
     OPTIONS_CLASS = BaseSchemaOpts
+    TYPE_MAPPING = {**ma.ModelSchema.TYPE_MAPPING, decimal.Decimal: DecimalNumber}
 
     def get_attribute(self, obj, attr, default):
-        field = super(BaseSchema, self).get_attribute(obj, attr, default)
-        if self.many and isinstance(field, collections.Sequence) and all(isinstance(obj, Base) for obj in field):
-            # do not serialize one to many fields when serializing many objects
+        if self.many and attr in collection_attributes(self.opts.model) and attr not in self.context.get('include', ()):
+            # do not serialize one to many fields when serializing many objects, unless explicitly included
             return default
 
-        return field
+        return super(BaseSchema, self).get_attribute(obj, attr, default)
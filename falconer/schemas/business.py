@@ -5,6 +5,8 @@ from falconer.schemas.base import BaseSchema
 class StaffSchema(BaseSchema):
     class Meta:
         model = model.Staff
+        # accepted when staff are written, never dumped
+        load_only = ('password',)
 
 
 class StoreSchema(BaseSchema):
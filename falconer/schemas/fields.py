@@ -0,0 +1,18 @@
+from enum import Enum
+
+from marshmallow import fields
+
+
+class EnumName(fields.Field):
+    """Enum dumped as the name of its member."""
+
+    def _serialize(self, value, attr, obj):
+        return value.name if isinstance(value, Enum) else value
+
+
+class DecimalNumber(fields.Decimal):
+    """Decimal loaded and dumped exactly, dumped as a string as JSON backends encode decimals as floats (if at all)."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('as_string', True)
+        super(DecimalNumber, self).__init__(*args, **kwargs)
@@ -0,0 +1,48 @@
+import os
+
+# upper bound of ``page_size`` for responses built in memory, streamed responses are not limited
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 100))
+
+# number of rows fetched and serialized at once by streamed responses
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 500))
+
+# queries (and compiled statements) of every resource cached for different fields, includes, sortings...
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 200))
+
+# seconds clients may reuse OPTIONS and discovery documents (served with ETags) without revalidating them
+METADATA_MAX_AGE = int(os.getenv('METADATA_MAX_AGE', 3600))
+
+# total counts (X-Total-Count) are cached per model until it is written to, or for this many seconds
+COUNT_CACHE_SIZE = int(os.getenv('COUNT_CACHE_SIZE', 1000))
+COUNT_CACHE_TTL = float(os.getenv('COUNT_CACHE_TTL', 60))
+# unfiltered tables the database estimates above this number of rows are not counted exactly (PostgreSQL only)
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', 100000))
+# filtered rows are counted exactly up to this number, broader filters are estimated
+COUNT_EXACT_LIMIT = int(os.getenv('COUNT_EXACT_LIMIT', 10000))
+
+# process local response cache, disabled unless the number of entries is set
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 0))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 60))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# seconds after a write during which reads of the same client are served by the primary database instead of replicas
+# (if there are replicas at all), clients are given a cookie only by requests that have changed something
+READ_YOUR_WRITES_WINDOW = float(os.getenv('READ_YOUR_WRITES_WINDOW', 10))
+
+# JSON backend (orjson, ujson, simplejson or json), the fastest installed one is used by default
+JSON_BACKEND = os.getenv('JSON_BACKEND', None)
+
+# responses smaller than this (bytes) are sent uncompressed, streamed responses are always compressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+# compression level passed to every encoder (zlib: 1-9, brotli: 0-11, zstd: 1-22)
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+
+# per request SQL statement counts and timings, reported in Server-Timing header and at /metrics
+INSTRUMENTATION = bool(int(os.getenv('INSTRUMENTATION', 1)))
+
+# development diagnostics: "log" reports N+1 queries and slow statements, "strict" raises on N+1 queries as well
+DIAGNOSTICS = os.getenv('DIAGNOSTICS', '')
+# statements of the same shape a request may execute before it is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+# seconds after which statements are logged with their plans
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.1))
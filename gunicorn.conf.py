@@ -0,0 +1,6 @@
+from falconer.db.utils import dispose_engines
+
+
+def pre_fork(server, worker):
+    # workers must not inherit connections pooled by the arbiter, e.g. when the application is preloaded
+    dispose_engines()
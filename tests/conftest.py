@@ -0,0 +1,168 @@
+import os
+import tempfile
+
+# the application connects to the database named by the environment when imported, tests use a SQLite file of their own
+_database_dir = tempfile.mkdtemp(prefix='falconer-tests-')
+os.environ['DB_DRIVER_NAME'] = 'sqlite'
+os.environ['DB_NAME'] = os.path.join(_database_dir, 'test.sqlite3')
+for _variable in ('DB_REPLICA_URLS', 'RESPONSE_CACHE_SIZE', 'DIAGNOSTICS', 'JSON_BACKEND'):
+    os.environ.pop(_variable, None)
+
+import shutil  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+from decimal import Decimal  # noqa: E402
+
+import pytest  # noqa: E402
+from falcon import testing  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from falconer import app, models  # noqa: E402
+from falconer.db.model import Base  # noqa: E402
+from falconer.db.utils import get_engine  # noqa: E402
+
+UPDATED = datetime(2006, 2, 15, 4, 57, 12)
+STARTED = datetime(2005, 5, 24, 22, 53, 30)
+
+ACTORS = 20
+FILMS = 30
+PAYMENTS = 25
+RENTALS = 20
+
+
+def film_actors(film_id):
+    return sorted({(film_id * 3 + offset) % ACTORS + 1 for offset in range(3)})
+
+
+def populate(connection):
+    """Insert a small, deterministic copy of Sakila data, every table has a few rows (keyed by column names)."""
+    ratings = list(models.Film.MpaaRating)
+
+    connection.execute(models.Language.__table__.insert(), [
+        {'language_id': 1, 'name': 'English', 'last_update': UPDATED},
+        {'language_id': 2, 'name': 'Italian', 'last_update': UPDATED},
+    ])
+    connection.execute(models.Category.__table__.insert(), [
+        {'category_id': category_id, 'name': 'Category {}'.format(category_id), 'last_update': UPDATED}
+        for category_id in range(1, 4)
+    ])
+    connection.execute(models.Actor.__table__.insert(), [
+        {'actor_id': actor_id, 'first_name': 'First {}'.format(actor_id), 'last_name': 'LAST{}'.format(actor_id % 5),
+         'last_update': UPDATED} for actor_id in range(1, ACTORS + 1)
+    ])
+    connection.execute(models.Film.__table__.insert(), [
+        {'film_id': film_id, 'title': 'FILM {:02d}'.format(film_id), 'description': 'A film number {}'.format(film_id),
+         'release_year': 2006, 'language_id': 1 + film_id % 2, 'original_language_id': None, 'rental_duration': 3,
+         'rental_rate': Decimal('4.99') if film_id % 2 else Decimal('2.99'), 'replacement_cost': Decimal('19.99'),
+         'length': None if film_id % 5 == 0 else 60 + film_id % 7, 'rating': ratings[film_id % len(ratings)],
+         'special_features': 'Trailers', 'last_update': UPDATED + timedelta(seconds=film_id)}
+        for film_id in range(1, FILMS + 1)
+    ])
+    connection.execute(models.film_actor_table.insert(), [
+        {'film_id': film_id, 'actor_id': actor_id, 'last_update': UPDATED}
+        for film_id in range(1, FILMS + 1) for actor_id in film_actors(film_id)
+    ])
+    connection.execute(models.film_category_table.insert(), [
+        {'film_id': film_id, 'category_id': 1 + film_id % 3, 'last_update': UPDATED} for film_id in range(1, FILMS + 1)
+    ])
+    connection.execute(models.Country.__table__.insert(), [
+        {'country_id': 1, 'country': 'Poland', 'last_update': UPDATED},
+    ])
+    connection.execute(models.City.__table__.insert(), [
+        {'city_id': 1, 'city': 'Warsaw', 'country_id': 1, 'last_update': UPDATED},
+    ])
+    connection.execute(models.Address.__table__.insert(), [
+        {'address_id': address_id, 'address': '{} Main Street'.format(address_id), 'district': 'Centre',
+         'city_id': 1, 'postal_code': '00-001', 'phone': '123456789', 'last_update': UPDATED}
+        for address_id in range(1, 8)
+    ])
+    connection.execute(models.Store.__table__.insert(), [
+        {'store_id': store_id, 'manager_staff_id': store_id, 'address_id': store_id, 'last_update': UPDATED}
+        for store_id in (1, 2)
+    ])
+    connection.execute(models.Staff.__table__.insert(), [
+        {'staff_id': staff_id, 'first_name': 'Staff', 'last_name': str(staff_id), 'address_id': 2 + staff_id,
+         'picture': None, 'email': 'staff{}@example.com'.format(staff_id), 'store_id': staff_id, 'active': True,
+         'username': 'staff{}'.format(staff_id), 'password': 'secret', 'last_update': UPDATED}
+        for staff_id in (1, 2)
+    ])
+    connection.execute(models.Customer.__table__.insert(), [
+        {'customer_id': customer_id, 'store_id': 1 + customer_id % 2, 'first_name': 'Customer',
+         'last_name': 'C{}'.format(customer_id), 'email': None, 'address_id': 4 + customer_id % 4, 'active': True,
+         'create_date': STARTED, 'last_update': UPDATED}
+        for customer_id in range(1, 6)
+    ])
+    connection.execute(models.Inventory.__table__.insert(), [
+        {'inventory_id': inventory_id, 'film_id': inventory_id, 'store_id': 1 + inventory_id % 2,
+         'last_update': UPDATED}
+        for inventory_id in range(1, 11)
+    ])
+    connection.execute(models.Rental.__table__.insert(), [
+        {'rental_id': rental_id, 'rental_date': STARTED + timedelta(hours=rental_id),
+         'inventory_id': 1 + rental_id % 10, 'customer_id': 1 + rental_id % 5,
+         'return_date': None if rental_id % 4 == 0 else STARTED + timedelta(days=3, hours=rental_id),
+         'staff_id': 1 + rental_id % 2, 'last_update': UPDATED}
+        for rental_id in range(1, RENTALS + 1)
+    ])
+    connection.execute(models.Payment.__table__.insert(), [
+        {'payment_id': payment_id, 'customer_id': 1 + payment_id % 5, 'staff_id': 1 + payment_id % 2,
+         'rental_id': 1 + payment_id % RENTALS, 'amount': Decimal('0.99') + payment_id,
+         'payment_date': STARTED + timedelta(hours=payment_id, minutes=30), 'last_update': UPDATED}
+        for payment_id in range(1, PAYMENTS + 1)
+    ])
+
+
+@pytest.fixture(scope='session')
+def engine():
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+
+    yield engine
+
+    engine.dispose()
+    shutil.rmtree(_database_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def db(engine):
+    """Every test starts with the same rows."""
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+        populate(connection)
+    # counts of the rows of previous tests
+    app.counts.clear()
+
+    yield engine
+
+    app.Session.remove()
+
+
+@pytest.fixture
+def client():
+    return testing.TestClient(app.api)
+
+
+@pytest.fixture
+def session(engine):
+    """Session of the test itself, e.g. to check what requests have written."""
+    session = Session(bind=engine)
+
+    yield session
+
+    session.close()
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements executed while the test runs."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+
+    yield executed
+
+    event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from sqlalchemy.sql import compiler
+
+
+@pytest.fixture
+def compilations(monkeypatch):
+    """Number of statements compiled to SQL."""
+    count = [0]
+    init = compiler.SQLCompiler.__init__
+
+    def counting_init(self, *args, **kwargs):
+        count[0] += 1
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(compiler.SQLCompiler, '__init__', counting_init)
+    return count
+
+
+@pytest.mark.parametrize('method', ['simulate_put', 'simulate_patch'])
+def test_updates_of_missing_resources(client, method):
+    result = getattr(client, method)('/actors/1000', body=json.dumps({'first_name': 'Missing', 'last_name': 'NONE'}))
+
+    assert result.status_code == 404
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/films/7', {}),
+    ('/films/7', {'fields': 'title,actors'}),
+    ('/films/', {'page_size': 5}),
+    ('/films/', {'page_size': 5, 'include': 'actors'}),
+    ('/films/', {'page_size': 5, 'sort': 'length:desc', 'filter': 'id:lte:25'}),
+    ('/films/7/actors', {}),
+    ('/actors/', {'ids': '1,2,3'}),
+])
+def test_repeated_reads_compile_no_statements(client, compilations, path, params):
+    for page in (1, 6):
+        # full and empty pages, nested ones look their parent up when they are empty
+        client.simulate_get(path, params=dict(params, page=page))
+    compilations[0] = 0
+
+    for page in range(1, 7):
+        # bound parameters vary, statements do not
+        assert client.simulate_get(path, params=dict(params, page=page)).status_code == 200
+
+    assert compilations[0] == 0
+
+
+def test_repeated_updates_compile_no_locking_reads(client, statements, compilations):
+    client.simulate_patch('/actors/1', body=json.dumps({'first_name': 'One'}))
+    compilations[0] = 0
+
+    client.simulate_patch('/actors/2', body=json.dumps({'first_name': 'Two'}))
+
+    # the ORM caches UPDATE statements per mapper and set of changed columns
+    assert compilations[0] == 0
+    assert statements[-2].startswith('SELECT') and statements[-1].startswith('UPDATE')
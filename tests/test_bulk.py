@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from sqlalchemy import func
+
+from falconer import models
+
+
+def actor_names(session):
+    return dict(session.query(models.Actor.id, models.Actor.first_name))
+
+
+def test_create_many(client, session):
+    result = client.simulate_post('/actors/', body=json.dumps([
+        {'first_name': 'New', 'last_name': 'ONE'},
+        {'first_name': 'New', 'last_name': 'TWO'},
+    ]))
+
+    assert result.status_code == 201
+    assert result.json == [21, 22]
+    assert session.query(models.Actor.last_name).filter(models.Actor.id.in_(result.json)).order_by(
+        models.Actor.id).all() == [('ONE',), ('TWO',)]
+
+
+def test_create_many_is_all_or_nothing(client, session):
+    result = client.simulate_post('/actors/', body=json.dumps([
+        {'first_name': 'New', 'last_name': 'ONE'},
+        {'first_name': 'New'},
+    ]))
+
+    assert result.status_code == 422
+    assert list(result.json['description']) == ['1']
+    assert session.query(func.count(models.Actor.id)).scalar() == 20
+
+
+def test_update_many(client, session):
+    result = client.simulate_patch('/actors/', body=json.dumps([
+        {'id': 2, 'first_name': 'Two'},
+        {'id': 1, 'first_name': 'One'},
+    ]))
+
+    assert result.status_code == 204
+    names = actor_names(session)
+    assert (names[1], names[2], names[3]) == ('One', 'Two', 'First 3')
+
+
+def test_update_many_is_all_or_nothing(client, session):
+    result = client.simulate_patch('/actors/', body=json.dumps([
+        {'id': 1, 'first_name': 'One'},
+        {'id': 1000, 'first_name': 'Missing'},
+    ]))
+
+    assert result.status_code == 422
+    assert result.json['description'] == {'1': {'id': ['Not found.']}}
+    assert actor_names(session)[1] == 'First 1'
+
+
+@pytest.mark.parametrize('item', [
+    {'id': '1 OR 1=1', 'first_name': 'Text'},
+    {'id': '1', 'first_name': 'Text'},
+    {'id': 1.5, 'first_name': 'Float'},
+    {'id': True, 'first_name': 'Boolean'},
+    {'id': [1], 'first_name': 'List'},
+    {'first_name': 'Missing'},
+    'not an object',
+])
+def test_update_many_ids_must_be_integers(client, session, item):
+    result = client.simulate_patch('/actors/', body=json.dumps([{'id': 1, 'first_name': 'One'}, item]))
+
+    assert result.status_code == 400
+    assert result.json['description'] == {'1': {'id': ['Not a valid integer.']}}
+    assert actor_names(session)[1] == 'First 1'
+
+
+def test_update_many_expects_a_list(client):
+    assert client.simulate_patch('/actors/', body=json.dumps({'id': 1})).status_code == 422
+
+
+def test_delete_many(client, session):
+    result = client.simulate_delete('/actors/', params={'ids': '1,2'})
+
+    assert result.status_code == 204
+    assert session.query(func.count(models.Actor.id)).scalar() == 18
+    # rows of association tables go along with the objects
+    assert session.query(models.film_actor_table).filter(models.film_actor_table.c.actor_id.in_([1, 2])).count() == 0
+
+
+def test_delete_many_is_all_or_nothing(client, session):
+    result = client.simulate_delete('/actors/', params={'ids': '1,1000,1001'})
+
+    assert result.status_code == 404
+    assert result.json['description'] == {'missing': [1000, 1001]}
+    assert session.query(func.count(models.Actor.id)).scalar() == 20
+
+
+@pytest.mark.parametrize('params', [{}, {'ids': '1,x'}])
+def test_delete_many_needs_integer_ids(client, params):
+    assert client.simulate_delete('/actors/', params=params).status_code == 400
+
+
+def test_malformed_body(client):
+    result = client.simulate_post('/actors/', body='[{')
+
+    assert result.status_code == 400
+    assert result.json['title'] == 'Malformed JSON'
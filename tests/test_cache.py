@@ -0,0 +1,188 @@
+import gzip
+import json
+from collections import OrderedDict
+
+import falcon
+import pytest
+from falcon import testing
+
+from falconer import app, cache as cache_module
+from falconer.cache import ResponseCache
+from falconer.middlewares import CompressionMiddleware, SessionMiddleware
+from falconer.resources.base import add_related_routes, add_routes
+from falconer.resources.inventory import ActorResource, FilmResource
+
+
+@pytest.fixture(scope='module')
+def cache():
+    cache = ResponseCache(max_entries=100, ttl=60, max_bytes=1024 * 1024)
+    # listeners stay registered on the session factory, so the cache is tracked once
+    cache.track(app.Session.session_factory)
+    return cache
+
+
+@pytest.fixture
+def cached_client(cache):
+    cache.clear()
+
+    api = falcon.API(middleware=[CompressionMiddleware(cache, min_size=0), SessionMiddleware(app.Session)])
+    resources = OrderedDict([('/actors', ActorResource(cache=cache)), ('/films', FilmResource(cache=cache))])
+    for path, resource in resources.items():
+        add_routes(api, path, resource)
+    add_related_routes(api, resources)
+
+    return testing.TestClient(api)
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/films/', {'page_size': 5, 'sort': 'title'}),
+    ('/films/7', {'fields': 'title'}),
+    ('/films/7/actors', {}),
+    ('/actors/', {'ids': '1,2'}),
+])
+def test_hits_execute_no_statements(cached_client, statements, path, params):
+    first = cached_client.simulate_get(path, params=params)
+    del statements[:]
+
+    second = cached_client.simulate_get(path, params=params)
+
+    assert statements == []
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.headers.get('X-Next-Cursor') == first.headers.get('X-Next-Cursor')
+
+
+def test_hits_are_validated(cached_client):
+    etag = cached_client.simulate_get('/films/7').headers['ETag']
+
+    result = cached_client.simulate_get('/films/7', headers={'If-None-Match': etag})
+
+    assert result.status_code == 304
+    assert result.content == b''
+
+
+def test_parameters_are_keys(cached_client):
+    titles = cached_client.simulate_get('/films/7', params={'fields': 'title'}).json
+    full = cached_client.simulate_get('/films/7').json
+
+    assert titles == {'title': 'FILM 07'}
+    assert 'actors' in full
+
+
+def test_commits_invalidate_responses(cached_client, statements):
+    cached_client.simulate_get('/actors/1')
+    # films dump ids of their actors, so their responses are tagged with actors as well
+    cached_client.simulate_get('/films/', params={'include': 'actors'})
+
+    result = cached_client.simulate_patch('/actors/1', body=json.dumps({'first_name': 'Changed'}))
+    assert result.status_code == 204
+    del statements[:]
+
+    assert cached_client.simulate_get('/actors/1').json['first_name'] == 'Changed'
+    assert statements
+    del statements[:]
+
+    cached_client.simulate_get('/films/', params={'include': 'actors'})
+    assert statements
+
+
+def test_rollbacks_do_not_invalidate_responses(cached_client, statements):
+    cached_client.simulate_get('/actors/1')
+
+    result = cached_client.simulate_post('/actors/', body=json.dumps({'first_name': None}))
+    assert result.status_code == 422
+    del statements[:]
+
+    cached_client.simulate_get('/actors/1')
+    assert statements == []
+
+
+def test_streams_are_not_cached(cached_client, statements):
+    cached_client.simulate_get('/films/', params={'stream': 1})
+    del statements[:]
+
+    cached_client.simulate_get('/films/', params={'stream': 1})
+
+    assert statements
+
+
+def test_compressed_once(cached_client, cache, monkeypatch):
+    headers = {'Accept-Encoding': 'gzip'}
+    first = cached_client.simulate_get('/films/', headers=headers)
+
+    def compress(*args):
+        raise AssertionError('compressed again')
+
+    monkeypatch.setattr('falconer.middlewares.compress', compress)
+    second = cached_client.simulate_get('/films/', headers=headers)
+
+    assert second.content == first.content
+    assert json.loads(gzip.decompress(second.content).decode('utf-8'))[0]['id'] == 1
+
+
+class FakeResponse:
+    def __init__(self, data, headers=None):
+        self.data = data
+        self.body = None
+        self._headers = headers or {}
+
+    def get_header(self, name):
+        return self._headers.get(name)
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResponseCache(max_entries=10, ttl=60, max_bytes=1024 * 1024)
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+
+    cache.set('key', FakeResponse(b'body'), cache.generation(['tag']))
+    assert cache.get('key').body == b'body'
+
+    now[0] += 61
+    assert cache.get('key') is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2, ttl=60, max_bytes=1024 * 1024)
+
+    for key in ('a', 'b'):
+        cache.set(key, FakeResponse(key.encode()), cache.generation(['tag']))
+    cache.get('a')
+    cache.set('c', FakeResponse(b'c'), cache.generation(['tag']))
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_memory_budget():
+    cache = ResponseCache(max_entries=100, ttl=60, max_bytes=cache_module.ENTRY_OVERHEAD + 100)
+
+    assert cache.set('large', FakeResponse(b'x' * 101), {}) is None
+    assert cache.set('small', FakeResponse(b'x' * 50), {}) is not None
+    cache.set('another', FakeResponse(b'x' * 50), {})
+
+    # both do not fit
+    assert cache.get('small') is None
+    assert cache.get('another') is not None
+
+
+def test_responses_built_while_invalidated_are_not_stored():
+    cache = ResponseCache(max_entries=10, ttl=60, max_bytes=1024 * 1024)
+
+    generation = cache.generation(['tag'])
+    cache.invalidate(['tag'])
+
+    assert cache.set('key', FakeResponse(b'stale'), generation) is None
+    assert cache.get('key') is None
+
+
+def test_invalidation_by_tag():
+    cache = ResponseCache(max_entries=10, ttl=60, max_bytes=1024 * 1024)
+    cache.set('a', FakeResponse(b'a'), cache.generation(['x']))
+    cache.set('b', FakeResponse(b'b'), cache.generation(['x', 'y']))
+    cache.set('c', FakeResponse(b'c'), cache.generation(['z']))
+
+    cache.invalidate(['y'])
+
+    assert [cache.get(key) is not None for key in 'abc'] == [True, False, True]
@@ -0,0 +1,75 @@
+import pytest
+
+from falconer import codecs
+from falconer.codecs import available_codecs, get_codec, iterencode_array
+
+DOCUMENT = [
+    {'id': 1, 'title': 'ACADEMY DINOSAUR', 'rate': 0.99, 'features': ['Trailers', 'Deleted Scenes'], 'length': None},
+    {'id': 2, 'title': 'Ünïcode / “quotes” \\ "escapes"\n', 'rate': 4.99, 'features': [], 'rental': True},
+    {'id': 3, 'nested': {'empty': {}, 'list': [[], [1, 2]]}},
+]
+
+CODECS = list(available_codecs())
+
+
+@pytest.fixture(params=CODECS, ids=lambda codec: codec.name)
+def codec(request, monkeypatch):
+    monkeypatch.setattr(codecs, 'codec', request.param)
+    return request.param
+
+
+def test_default_codec_is_the_fastest():
+    # optional backends are listed first, simplejson and json are always available
+    assert get_codec().name == CODECS[0].name
+    assert [codec.name for codec in CODECS][-2:] == ['simplejson', 'json']
+    assert get_codec('json').name == 'json'
+
+    with pytest.raises(ValueError):
+        get_codec('yaml')
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+def test_backends_encode_the_same_bytes(codec, pretty):
+    assert codec.dumps(DOCUMENT, pretty=pretty) == get_codec('json').dumps(DOCUMENT, pretty=pretty)
+
+
+def test_compact_output(codec):
+    assert codec.dumps({'a': [1, 'é']}) == '{"a":[1,"é"]}'.encode('utf-8')
+
+
+def test_decoding(codec):
+    assert codec.loads(codec.dumps(DOCUMENT)) == DOCUMENT
+    assert codec.loads(codec.dumps(DOCUMENT).decode('utf-8')) == DOCUMENT
+
+    with pytest.raises(ValueError):
+        codec.loads(b'[{')
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+@pytest.mark.parametrize('items', [DOCUMENT, DOCUMENT[:1], []])
+def test_iterencode_array(codec, items, pretty):
+    assert b''.join(iterencode_array(iter(items), pretty=pretty)) == codec.dumps(items, pretty=pretty)
+
+
+def test_codecs_implement_both_directions():
+    class EncodingCodec(codecs.Codec):
+        def _dumps(self, obj):
+            return b'null'
+
+    with pytest.raises(TypeError):
+        EncodingCodec()
+
+
+def test_decimals_are_exact(codec, client):
+    result = client.simulate_get('/films/1', params={'fields': 'id,rental_rate,replacement_cost'})
+
+    assert result.json == {'id': 1, 'rental_rate': '4.99', 'replacement_cost': '19.99'}
+    assert client.simulate_get('/payments/', params={'fields': 'amount', 'page_size': 2}).json == [
+        {'amount': '1.99'}, {'amount': '2.99'}]
+
+
+def test_responses_are_compact(client):
+    result = client.simulate_get('/films/1', params={'fields': 'id,title'})
+
+    assert result.content == b'{"id":1,"title":"FILM 01"}'
+    assert client.simulate_get('/films/1', params={'fields': 'id', 'pretty': 1}).text == '{\n    "id": 1\n}'
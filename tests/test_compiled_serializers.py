@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from falconer import app
+from falconer.codecs import codec
+from falconer.db.loading import collection_attributes, plan_loading
+from falconer.schemas.compiled import get_serializer
+
+ROWS = 20
+
+RESOURCES = list(app.resources.values())
+
+
+def schemas(schema_cls):
+    """Schemas dumping lists, lists with all collections, a few fields of lists and single objects."""
+    collections = sorted(collection_attributes(schema_cls.opts.model))
+    some_fields = [name for name, field in schema_cls().fields.items() if not field.load_only][:3]
+
+    return [
+        ('many', schema_cls(many=True)),
+        ('include', schema_cls(many=True, context={'include': collections})),
+        ('fields', schema_cls(many=True, only=some_fields)),
+        ('single', schema_cls()),
+    ]
+
+
+def load(engine, schema, foreign_keys):
+    model_cls = schema.opts.model
+    options = plan_loading(model_cls, schema, schema.context.get('include', ()), foreign_keys=foreign_keys)
+    primary_key = inspect(model_cls).primary_key[0]
+
+    # a session of its own, objects are not shared by both dumps
+    session = Session(bind=engine)
+    try:
+        query = session.query(model_cls).options(*options).order_by(primary_key)
+        return query.limit(ROWS).all() if schema.many else query.first()
+    finally:
+        session.close()
+
+
+def marshmallow_dump(engine, schema):
+    # marshmallow reads related objects, loaded along with the objects
+    return codec.dumps(schema.dump(load(engine, schema, foreign_keys=False)).data)
+
+
+@pytest.mark.parametrize('schema', [
+    pytest.param(schema, id='{}-{}'.format(resource.schema_cls.__name__, name))
+    for resource in RESOURCES for name, schema in schemas(resource.schema_cls)
+])
+def test_objects(engine, schema):
+    # compiled serializers dump related objects from foreign keys
+    objects = load(engine, schema, foreign_keys=True)
+    serializer = get_serializer(schema)
+
+    actual = serializer.dump_many(objects) if schema.many else serializer.dump(objects)
+
+    # the same keys in the same order
+    assert codec.dumps(actual) == marshmallow_dump(engine, schema)
+
+
+@pytest.mark.parametrize('resource', RESOURCES, ids=lambda resource: type(resource).__name__)
+@pytest.mark.parametrize('name', ['many', 'fields'])
+def test_rows(engine, resource, name):
+    schema = dict(schemas(resource.schema_cls))[name]
+    serializer = get_serializer(schema)
+    if not resource._selects_rows(serializer):
+        pytest.skip('dumped from objects')
+
+    rows = engine.execute(resource._select(serializer.attributes).order_by(resource._primary_attr).limit(ROWS)) \
+        .fetchall()
+
+    assert len(rows) > 1
+    assert codec.dumps(serializer.dump_many(rows)) == marshmallow_dump(engine, schema)
@@ -0,0 +1,117 @@
+import gzip
+import zlib
+
+import falcon
+import pytest
+from falcon import testing
+
+from falconer.compression import compress, compress_stream, negotiate
+from falconer.conditional import set_validators
+from falconer.middlewares import CompressionMiddleware
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'deflate': zlib.decompress,
+}
+if brotli is not None:
+    DECOMPRESS['br'] = brotli.decompress
+
+requires_brotli = pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+
+
+class StrongResource:
+    body = b'{"items":[' + b','.join(b'%d' % number for number in range(1000)) + b']}'
+
+    def on_get(self, req, resp):
+        resp.set_header('Vary', 'Cookie')
+        if set_validators(req, resp, '"strong"'):
+            return
+        resp.data = self.body
+
+
+@pytest.fixture
+def strong_client():
+    api = falcon.API(middleware=[CompressionMiddleware(min_size=100)])
+    api.add_route('/strong', StrongResource())
+    return testing.TestClient(api)
+
+
+@pytest.mark.parametrize('header, coding', [
+    (None, None),
+    ('', None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('deflate, gzip', 'gzip'),
+    ('gzip;q=0.5, deflate', 'deflate'),
+    ('GZIP;q=1.0, br;q=0.9', 'gzip'),
+    pytest.param('br, gzip', 'br', marks=requires_brotli),
+    pytest.param('*', 'br', marks=requires_brotli),
+    pytest.param('*;q=0.5, gzip;q=0', 'br', marks=requires_brotli),
+    ('gzip;q=0, deflate;q=invalid', None),
+    ('compress, unknown', None),
+])
+def test_negotiate(header, coding):
+    assert negotiate(header) == coding
+
+
+@pytest.mark.parametrize('coding', sorted(DECOMPRESS))
+def test_compress(coding):
+    data = b'falconer ' * 1000
+
+    assert DECOMPRESS[coding](compress(coding, data, 6)) == data
+    assert DECOMPRESS[coding](b''.join(compress_stream(coding, iter([data[:10], data[10:], b'']), 6))) == data
+
+
+@pytest.mark.parametrize('coding', sorted(DECOMPRESS))
+def test_responses_are_compressed(client, coding):
+    identity = client.simulate_get('/films/')
+
+    result = client.simulate_get('/films/', headers={'Accept-Encoding': coding})
+
+    assert result.headers['Content-Encoding'] == coding
+    assert result.headers['Vary'] == 'Accept-Encoding'
+    assert len(result.content) < len(identity.content)
+    assert DECOMPRESS[coding](result.content) == identity.content
+
+
+def test_streams_are_compressed(client):
+    identity = client.simulate_get('/films/', params={'stream': 1})
+
+    result = client.simulate_get('/films/', params={'stream': 1}, headers={'Accept-Encoding': 'gzip'})
+
+    assert result.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(result.content) == identity.content
+
+
+def test_small_responses_are_not_compressed(client):
+    result = client.simulate_get('/films/1', params={'fields': 'id'}, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in result.headers
+    assert result.json == {'id': 1}
+
+
+def test_strong_tags_are_weakened(strong_client):
+    identity = strong_client.simulate_get('/strong')
+    assert identity.headers['ETag'] == '"strong"'
+
+    result = strong_client.simulate_get('/strong', headers={'Accept-Encoding': 'gzip'})
+
+    assert result.headers['Content-Encoding'] == 'gzip'
+    assert result.headers['ETag'] == 'W/"strong"'
+    assert result.headers['Vary'] == 'Cookie, Accept-Encoding'
+
+
+def test_not_modified_responses_have_the_headers_of_compressed_ones(strong_client):
+    headers = {'Accept-Encoding': 'gzip', 'If-None-Match': 'W/"strong"'}
+
+    result = strong_client.simulate_get('/strong', headers=headers)
+
+    assert result.status_code == 304
+    assert result.headers['ETag'] == 'W/"strong"'
+    assert result.headers['Vary'] == 'Cookie, Accept-Encoding'
+    assert 'Content-Encoding' not in result.headers
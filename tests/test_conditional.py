@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from falcon.util import dt_to_http
+
+from tests.conftest import UPDATED
+
+
+def patch(client, path, body):
+    result = client.simulate_patch(path, body=json.dumps(body))
+    assert result.status_code == 204, result.text
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/films/', {'page_size': 5}),
+    ('/films/', {'ids': '3,1'}),
+    ('/films/', {'filter': 'id:lte:5'}),
+    ('/films/7/actors', {}),
+    ('/films/7', {}),
+])
+def test_not_modified(client, path, params):
+    first = client.simulate_get(path, params=params)
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"')
+
+    result = client.simulate_get(path, params=params, headers={'If-None-Match': etag})
+
+    assert result.status_code == 304
+    assert result.content == b''
+    assert result.headers['ETag'] == etag
+
+
+def test_lists_are_validated_without_additional_statements(client, statements):
+    etag = client.simulate_get('/films/', params={'page_size': 5}).headers['ETag']
+    del statements[:]
+
+    result = client.simulate_get('/films/', params={'page_size': 5}, headers={'If-None-Match': etag})
+
+    assert result.status_code == 304
+    assert len(statements) == 1
+    assert 'count(' not in statements[0] and 'max(' not in statements[0]
+
+
+def test_modified_within_the_same_second(client):
+    etags = {path: client.simulate_get(path).headers['ETag'] for path in ('/actors/', '/actors/1')}
+
+    patch(client, '/actors/1', {'first_name': 'Changed'})
+
+    for path, etag in etags.items():
+        result = client.simulate_get(path, headers={'If-None-Match': etag})
+        assert result.status_code == 200, path
+        assert result.headers['ETag'] != etag
+
+
+def test_pages_do_not_depend_on_rows_out_of_them(client):
+    params = {'filter': 'id:lte:5'}
+    etag = client.simulate_get('/films/', params=params).headers['ETag']
+
+    patch(client, '/films/20', {'title': 'CHANGED'})
+
+    assert client.simulate_get('/films/', params=params, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_tags_depend_on_the_representation(client):
+    etags = {client.simulate_get('/films/', params=params).headers['ETag']
+             for params in ({}, {'fields': 'id'}, {'pretty': 1}, {'page': 2})}
+
+    assert len(etags) == 4
+
+
+def test_modified_since(client):
+    # payments dump their row only, related objects by the keys it holds
+    result = client.simulate_get('/payments/1')
+    assert result.headers['Last-Modified'] == dt_to_http(UPDATED)
+
+    assert client.simulate_get('/payments/1', headers={'If-Modified-Since': dt_to_http(UPDATED)}).status_code == 304
+    assert client.simulate_get('/payments/1', headers={
+        'If-Modified-Since': 'Tue, 15 Feb 2005 04:57:12 GMT'}).status_code == 200
+    # invalid dates are ignored
+    assert client.simulate_get('/payments/1', headers={'If-Modified-Since': 'yesterday'}).status_code == 200
+
+
+def test_none_match_takes_precedence_over_modified_since(client):
+    result = client.simulate_get('/payments/1', headers={'If-None-Match': 'W/"other"',
+                                                         'If-Modified-Since': dt_to_http(UPDATED)})
+
+    assert result.status_code == 200
+
+
+@pytest.mark.parametrize('path, params, last_modified', [
+    ('/films/7', {}, False),
+    ('/films/7', {'fields': 'title,language'}, True),
+    ('/actors/1', {}, False),
+    ('/actors/1', {'fields': 'first_name'}, True),
+])
+def test_related_objects_are_not_dated(client, path, params, last_modified):
+    result = client.simulate_get(path, params=params)
+
+    assert ('Last-Modified' in result.headers) is last_modified
+
+
+def test_changes_of_collections_are_not_missed(client):
+    patch(client, '/actors/1', {'films': [7]})
+
+    result = client.simulate_get('/films/7', headers={'If-Modified-Since': dt_to_http(UPDATED)})
+
+    assert result.status_code == 200
+    assert 1 in result.json['actors']
+
+
+def test_rows_modified_within_the_current_second_are_not_dated(client):
+    patch(client, '/payments/1', {'amount': '1.00'})
+
+    result = client.simulate_get('/payments/1')
+
+    # another change within the second would not change the date
+    assert 'Last-Modified' not in result.headers
+    assert result.json['amount'] == '1.00'
+
+
+def test_weak_comparison(client):
+    etag = client.simulate_get('/films/1').headers['ETag']
+
+    for header in (etag[2:], 'W/"other", ' + etag, '*'):
+        assert client.simulate_get('/films/1', headers={'If-None-Match': header}).status_code == 304
+
+
+def test_missing_resource(client):
+    assert client.simulate_get('/films/1000', headers={'If-None-Match': '*'}).status_code == 404
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from falconer import app
+
+PATHS = [path + '/' for path in app.resources] + [
+    template.format(resource_id=1) for template in app.related_paths]
+
+
+def read(client, monkeypatch, path, params, rows):
+    for resource in app.resources.values():
+        monkeypatch.setattr(resource, 'select_rows', rows)
+    result = client.simulate_get(path, params=params)
+    assert result.status_code == 200
+    return result
+
+
+@pytest.mark.parametrize('params', [
+    {'page_size': 20},
+    {'page_size': 5, 'page': 2},
+    {'page_size': 5, 'sort': 'last_update:desc'},
+    {'page_size': 5, 'fields': 'id'},
+])
+@pytest.mark.parametrize('path', PATHS)
+def test_rows_are_dumped_as_objects(client, monkeypatch, path, params):
+    objects = read(client, monkeypatch, path, params, rows=False)
+    rows = read(client, monkeypatch, path, params, rows=True)
+
+    assert rows.content == objects.content
+    assert rows.headers.get('X-Next-Cursor') == objects.headers.get('X-Next-Cursor')
+
+
+def test_lists_are_selected_with_core(client, statements, monkeypatch):
+    identity_maps = []
+    close = Session.close
+
+    def record_and_close(session):
+        identity_maps.append(len(session.identity_map))
+        close(session)
+
+    monkeypatch.setattr(Session, 'close', record_and_close)
+
+    client.simulate_get('/films/', params={'page_size': 20})
+
+    # rows of the mapped columns, labelled by attribute names, no objects are built
+    page, = statements
+    assert page.startswith('SELECT film.description AS description, film.film_id AS id, ')
+    # related objects are dumped from foreign keys
+    assert 'film.language_id AS language_id' in page and 'JOIN' not in page
+    assert identity_maps and set(identity_maps) == {0}
+
+
+def test_included_relationships_are_loaded_with_objects(client, statements):
+    result = client.simulate_get('/films/', params={'page_size': 2, 'include': 'actors'})
+
+    assert 'actors' in result.json[0]
+    assert len(statements) == 2
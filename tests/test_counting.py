@@ -0,0 +1,169 @@
+import json
+
+import pytest
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects import postgresql
+
+from falconer import app, cache as cache_module, counting, models, settings
+from falconer.counting import Count, CountCache
+
+from .conftest import FILMS
+
+
+def count(client, path='/films', params=None):
+    result = client.simulate_head(path + '/', params=params)
+    assert result.status_code == 200
+    return int(result.headers['X-Total-Count']), result.headers['X-Total-Count-Exact'] == 'true'
+
+
+def test_counts(client):
+    assert count(client) == (FILMS, True)
+    assert count(client, params={'filter': 'id:lte:5'}) == (5, True)
+
+    result = client.simulate_get('/films/', params={'count': 'true'})
+    assert (result.headers['X-Total-Count'], result.headers['X-Total-Count-Exact']) == (str(FILMS), 'true')
+
+
+def test_counts_are_cached(client, statements):
+    count(client)
+    del statements[:]
+
+    assert count(client) == (FILMS, True)
+    assert statements == []
+
+
+def test_commits_invalidate_counts(client, statements):
+    count(client, '/actors')
+
+    result = client.simulate_post('/actors/', body=json.dumps({'first_name': 'New', 'last_name': 'ACTOR'}))
+    assert result.status_code == 201
+
+    assert count(client, '/actors') == (21, True)
+
+
+def test_rollbacks_do_not_invalidate_counts(client, statements):
+    count(client, '/actors')
+
+    result = client.simulate_post('/actors/', body=json.dumps({'first_name': None}))
+    assert result.status_code == 422
+    del statements[:]
+
+    count(client, '/actors')
+    assert statements == []
+
+
+def test_caches_tracking_one_factory(client):
+    # e.g. responses and counts, both are invalidated by the same commits
+    other = cache_module.TaggedCache(max_entries=10, ttl=60)
+    other.track(app.Session.session_factory)
+    other.put('actors', 'cached', other.generation([models.Actor]))
+    count(client, '/actors')
+
+    result = client.simulate_delete('/actors/20')
+    assert result.status_code == 204
+
+    assert other.get('actors') is None
+    assert count(client, '/actors') == (19, True)
+
+
+def test_broad_filters_are_counted_up_to_a_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, 'COUNT_EXACT_LIMIT', 10)
+
+    # the limit is a lower bound, SQLite does not estimate rows
+    assert count(client, params={'filter': 'id:gt:5'}) == (10, False)
+    assert count(client, params={'filter': 'id:gt:25'}) == (5, True)
+
+
+def test_large_tables_are_estimated(client, monkeypatch):
+    monkeypatch.setitem(counting.TABLE_ESTIMATORS, 'sqlite', lambda connection, table: 1000)
+    monkeypatch.setattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 1000)
+
+    assert count(client) == (1000, False)
+
+
+def test_small_tables_are_counted(client, monkeypatch):
+    monkeypatch.setitem(counting.TABLE_ESTIMATORS, 'sqlite', lambda connection, table: 999)
+    monkeypatch.setattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 1000)
+
+    assert count(client) == (FILMS, True)
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_counts_expire(now):
+    counts = CountCache(max_entries=10, ttl=60)
+    counts.put(('Film', ()), Count(1, True), counts.generation(['Film']))
+    assert counts.get(('Film', ())) == Count(1, True)
+
+    now[0] += 61
+    assert counts.get(('Film', ())) is None
+
+
+def test_least_recently_used_counts_are_evicted():
+    counts = CountCache(max_entries=2, ttl=60)
+
+    for key in ('a', 'b'):
+        counts.put(key, Count(1, True), counts.generation(['Film']))
+    counts.get('a')
+    counts.put('c', Count(1, True), counts.generation(['Film']))
+
+    assert [counts.get(key) is not None for key in 'abc'] == [True, False, True]
+
+
+def test_counts_done_while_invalidated_are_not_stored():
+    counts = CountCache(max_entries=10, ttl=60)
+
+    generation = counts.generation(['Film'])
+    counts.invalidate(['Film'])
+
+    assert counts.put('key', Count(1, True), generation) is False
+    assert counts.get('key') is None
+
+
+def test_invalidation_by_model():
+    counts = CountCache(max_entries=10, ttl=60)
+    counts.put('films', Count(1, True), counts.generation(['Film']))
+    counts.put('actors', Count(2, True), counts.generation(['Actor']))
+
+    counts.invalidate(['Film'])
+
+    assert counts.get('films') is None
+    assert counts.get('actors') == Count(2, True)
+
+
+class ExplainingConnection:
+    """Connection of a PostgreSQL database recording executed statements, as compiled, along with their parameters."""
+
+    dialect = postgresql.dialect()
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = []
+
+    def execution_options(self, **options):
+        return self
+
+    def execute(self, statement, params):
+        compiled = statement.compile(dialect=self.dialect)
+        self.executed.append((str(compiled), compiled.construct_params(params)))
+        return self
+
+    def scalar(self):
+        return self.plan
+
+
+def test_rows_are_estimated_by_explaining_statements():
+    connection = ExplainingConnection([{'Plan': {'Plan Rows': 1234.0}}])
+    statement = select([models.Payment.id]).where(models.Payment.customer_id == bindparam('filter_0_0'))
+
+    assert counting.estimate_rows(connection, statement, {'filter_0_0': 42}) == 1234
+
+    (explained, params), = connection.executed
+    assert explained == 'EXPLAIN (FORMAT JSON) SELECT payment.payment_id \nFROM payment \n' \
+                        'WHERE payment.customer_id = %(filter_0_0)s'
+    assert params == {'filter_0_0': 42}
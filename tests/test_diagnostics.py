@@ -0,0 +1,86 @@
+import falcon
+import pytest
+from falcon import testing
+
+from falconer import app
+from falconer.db.loading import collection_attributes
+from falconer.diagnostics import NPlusOneError, detect_n_plus_one, fingerprint
+from falconer.middlewares import DiagnosticsMiddleware, SessionMiddleware
+from falconer.resources.base import add_routes
+from falconer.resources.inventory import FilmResource
+
+# pages of 20 rows load each relationship of each row at most once, any repetition is an N+1 query
+THRESHOLD = 1
+
+
+def included(resource):
+    """Collections dumped by the schema of the resource, which lists load only when included."""
+    declared = resource.schema_cls._declared_fields
+    return [key for key in sorted(collection_attributes(resource.model_cls))
+            if key in declared and not declared[key].load_only]
+
+
+@pytest.mark.parametrize('path', list(app.resources))
+def test_lists(client, path):
+    params = {'page_size': 20}
+    collections = included(app.resources[path])
+    if collections:
+        params['include'] = ','.join(collections)
+
+    with detect_n_plus_one(THRESHOLD, path):
+        result = client.simulate_get(path + '/', params=params)
+
+    assert result.status_code == 200
+    assert result.json
+
+
+@pytest.mark.parametrize('template', app.related_paths)
+def test_related_collections(client, template):
+    with detect_n_plus_one(THRESHOLD, template):
+        result = client.simulate_get(template.format(resource_id=1), params={'page_size': 20})
+
+    assert result.status_code == 200
+
+
+@pytest.mark.parametrize('path', list(app.resources))
+def test_resources(client, path):
+    with detect_n_plus_one(THRESHOLD, path):
+        assert client.simulate_get(path + '/1').status_code == 200
+
+
+def test_lazy_loads_are_detected():
+    api = falcon.API(middleware=[SessionMiddleware(app.Session)])
+    resource = FilmResource()
+    resource.loading_strategies = {'actors': 'lazy'}
+    add_routes(api, '/films', resource)
+
+    with pytest.raises(NPlusOneError) as info:
+        with detect_n_plus_one(THRESHOLD):
+            testing.TestClient(api).simulate_get('/films/', params={'page_size': 20, 'include': 'actors'})
+
+    assert 'loading Film.actors' in str(info.value)
+
+
+def test_middleware_reports_repetitions(caplog):
+    api = falcon.API(middleware=[DiagnosticsMiddleware(THRESHOLD), SessionMiddleware(app.Session)])
+    resource = FilmResource()
+    resource.loading_strategies = {'actors': 'lazy'}
+    add_routes(api, '/films', resource)
+
+    result = testing.TestClient(api).simulate_get('/films/', params={'page_size': 20, 'include': 'actors'})
+
+    assert result.status_code == 200
+    warning, = [record.getMessage() for record in caplog.records if record.getMessage().startswith('N+1')]
+    assert 'FilmResource GET /films/' in warning
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ('SELECT a FROM t WHERE id = 12', 'SELECT a FROM t WHERE id = ?'),
+    ("SELECT a FROM t WHERE name = 'O''Brien'", 'SELECT a FROM t WHERE name = ?'),
+    ('SELECT a FROM t WHERE id IN (%(id_1)s, %(id_2)s)', 'SELECT a FROM t WHERE id IN (?)'),
+    ('SELECT a FROM t WHERE id IN (?, ?, ?)', 'SELECT a FROM t WHERE id IN (?)'),
+    ('SELECT a\n  FROM t2 WHERE id = :id', 'SELECT a FROM t2 WHERE id = ?'),
+    ('SELECT t.a_1 FROM t LIMIT -1 OFFSET 0.5', 'SELECT t.a_1 FROM t LIMIT ? OFFSET ?'),
+])
+def test_fingerprint(statement, expected):
+    assert fingerprint(statement) == expected
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+from falconer.db import utils
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # engines created by tests are not shared with the application
+    engines = {}
+    monkeypatch.setattr(utils, '_engines', engines)
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+@pytest.fixture
+def url(tmpdir):
+    return make_url('sqlite:///' + str(tmpdir.join('engines.sqlite3')))
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    # SQLite files are not pooled by default, connections have to be kept to be shared
+    monkeypatch.setattr(utils, 'get_engine_options', lambda url: {'poolclass': QueuePool})
+
+
+def test_engines_are_shared(registry, url, tmpdir):
+    engine = utils.get_engine(url)
+
+    assert utils.get_engine(make_url(str(url))) is engine
+    assert utils.get_engine(make_url('sqlite:///' + str(tmpdir.join('other.sqlite3')))) is not engine
+    assert len(registry) == 2
+
+
+def test_default_engine_is_the_application_one(engine):
+    assert utils.get_engine() is engine
+
+
+def test_engine_options(monkeypatch):
+    for variable, value in [('DB_POOL_SIZE', '20'), ('DB_MAX_OVERFLOW', '5'), ('DB_POOL_RECYCLE', '1800')]:
+        monkeypatch.setenv(variable, value)
+    monkeypatch.delenv('DB_POOL_TIMEOUT', raising=False)
+
+    assert utils.get_engine_options(make_url('postgresql://falconer@localhost/falconer')) == {
+        'pool_size': 20, 'max_overflow': 5, 'pool_recycle': 1800}
+    # pools of SQLite engines are not limited
+    assert utils.get_engine_options(make_url('sqlite://')) == {'pool_recycle': 1800}
+
+
+def test_connections_are_not_shared_with_forked_processes(registry, pooled, url, monkeypatch):
+    engine = utils.get_engine(url)
+    with engine.connect() as connection:
+        parent = connection.connection.connection
+    with engine.connect() as connection:
+        assert connection.connection.connection is parent
+
+    pid = os.getpid()
+    monkeypatch.setattr(utils.os, 'getpid', lambda: pid + 1)
+
+    with engine.connect() as connection:
+        assert connection.connection.connection is not parent
+
+
+def test_pre_ping(registry, url, monkeypatch):
+    monkeypatch.setenv('DB_POOL_PRE_PING', '1')
+    engine = utils.get_engine(url)
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    with engine.connect():
+        pass
+
+    assert statements == ['SELECT 1']
+
+
+def test_dispose_engines(registry, pooled, url):
+    engine = utils.get_engine(url)
+    with engine.connect():
+        pass
+    assert engine.pool.checkedin() == 1
+
+    utils.dispose_engines()
+
+    assert engine.pool.checkedin() == 0
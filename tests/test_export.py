@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+import pytest
+
+from .conftest import PAYMENTS
+
+
+def export(client, path, **params):
+    result = client.simulate_get(path, params=params)
+    assert result.status_code == 200, result.text
+    return result
+
+
+def test_ndjson(client):
+    result = export(client, '/payments/export')
+
+    rows = [json.loads(line) for line in result.text.splitlines()]
+    assert result.headers['Content-Type'] == 'application/x-ndjson'
+    assert result.headers['Content-Disposition'] == 'attachment; filename="payment.ndjson"'
+    assert [row['payment_id'] for row in rows] == list(range(1, PAYMENTS + 1))
+    # columns are named as in the database
+    assert list(rows[0]) == ['payment_id', 'customer_id', 'staff_id', 'rental_id', 'amount', 'payment_date',
+                             'last_update']
+    assert rows[0]['amount'] == '1.99'
+    assert rows[0]['payment_date'] == '2005-05-25T00:23:30+00:00'
+
+
+def test_csv(client):
+    result = export(client, '/staffs/export', format='csv')
+
+    header, *rows = list(csv.reader(io.StringIO(result.text)))
+    assert result.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert header == ['staff_id', 'first_name', 'last_name', 'address_id', 'picture', 'email', 'store_id', 'active',
+                      'username', 'last_update']
+    # formatted as the loading command parses them
+    assert rows[0][header.index('active')] == 't'
+    assert rows[0][header.index('last_update')] == '2006-02-15 04:57:12'
+
+
+@pytest.mark.parametrize('format_', ['csv', 'ndjson'])
+def test_fields_are_columns(client, format_):
+    result = export(client, '/rentals/export', format=format_, fields='customer_id,rental_id')
+
+    if format_ == 'csv':
+        header, first = list(csv.reader(io.StringIO(result.text)))[:2]
+        assert (header, first) == (['customer_id', 'rental_id'], ['2', '1'])
+    else:
+        assert json.loads(result.text.splitlines()[0]) == {'customer_id': 2, 'rental_id': 1}
+
+
+def test_filters(client):
+    result = export(client, '/payments/export', format='csv', fields='payment_id', filter='customer_id:eq:2')
+
+    assert result.text.split() == ['payment_id'] + [str(payment_id) for payment_id in range(1, PAYMENTS + 1)
+                                                    if payment_id % 5 == 1]
+
+
+@pytest.mark.parametrize('fields', ['id', 'customer', 'rental_id,payment', 'password'])
+def test_unknown_fields(client, fields):
+    result = client.simulate_get('/rentals/export', params={'fields': fields})
+
+    assert result.status_code == 400
+    assert 'rental_id, rental_date' in result.json['description']
+
+
+def test_unknown_formats(client):
+    result = client.simulate_get('/films/export', params={'format': 'xml'})
+
+    assert result.status_code == 400
+    assert 'csv, ndjson' in result.json['description']
+
+
+def test_filters_name_columns(client):
+    result = export(client, '/rentals/export', format='csv', fields='rental_id,customer_id',
+                    filter='rental_id:lte:3,customer_id:in:2|3')
+
+    assert result.text.split() == ['rental_id,customer_id', '1,2', '2,3']
+
+
+@pytest.mark.parametrize('filter_', ['id:lte:3', 'rating:eq:G'])
+def test_unknown_filters(client, filter_):
+    result = client.simulate_get('/rentals/export', params={'fields': 'rental_id', 'filter': filter_})
+
+    assert result.status_code == 400
+    assert 'rental_id, rental_date, inventory_id, customer_id, staff_id' in result.json['description']
@@ -0,0 +1,81 @@
+import pytest
+
+from falconer import models
+from falconer.schemas.business import StaffSchema
+from tests.conftest import film_actors
+
+
+def test_list_fields(client, statements):
+    result = client.simulate_get('/films/', params={'fields': 'id,title,language', 'page_size': 2})
+
+    assert result.status_code == 200
+    assert result.json == [{'id': 1, 'title': 'FILM 01', 'language': 2}, {'id': 2, 'title': 'FILM 02', 'language': 1}]
+
+    page, = [statement for statement in statements if 'LIMIT' in statement]
+    # only the requested columns, the language is dumped from its foreign key
+    assert page.startswith('SELECT film.film_id AS id, film.language_id AS language_id, film.title AS title \n'
+                           'FROM film')
+
+
+def test_resource_fields(client, statements):
+    result = client.simulate_get('/films/3', params={'fields': 'title'})
+
+    assert result.status_code == 200
+    assert result.json == {'title': 'FILM 03'}
+
+    select, = statements
+    assert 'film.description' not in select
+    assert 'film.title' in select
+
+
+def test_collection_fields_are_loaded(client):
+    result = client.simulate_get('/films/3', params={'fields': 'title,actors'})
+
+    assert result.json['title'] == 'FILM 03'
+    assert sorted(result.json['actors']) == film_actors(3)
+    assert set(result.json) == {'title', 'actors'}
+
+
+def test_fields_of_sorted_pages(client):
+    # columns pages are sorted by are selected for cursors, but not dumped
+    result = client.simulate_get('/films/', params={'fields': 'id', 'sort': 'length:desc', 'page_size': 3})
+
+    assert [set(film) for film in result.json] == [{'id'}] * 3
+    assert 'X-Next-Cursor' in result.headers
+
+
+@pytest.mark.parametrize('path, fields', [
+    ('/films/', 'title,nonexistent'),
+    ('/films/1', 'nonexistent'),
+    ('/actors/', 'first_name,films.title'),
+])
+def test_unreadable_fields(client, path, fields):
+    result = client.simulate_get(path, params={'fields': fields})
+
+    assert result.status_code == 400
+    assert 'fields' in result.json['description']
+
+
+def test_passwords_are_never_dumped(session):
+    staff = session.query(models.Staff).get(1)
+
+    assert staff.password == 'secret'
+    assert 'password' not in StaffSchema().dump(staff).data
+    assert 'password' not in StaffSchema(only=['username', 'password']).dump(staff).data
+
+
+def test_staff_are_served_without_passwords(client):
+    staff = client.simulate_get('/staffs/1').json
+    listed = client.simulate_get('/staffs/').json
+
+    assert staff['username'] == 'staff1'
+    assert [member['id'] for member in listed] == [1, 2]
+    assert all('password' not in member for member in [staff] + listed)
+
+
+@pytest.mark.parametrize('path', ['/staffs/', '/staffs/1', '/staffs/export'])
+def test_passwords_cannot_be_requested(client, path):
+    result = client.simulate_get(path, params={'fields': 'username,password'})
+
+    assert result.status_code == 400
+    assert 'fields' in result.json['description']
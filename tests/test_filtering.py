@@ -0,0 +1,134 @@
+from datetime import date, datetime
+
+import pytest
+
+from falconer import filtering, models
+from falconer.resources.base import BaseResource
+from falconer.resources.inventory import FilmResource
+
+from .conftest import FILMS, STARTED, UPDATED, film_actors
+
+
+def ids(result):
+    assert result.status_code == 200, result.text
+    return [item['id'] for item in result.json]
+
+
+@pytest.mark.parametrize('filter_, expected', [
+    ('id:eq:7', [7]),
+    ('id:ne:1', list(range(2, FILMS + 1))),
+    ('id:lt:4', [1, 2, 3]),
+    ('id:lte:3', [1, 2, 3]),
+    ('id:gt:27', [28, 29, 30]),
+    ('id:gte:28', [28, 29, 30]),
+    ('id:in:9|2|30', [2, 9, 30]),
+    ('title:like:FILM 1', list(range(10, 20))),
+    ('title:eq:FILM 05', [5]),
+    ('language_id:eq:2', list(range(1, FILMS + 1, 2))),
+])
+def test_operators(client, filter_, expected):
+    assert ids(client.simulate_get('/films/', params={'filter': filter_, 'page_size': FILMS})) == expected
+
+
+def test_filters_are_combined(client):
+    result = client.simulate_get('/films/', params={'filter': 'id:gt:10,language_id:eq:1,id:lte:16'})
+
+    assert ids(result) == [12, 14, 16]
+
+
+def test_prefixes_are_escaped(client, session):
+    session.query(models.Film).filter(models.Film.id == 3).update({'title': 'FILM_%'})
+    session.commit()
+
+    assert ids(client.simulate_get('/films/', params={'filter': 'title:like:FILM_%'})) == [3]
+    assert ids(client.simulate_get('/films/', params={'filter': 'title:like:FILM_'})) == [3]
+
+
+@pytest.mark.parametrize('value', ['2005-05-25T00:30:00', '2005-05-25T00:30:00Z'])
+def test_datetimes(client, value):
+    result = client.simulate_get('/payments/', params={'filter': 'payment_date:lte:' + value})
+
+    # payments are made half past each hour since STARTED
+    assert ids(result) == [1]
+
+
+def test_filtered_pages(client):
+    params = {'filter': 'language_id:eq:1', 'page_size': 4}
+
+    first = client.simulate_get('/films/', params=params)
+    second = client.simulate_get('/films/', params=dict(params, cursor=first.headers['X-Next-Cursor']))
+
+    assert ids(first) == [2, 4, 6, 8]
+    assert ids(second) == [10, 12, 14, 16]
+
+
+def test_filtered_counts(client):
+    result = client.simulate_get('/films/', params={'filter': 'id:lte:12', 'count': 'true', 'page_size': 20})
+
+    assert len(ids(result)) == 12
+    assert result.headers['X-Total-Count'] == '12'
+
+
+@pytest.mark.parametrize('filter_', [
+    'id:7',
+    'id:between:1',
+    'rating:eq:G',
+    'id:eq:seven',
+    'id:in:1|x',
+    'id:like:1',
+    'title:lt',
+])
+def test_invalid_filters(client, filter_):
+    result = client.simulate_get('/films/', params={'filter': filter_})
+
+    assert result.status_code == 400
+    assert 'filter' in result.text
+
+
+def test_filterable_columns_are_indexed():
+    class RatingResource(BaseResource):
+        model_cls = models.Film
+        schema_cls = FilmResource.schema_cls
+        filterable = ('rating',)
+
+    with pytest.raises(ValueError) as info:
+        RatingResource()
+
+    assert str(info.value) == 'Film.rating is not an indexed column, it cannot be filterable.'
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2005-05-24', datetime(2005, 5, 24)),
+    ('2005-05-24T22:53:30Z', STARTED),
+    ('2005-05-24T22:53:30.000000', STARTED),
+])
+def test_decoded_datetimes(value, expected):
+    assert filtering.decode_value(models.Payment.payment_date, 'eq', value) == expected
+
+
+def test_decoded_dates():
+    assert filtering.decode_value(models.Film.release_year, 'eq', '2006') == 2006
+    assert filtering.decode_value(models.Rental.last_update, 'gte', UPDATED.isoformat()) == UPDATED
+    assert isinstance(filtering.decode_value(models.Rental.rental_date, 'eq', '2005-05-24'), date)
+
+
+def reinsert_reversed(session, column, value):
+    """Insert the rows of film_actor again in reverse order, they are read in insertion order unless sorted."""
+    table = models.film_actor_table
+    rows = [dict(row) for row in session.execute(table.select().where(column == value).order_by(table.c.actor_id,
+                                                                                                   table.c.film_id))]
+    session.execute(table.delete().where(column == value))
+    session.execute(table.insert(), list(reversed(rows)))
+    session.commit()
+
+
+def test_collections_are_ordered_by_primary_keys(client, session):
+    reinsert_reversed(session, models.film_actor_table.c.film_id, 7)
+    reinsert_reversed(session, models.film_actor_table.c.actor_id, 2)
+
+    film = client.simulate_get('/films/7').json
+    actor = client.simulate_get('/actors/2').json
+
+    assert film['actors'] == film_actors(7)
+    assert actor['films'] == sorted(
+        film_id for film_id in range(1, FILMS + 1) if 2 in film_actors(film_id))
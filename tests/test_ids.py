@@ -0,0 +1,75 @@
+import pytest
+
+from falconer import models, settings
+from falconer.resources.inventory import FilmResource
+from falconer.schemas.compiled import get_serializer
+
+
+def ids(result):
+    assert result.status_code == 200, result.text
+    return [item['id'] for item in result.json]
+
+
+def test_requested_order(client, statements):
+    result = client.simulate_get('/films/', params={'ids': '7,2,9,2'})
+
+    assert ids(result) == [7, 2, 9, 2]
+    assert 'X-Missing-Ids' not in result.headers
+    assert len(statements) == 1
+
+
+def test_missing_ids(client):
+    result = client.simulate_get('/actors/', params={'ids': '3,999,1,1000'})
+
+    assert ids(result) == [3, 1]
+    assert result.headers['X-Missing-Ids'] == '999,1000'
+
+
+@pytest.mark.parametrize('params', [
+    {'include': 'actors'},
+    {'fields': 'title'},
+])
+def test_projections(client, params):
+    by_ids = client.simulate_get('/films/', params=dict(params, ids='2,1')).json
+    listed = client.simulate_get('/films/', params=dict(params, page_size=2)).json
+
+    assert by_ids == list(reversed(listed))
+
+
+def test_statements_are_padded(client, statements):
+    client.simulate_get('/films/', params={'ids': '1,2,3'})
+    client.simulate_get('/films/', params={'ids': '4,5,6,7'})
+
+    # three ids are bound as four, the last one repeated
+    assert len(statements) == 2
+    assert statements[0] == statements[1]
+
+
+@pytest.mark.parametrize('params', [
+    {'ids': '1,x'},
+    {'ids': '1,2', 'stream': 'true'},
+    {'ids': ','.join(str(resource_id) for resource_id in range(settings.MAX_PAGE_SIZE + 1))},
+])
+def test_invalid_ids(client, params):
+    result = client.simulate_get('/films/', params=params)
+
+    assert result.status_code == 400
+    assert 'ids' in result.text
+
+
+def test_loaded_objects_are_reused(session, statements):
+    resource = FilmResource()
+    resource.session = session
+    shape = (True, (), ())
+    schema = resource._schema(shape)
+    # the identity map is weak, loaded objects are kept as long as they are referenced
+    loaded = session.query(models.Film).get(7)
+    del statements[:]
+
+    result, missing = resource._get_many(schema, get_serializer(schema), shape, [7, 8])
+
+    assert result[0] is loaded and result[1].id == 8
+    assert missing == []
+    # film 7 is in the identity map, only film 8 is selected
+    statement, = statements
+    assert statement.count('?') == 1
@@ -0,0 +1,82 @@
+import re
+
+from falconer.instrumentation import MetricsRegistry, finish_request, start_request, timed
+
+
+def timings(header):
+    """Entries of a Server-Timing header: name -> (duration, description)."""
+    entries = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        entries[name] = (float(params['dur']), params.get('desc'))
+    return entries
+
+
+def count(registry_text, name, **labels):
+    pairs = ','.join('{}="{}"'.format(key, value) for key, value in labels.items())
+    match = re.search(r'^{}_count\{{{}\}} (\d+)$'.format(name, re.escape(pairs)), registry_text, re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def test_server_timing(client):
+    result = client.simulate_get('/films/7')
+
+    entries = timings(result.headers['Server-Timing'])
+    # the film and each of its three collections
+    assert entries['db'][1] == '"4 statements"'
+    assert list(entries) == ['db', 'query', 'dump', 'encode', 'total']
+    assert entries['total'][0] >= max(duration for duration, _ in entries.values())
+
+
+def test_requests_without_statements(client):
+    entries = timings(client.simulate_options('/films/').headers['Server-Timing'])
+
+    assert entries['db'] == (0.0, '"0 statements"')
+
+
+def test_metrics(client):
+    labels = {'method': 'GET', 'route': '/films/{resource_id:int}', 'status': '200'}
+    before = count(client.simulate_get('/metrics').text, 'falconer_request_duration_seconds', **labels)
+
+    client.simulate_get('/films/7')
+    client.simulate_get('/films/8')
+    result = client.simulate_get('/metrics')
+
+    assert result.headers['Content-Type'].startswith('text/plain')
+    assert count(result.text, 'falconer_request_duration_seconds', **labels) == before + 2
+    assert count(result.text, 'falconer_db_statements', **labels) == before + 2
+    assert count(result.text, 'falconer_phase_duration_seconds', method='GET', route='/films/{resource_id:int}',
+                 phase='dump') >= 2
+
+
+def test_registry_rendering():
+    registry = MetricsRegistry()
+    registry.histogram('sizes', 'Sizes.', ('name',), (1, 10))
+    for value in (0.5, 1, 5, 50):
+        registry.observe('sizes', ('a "quoted"\nname',), value)
+
+    assert registry.render().splitlines() == [
+        '# HELP sizes Sizes.',
+        '# TYPE sizes histogram',
+        'sizes_bucket{name="a \\"quoted\\"\\nname",le="1.0"} 2',
+        'sizes_bucket{name="a \\"quoted\\"\\nname",le="10.0"} 3',
+        'sizes_bucket{name="a \\"quoted\\"\\nname",le="+Inf"} 4',
+        'sizes_sum{name="a \\"quoted\\"\\nname"} 56.5',
+        'sizes_count{name="a \\"quoted\\"\\nname"} 4',
+    ]
+
+
+def test_phases_outside_of_requests():
+    with timed('dump'):
+        pass
+
+    metrics = start_request()
+    with timed('dump'):
+        pass
+    with timed('dump'):
+        pass
+
+    assert finish_request() is metrics
+    assert list(metrics.phases) == ['dump']
+    assert finish_request() is None
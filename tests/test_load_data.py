@@ -0,0 +1,117 @@
+import csv
+import io
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import pytest
+from sqlalchemy.orm import Session
+
+from falconer import models
+from falconer.commands import load_data
+from falconer.commands.load_data import Command, _get_converter, _get_levels, _get_table
+
+
+def command(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['load_data.py'] + list(args))
+    return Command()
+
+
+def write_csv(path, rows):
+    with open(str(path), 'w', newline='') as csv_file:
+        csv.writer(csv_file).writerows(rows)
+
+
+def test_converters():
+    columns = models.Payment.__table__.c
+
+    assert _get_converter(columns.amount)('1.50') == Decimal('1.50')
+    assert _get_converter(columns.amount)('') is None
+    assert _get_converter(columns.rental_id)('') is None
+    assert _get_converter(columns.payment_date)('2005-05-25 11:30:37.123') == datetime(2005, 5, 25, 11, 30, 37, 123000)
+    assert _get_converter(models.Film.__table__.c.rating)('PG-13') == models.Film.MpaaRating.PG_13
+    assert _get_converter(models.Customer.__table__.c.active)('f') is False
+
+    with pytest.raises(InvalidOperation):
+        _get_converter(columns.amount)('1,50')
+    with pytest.raises(ValueError):
+        _get_converter(columns.rental_id)('one')
+
+
+def test_invalid_values_are_reported(monkeypatch, capsys):
+    rows = io.StringIO('payment_id,rental_id,amount\n1,1,1.50\n2,one,"1,50"\n')
+
+    batch, = command(monkeypatch)._read_batches(_get_table(models.Payment), rows)
+
+    assert batch == [{'payment_id': 1, 'rental_id': 1, 'amount': Decimal('1.50')},
+                     {'payment_id': 2, 'rental_id': None, 'amount': None}]
+    assert capsys.readouterr().out.splitlines() == [
+        "payment.csv, line 3: invalid rental_id value 'one', loaded as NULL",
+        "payment.csv, line 3: invalid amount value '1,50', loaded as NULL",
+    ]
+
+
+def test_incomplete_rows_are_reported(monkeypatch, capsys):
+    rows = io.StringIO('payment_id,rental_id,amount\n1,1\n2,2,2.50\n3,3,3.50,extra\n')
+
+    batch, = command(monkeypatch)._read_batches(_get_table(models.Payment), rows)
+
+    assert batch == [{'payment_id': 2, 'rental_id': 2, 'amount': Decimal('2.50')}]
+    assert capsys.readouterr().out.splitlines() == [
+        'payment.csv, line 2: 2 values instead of 3, skipped',
+        'payment.csv, line 4: 4 values instead of 3, skipped',
+    ]
+
+
+def test_batches(monkeypatch):
+    rows = io.StringIO('category_id,name,last_update\n' + ''.join(
+        '{0},Category {0},2006-02-15 04:46:27\n'.format(category_id) for category_id in range(1, 6)))
+
+    batches = command(monkeypatch, '--batch-size', '2')._read_batches(_get_table(models.Category), rows)
+
+    assert [[row['category_id'] for row in batch] for batch in batches] == [[1, 2], [3, 4], [5]]
+
+
+def test_levels_follow_foreign_keys():
+    tables = [_get_table(load_data.FILES[name]) for name in ('film_actor', 'film', 'actor', 'language')]
+
+    levels = [[table.name for table in level] for level in _get_levels(tables)]
+
+    assert levels == [['actor', 'language'], ['film'], ['film_actor']]
+
+
+def test_levels_break_cycles(capsys):
+    # stores reference their manager, staff their store
+    tables = [_get_table(load_data.FILES[name]) for name in ('store', 'staff')]
+
+    levels = [[table.name for table in level] for level in _get_levels(tables)]
+
+    assert levels in ([['staff'], ['store']], [['store'], ['staff']])
+    assert capsys.readouterr().out.startswith('foreign key cycle')
+
+
+def test_load(monkeypatch, tmpdir, engine):
+    engine.execute(models.film_category_table.delete())
+    engine.execute(models.Category.__table__.delete())
+    write_csv(tmpdir.join('category.csv'), [
+        ['category_id', 'name', 'last_update'],
+        [1, 'Action', '2006-02-15 04:46:27'],
+        [2, 'Animation', '2006-02-15 04:46:27'],
+        [3, 'Children', '2006-02-15 04:46:27'],
+    ])
+    write_csv(tmpdir.join('film_category.csv'), [
+        ['film_id', 'category_id', 'last_update'],
+        [1, 3, '2006-02-15 05:07:09'],
+        [2, 1, '2006-02-15 05:07:09'],
+    ])
+
+    command(monkeypatch, '--data-dir', str(tmpdir), '--tables', 'film_category', 'category',
+            '--batch-size', '2').run()
+
+    session = Session(bind=engine)
+    try:
+        assert session.query(models.Category.name).order_by(models.Category.id).all() == [
+            ('Action',), ('Animation',), ('Children',)]
+        assert [category.id for category in session.query(models.Film).get(1).categories] == [3]
+    finally:
+        session.close()
@@ -0,0 +1,97 @@
+import pytest
+
+from falconer.db.loading import plan_loading
+from falconer.models import Film
+from falconer.schemas.inventory import FilmSchema
+from tests.conftest import film_actors
+
+
+def strategies(options):
+    return {option.path[0]: dict(option.strategy)['lazy'] for option in options}
+
+
+def selects(statements):
+    return [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+
+
+def test_plan_of_many_objects():
+    planned = strategies(plan_loading(Film, FilmSchema(many=True), include=['categories']))
+
+    assert planned == {
+        'language': 'joined',
+        'original_language': 'joined',
+        # collections are loaded only if included, with one query for all objects
+        'categories': 'subquery',
+        'actors': 'noload',
+        'inventories': 'noload',
+    }
+
+
+def test_plan_of_one_object():
+    planned = strategies(plan_loading(Film, FilmSchema(), foreign_keys=True))
+
+    # related objects are dumped as their primary keys, which foreign keys hold already
+    assert planned['language'] == 'raise'
+    assert planned['actors'] == planned['categories'] == planned['inventories'] == 'subquery'
+
+
+def test_plan_skips_relationships_which_are_not_dumped():
+    planned = strategies(plan_loading(Film, FilmSchema(only=['id', 'title'])))
+
+    assert set(planned.values()) == {'raise'}
+
+
+def test_planned_strategies_are_overridden():
+    overrides = {'actors': 'selectin', 'language': 'lazy'}
+    planned = strategies(plan_loading(Film, FilmSchema(many=True), overrides=overrides))
+
+    assert planned['actors'] == 'subquery'
+    assert planned['language'] == 'select'
+
+
+def test_one_query_per_collection_of_a_resource(client, statements):
+    result = client.simulate_get('/films/7')
+
+    assert result.status_code == 200
+    assert sorted(result.json['actors']) == film_actors(7)
+    assert result.json['categories'] == [2]
+    assert result.json['inventories'] == [7]
+    assert result.json['language'] == 2
+    # the film and each of its three collections
+    assert len(selects(statements)) == 4
+
+
+@pytest.mark.parametrize('path', ['/films/', '/actors/', '/rentals/', '/payments/', '/staffs/', '/stores/'])
+def test_list_queries_do_not_depend_on_page_size(client, statements, path):
+    counts = []
+    for page_size in (2, 20):
+        del statements[:]
+        assert client.simulate_get(path, params={'page_size': page_size}).status_code == 200
+        counts.append(len(selects(statements)))
+
+    assert counts[0] == counts[1]
+
+
+def test_included_collections_are_loaded_at_once(client, statements):
+    result = client.simulate_get('/films/', params={'include': 'actors,categories', 'page_size': 20})
+
+    assert [sorted(film['actors']) for film in result.json] == [film_actors(film_id) for film_id in range(1, 21)]
+    # the page, and each included collection selected by a subquery of the page
+    pages = [statement for statement in selects(statements) if 'LIMIT' in statement]
+    assert len(pages) == 3
+    assert sum('actor.actor_id' in statement for statement in pages) == 1
+    assert sum('category.category_id' in statement for statement in pages) == 1
+
+
+def test_collections_of_lists_are_skipped_unless_included(client):
+    film = client.simulate_get('/films/', params={'page_size': 1}).json[0]
+
+    assert 'actors' not in film
+    assert 'language' in film
+
+
+def test_only_relationships_can_be_included(client):
+    result = client.simulate_get('/films/', params={'include': 'title'})
+
+    assert result.status_code == 400
+    assert 'include' in result.json['description']
@@ -0,0 +1,64 @@
+import pytest
+
+from falconer import app, settings
+
+
+@pytest.mark.parametrize('path', ['/films/', '/films/1', '/'])
+def test_documents_are_cached(client, statements, path):
+    method = client.simulate_get if path == '/' else client.simulate_options
+
+    result = method(path)
+
+    assert result.status_code == 200
+    assert result.headers['Cache-Control'] == 'public, max-age={}'.format(settings.METADATA_MAX_AGE)
+    assert result.headers['ETag'].startswith('W/"')
+    assert statements == []
+
+    revalidated = method(path, headers={'If-None-Match': result.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b''
+
+
+def test_resource_description(client):
+    films = client.simulate_options('/films/').json
+    film = client.simulate_options('/films/1').json
+
+    assert (films['name'], film['name']) == ('Films', 'Film')
+    assert films['fields'] == film['fields']
+    assert films['fields']['id'] == {'label': None, 'type': 'integer', 'required': False, 'readable': True,
+                                     'writable': False}
+    assert films['fields']['title']['writable'] is True
+
+
+def test_passwords_are_described_as_write_only(client):
+    fields = client.simulate_options('/staffs/').json['fields']
+
+    assert (fields['password']['readable'], fields['password']['writable']) == (False, True)
+    assert fields['username']['readable'] is True
+
+
+def test_discovery(client):
+    document = client.simulate_get('/').json
+
+    assert [resource['collection']['path'] for resource in document['resources']] == [
+        path + '/' for path in app.resources]
+    films = document['resources'][1]
+    assert films['item'] == {'path': '/films/{resource_id}', 'methods': ['GET', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']}
+    assert films['export'] == {'path': '/films/export', 'methods': ['GET']}
+    assert films['fields'] == client.simulate_options('/films/').json['fields']
+    assert set(app.related_paths) < set(document['routes'])
+
+
+def test_compressed_documents(client):
+    identity = client.simulate_get('/')
+    result = client.simulate_get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert result.headers['Content-Encoding'] == 'gzip'
+    assert result.headers['Vary'] == 'Accept-Encoding'
+    # the same representation, whatever its content coding
+    assert result.headers['ETag'] == identity.headers['ETag']
+
+    headers = {'Accept-Encoding': 'gzip', 'If-None-Match': identity.headers['ETag']}
+    revalidated = client.simulate_get('/', headers=headers)
+    assert revalidated.status_code == 304
+    assert revalidated.headers['Vary'] == 'Accept-Encoding'
@@ -0,0 +1,81 @@
+import pytest
+
+from tests.conftest import FILMS
+
+
+def walk(client, path, params):
+    """Follow X-Next-Cursor headers through the whole list, returns ids of all pages."""
+    ids = []
+    cursor = None
+
+    while True:
+        result = client.simulate_get(path, params=dict(params, **({'cursor': cursor} if cursor else {})))
+        assert result.status_code == 200, result.text
+        ids.extend(item['id'] for item in result.json)
+
+        cursor = result.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return ids
+
+
+def offset_pages(client, path, params, pages):
+    ids = []
+    for page in range(1, pages + 1):
+        ids.extend(item['id'] for item in client.simulate_get(path, params=dict(params, page=page)).json)
+    return ids
+
+
+@pytest.mark.parametrize('sort', [None, 'length:desc', 'length', 'rating:desc,title', 'last_update:desc', 'id:desc'])
+def test_cursor_pages_match_offset_pages(client, sort):
+    params = {'page_size': 7}
+    if sort:
+        params['sort'] = sort
+
+    ids = walk(client, '/films/', params)
+
+    assert len(ids) == FILMS
+    assert sorted(ids) == list(range(1, FILMS + 1))
+    assert ids == offset_pages(client, '/films/', params, FILMS // 7 + 1)
+
+
+def test_default_order_is_primary_key(client):
+    assert walk(client, '/films/', {'page_size': 8}) == list(range(1, FILMS + 1))
+
+
+def test_last_page_has_no_cursor(client):
+    result = client.simulate_get('/films/', params={'page_size': 10, 'page': 3})
+
+    assert len(result.json) == 10
+    assert 'X-Next-Cursor' in result.headers
+
+    result = client.simulate_get('/films/', params={'page_size': 10, 'cursor': result.headers['X-Next-Cursor']})
+
+    assert result.json == []
+    assert 'X-Next-Cursor' not in result.headers
+
+
+def test_cursor_pages_are_selected_by_sort_keys(client, statements):
+    first = client.simulate_get('/films/', params={'page_size': 5, 'sort': 'title'})
+    del statements[:]
+
+    client.simulate_get('/films/', params={'page_size': 5, 'sort': 'title', 'cursor': first.headers['X-Next-Cursor']})
+
+    pages = [statement for statement in statements if 'LIMIT' in statement]
+    assert len(pages) == 1
+    # rows are skipped by the index of the sort keys rather than scanned and discarded
+    assert 'film.title > ?' in pages[0]
+
+
+def test_malformed_cursor(client):
+    result = client.simulate_get('/films/', params={'cursor': 'not a cursor'})
+
+    assert result.status_code == 400
+    assert 'cursor' in result.json['description']
+
+
+def test_cursor_of_another_sorting(client):
+    cursor = client.simulate_get('/films/', params={'page_size': 5, 'sort': 'title'}).headers['X-Next-Cursor']
+
+    result = client.simulate_get('/films/', params={'page_size': 5, 'sort': 'length', 'cursor': cursor})
+
+    assert result.status_code == 400
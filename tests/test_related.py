@@ -0,0 +1,67 @@
+import pytest
+
+from falconer import app
+
+from .conftest import FILMS, PAYMENTS, film_actors
+
+
+def ids(result):
+    assert result.status_code == 200, result.text
+    return [item['id'] for item in result.json]
+
+
+@pytest.mark.parametrize('template', app.related_paths)
+def test_collections_of_parents(client, template):
+    path, key = template.split('/{resource_id}/')
+    parent = client.simulate_get('{}/1'.format(path)).json
+
+    result = client.simulate_get(template.format(resource_id=1), params={'page_size': 100})
+
+    # items dump the ids of their collections, in the same order
+    assert ids(result) == parent[key]
+
+
+def test_pages(client):
+    films = [film_id for film_id in range(1, FILMS + 1) if 2 in film_actors(film_id)]
+
+    first = client.simulate_get('/actors/2/films', params={'page_size': 2})
+    second = client.simulate_get('/actors/2/films', params={'page_size': 2, 'cursor': first.headers['X-Next-Cursor']})
+    third = client.simulate_get('/actors/2/films', params={'page_size': 2, 'page': 2})
+
+    assert ids(first) + ids(second) == films[:4]
+    assert ids(third) == films[2:4]
+
+
+def test_sorting_filters_and_fields(client):
+    params = {'sort': 'id:desc', 'filter': 'customer_id:eq:3', 'fields': 'id,amount', 'page_size': 100}
+
+    result = client.simulate_get('/staffs/1/payments', params=params)
+
+    expected = [payment_id for payment_id in range(PAYMENTS, 0, -1) if payment_id % 2 == 0 and payment_id % 5 == 2]
+    assert ids(result) == expected
+    assert set(result.json[0]) == {'id', 'amount'}
+
+
+def test_empty_pages(client):
+    assert ids(client.simulate_get('/films/7/actors', params={'filter': 'id:eq:1'})) == []
+
+
+def test_missing_parents(client):
+    assert client.simulate_get('/films/999/actors').status_code == 404
+
+
+@pytest.mark.parametrize('params', [{'ids': '1,2'}, {'count': 'true'}])
+def test_rejected_params(client, params):
+    result = client.simulate_get('/films/7/actors', params=params)
+
+    assert result.status_code == 400
+    assert list(params)[0] in result.text
+
+
+def test_routed_collections():
+    assert '/films/{resource_id}/actors' in app.related_paths
+    assert '/stores/{resource_id}/staff' in app.related_paths
+    # categories, inventories and customers have no resources
+    assert '/films/{resource_id}/categories' not in app.related_paths
+    assert '/stores/{resource_id}/inventories' not in app.related_paths
+    assert '/stores/{resource_id}/customers' not in app.related_paths
@@ -0,0 +1,134 @@
+import json
+import time
+
+import falcon
+import pytest
+from falcon import testing
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from falconer import app, models
+from falconer.db.routing import LEAST_CONNECTIONS, ReplicaSet, RoutingSession
+from falconer.middlewares import LAST_WRITE_COOKIE, SessionMiddleware
+from falconer.resources.base import add_routes
+from falconer.resources.inventory import ActorResource
+
+
+@pytest.fixture
+def replicas():
+    engines = [create_engine('sqlite://', poolclass=QueuePool) for _ in range(3)]
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def sessions():
+    """Info of sessions of requests, recorded when they begin."""
+    infos = []
+
+    def record(session, transaction, connection):
+        infos.append(dict(session.info))
+
+    event.listen(app.Session.session_factory, 'after_begin', record)
+    yield infos
+    event.remove(app.Session.session_factory, 'after_begin', record)
+
+
+def test_round_robin(replicas):
+    replica_set = ReplicaSet(replicas)
+
+    assert [replica_set.choose() for _ in range(4)] == replicas + replicas[:1]
+
+
+def test_least_connections(replicas):
+    replica_set = ReplicaSet(replicas, LEAST_CONNECTIONS)
+    busy = [replicas[0].connect(), replicas[1].connect()]
+
+    try:
+        assert replica_set.choose() is replicas[2]
+    finally:
+        for connection in busy:
+            connection.close()
+
+
+def test_unknown_strategy(replicas):
+    with pytest.raises(ValueError):
+        ReplicaSet(replicas, 'random')
+
+
+def test_sessions_read_from_one_replica(engine, replicas):
+    session = RoutingSession(bind=engine, replicas=ReplicaSet(replicas))
+    session.info['use_replica'] = True
+
+    bind = session.get_bind(models.Actor)
+    assert bind in replicas
+    assert session.get_bind(models.Film) is bind
+
+    # locking reads are served by the primary
+    assert session.get_bind(models.Actor, session.query(models.Actor).with_for_update().statement) is engine
+
+    session.close()
+    assert session.get_bind(models.Actor) is not bind
+
+
+def test_sessions_read_from_the_primary_unless_told_otherwise(engine, replicas):
+    session = RoutingSession(bind=engine, replicas=ReplicaSet(replicas))
+
+    assert session.get_bind(models.Actor) is engine
+    assert RoutingSession(bind=engine, replicas=ReplicaSet([])).get_bind(models.Actor) is engine
+
+
+def test_safe_requests_use_replicas(client, sessions):
+    client.simulate_get('/actors/1')
+
+    assert sessions == [{'read_only': True, 'use_replica': True}]
+
+
+def test_writes_use_the_primary(client, sessions):
+    result = client.simulate_patch('/actors/1', body=json.dumps({'first_name': 'Changed'}))
+
+    assert result.status_code == 204
+    assert sessions[0] == {'read_only': False, 'use_replica': False}
+
+
+@pytest.fixture
+def replicated_client(engine, monkeypatch):
+    """Client of an application whose sessions have a replica, the primary database itself."""
+    monkeypatch.setitem(app.Session.session_factory.kw, 'replicas', ReplicaSet([engine]))
+    api = falcon.API(middleware=[SessionMiddleware(app.Session, app.settings.READ_YOUR_WRITES_WINDOW)])
+    add_routes(api, '/actors', ActorResource())
+
+    return testing.TestClient(api)
+
+
+def test_clients_read_their_own_writes(replicated_client, sessions):
+    result = replicated_client.simulate_patch('/actors/1', body=json.dumps({'first_name': 'Changed'}))
+    until = float(result.cookies[LAST_WRITE_COOKIE].value)
+    assert time.time() < until < time.time() + app.settings.READ_YOUR_WRITES_WINDOW + 1
+    del sessions[:]
+
+    replicated_client.simulate_get('/actors/1', headers={'Cookie': '{}={}'.format(LAST_WRITE_COOKIE, until)})
+    replicated_client.simulate_get('/actors/1', headers={'Cookie': '{}={}'.format(LAST_WRITE_COOKIE, time.time() - 1)})
+    replicated_client.simulate_get('/actors/1', headers={'Cookie': '{}=invalid'.format(LAST_WRITE_COOKIE)})
+
+    assert [info['use_replica'] for info in sessions] == [False, True, True]
+
+
+@pytest.mark.parametrize('method, path, body', [
+    ('PATCH', '/actors/', []),
+    ('DELETE', '/actors/1000', None),
+    ('POST', '/actors/', {'first_name': None}),
+])
+def test_requests_without_changes_are_not_marked(replicated_client, method, path, body):
+    result = replicated_client.simulate_request(method, path, body=None if body is None else json.dumps(body))
+
+    assert result.status_code < 500
+    assert LAST_WRITE_COOKIE not in result.cookies
+
+
+def test_writes_are_not_marked_without_replicas(client):
+    result = client.simulate_patch('/actors/1', body=json.dumps({'first_name': 'Changed'}))
+
+    assert result.status_code == 204
+    assert 'Set-Cookie' not in result.headers
@@ -0,0 +1,139 @@
+import json
+import threading
+
+import falcon
+import pytest
+from falcon import testing
+from sqlalchemy import event
+
+from falconer import app
+from falconer.middlewares import SessionMiddleware, _LazySession
+from falconer.resources import base
+from falconer.resources.base import add_routes
+from falconer.resources.inventory import FilmResource
+from tests.conftest import film_actors
+
+
+@pytest.fixture
+def transactions(engine):
+    """Names of connection events: checkouts from the pool, commits and rollbacks."""
+    names = []
+    listeners = [
+        (engine.pool, 'checkout', lambda *args: names.append('checkout')),
+        (engine, 'commit', lambda *args: names.append('commit')),
+        (engine, 'rollback', lambda *args: names.append('rollback')),
+    ]
+    for target, name, listener in listeners:
+        event.listen(target, name, listener)
+    yield names
+    for target, name, listener in listeners:
+        event.remove(target, name, listener)
+
+
+def test_sessions_are_created_when_used(client, transactions):
+    assert client.simulate_options('/films/').status_code == 200
+    assert transactions == []
+
+
+@pytest.mark.parametrize('path', ['/films/', '/films/7', '/films/7/actors', '/films/1000'])
+def test_reads_are_not_committed(client, transactions, path):
+    client.simulate_get(path)
+
+    assert transactions[0] == 'checkout'
+    assert 'commit' not in transactions
+    assert 'rollback' in transactions
+
+
+def test_writes_are_committed(client, transactions):
+    assert client.simulate_patch('/films/7', body=json.dumps({'title': 'CHANGED'})).status_code == 204
+
+    assert transactions.count('commit') == 1
+
+
+@pytest.fixture
+def checked_out(engine, monkeypatch):
+    """Numbers of connections checked out of the pool whenever a serializer starts dumping."""
+    connections = []
+    numbers = []
+    listeners = [
+        ('checkout', lambda *args: connections.append(1)),
+        ('checkin', lambda *args: connections.pop()),
+    ]
+    for name, listener in listeners:
+        event.listen(engine.pool, name, listener)
+
+    class Recording:
+        def __init__(self, serializer):
+            self.serializer = serializer
+
+        def __getattr__(self, name):
+            return getattr(self.serializer, name)
+
+        def dump(self, obj):
+            numbers.append(len(connections))
+            return self.serializer.dump(obj)
+
+        def dump_many(self, objs):
+            numbers.append(len(connections))
+            return self.serializer.dump_many(objs)
+
+    get_serializer = base.get_serializer
+    monkeypatch.setattr(base, 'get_serializer', lambda schema: Recording(get_serializer(schema)))
+
+    yield numbers
+
+    for name, listener in listeners:
+        event.remove(engine.pool, name, listener)
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/films/', {}),
+    ('/films/', {'include': 'actors'}),
+    ('/films/', {'ids': '3,1'}),
+    ('/films/7', {}),
+    ('/films/7', {'fields': 'title,actors'}),
+    ('/films/7/actors', {}),
+])
+def test_connections_are_released_before_dumps(client, checked_out, path, params):
+    assert client.simulate_get(path, params=params).status_code == 200
+
+    assert checked_out == [0]
+
+
+def test_lazy_loads_during_dumps(transactions, checked_out):
+    api = falcon.API(middleware=[SessionMiddleware(app.Session)])
+    resource = FilmResource()
+    resource.loading_strategies = {'actors': 'lazy', 'categories': 'lazy'}
+    add_routes(api, '/films', resource)
+
+    result = testing.TestClient(api).simulate_get('/films/7')
+
+    assert result.status_code == 200
+    assert sorted(result.json['actors']) == film_actors(7)
+    assert result.json['categories'] == [2]
+    # the session is used by the dump, and released afterwards
+    assert transactions.count('checkout') == 1
+    assert transactions[-1] == 'rollback'
+    assert checked_out == [1]
+    assert 'commit' not in transactions
+
+
+def test_sessions_are_per_thread():
+    lazy = _LazySession(app.Session)
+    lazy.prepare({'read_only': True, 'use_replica': True})
+    infos = []
+
+    def read():
+        infos.append(dict(lazy.info))
+        app.Session.remove()
+
+    try:
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+        assert infos == [{}]
+        assert lazy.info == {'read_only': True, 'use_replica': True}
+    finally:
+        lazy.prepare(None)
+        app.Session.remove()
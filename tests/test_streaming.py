@@ -0,0 +1,71 @@
+import pytest
+
+from falconer import settings
+from falconer.app import resources
+
+
+@pytest.fixture(params=['rows', 'objects'])
+def read_mode(request, monkeypatch):
+    """Lists are read as Core rows, or as ORM objects when relationships have to be loaded."""
+    monkeypatch.setattr(resources['/films'], 'select_rows', request.param == 'rows')
+    return request.param
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+def test_streamed_list_is_the_buffered_list(client, read_mode, monkeypatch, pretty):
+    # several chunks per page
+    monkeypatch.setattr(settings, 'STREAM_CHUNK_SIZE', 4)
+    params = {'page_size': 10, 'page': 2, 'sort': 'title:desc', 'pretty': int(pretty)}
+
+    streamed = client.simulate_get('/films/', params=dict(params, stream=1))
+    buffered = client.simulate_get('/films/', params=params)
+
+    assert streamed.status_code == 200
+    assert streamed.content == buffered.content
+    assert [film['id'] for film in streamed.json] == list(range(20, 10, -1))
+
+
+def test_empty_stream(client, read_mode):
+    result = client.simulate_get('/films/', params={'page': 10, 'stream': 1})
+
+    assert result.status_code == 200
+    assert result.json == []
+
+
+def test_page_size_is_capped(client, monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_PAGE_SIZE', 10)
+
+    result = client.simulate_get('/films/', params={'page_size': 11})
+
+    assert result.status_code == 400
+    assert 'page_size' in result.json['description']
+
+
+def test_streamed_page_size_is_not_capped(client, monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_PAGE_SIZE', 10)
+
+    result = client.simulate_get('/films/', params={'page_size': 25, 'stream': 1})
+
+    assert result.status_code == 200
+    assert [film['id'] for film in result.json] == list(range(1, 26))
+
+
+@pytest.mark.parametrize('params', [
+    {'page_size': 0},
+    {'page_size': -1},
+    {'page': 0},
+    {'page': -1},
+    {'page_size': -1, 'stream': 1},
+])
+def test_page_and_page_size_must_be_positive(client, params):
+    result = client.simulate_get('/films/', params=params)
+
+    assert result.status_code == 400
+    assert 'page' in result.json['description']
+
+
+def test_collections_are_not_streamed(client):
+    result = client.simulate_get('/films/', params={'include': 'actors', 'stream': 1})
+
+    assert result.status_code == 400
+    assert 'include' in result.json['description']